@@ -0,0 +1,555 @@
+"""
+Asynchronous HTTP API for summaries, for services that cannot use the Streamlit page.
+
+One asyncio event loop serves every connection, so hundreds of clients can
+wait on one process without a thread each. Only running pipelines take a
+thread: at most API_MAX_CONCURRENT run at once, at most API_MAX_QUEUED more
+wait for a slot, and any request beyond that is turned away with 503 and a
+Retry-After estimate. Transcripts longer than API_SYNC_MAX_TOKENS are handed
+to the background job queue and answered with a job handle instead.
+
+Endpoints:
+    POST   /v1/summaries         {"url": "<YouTube URL or id>", "mode": "sync" | "stream" | "job",
+                                  "use_cache": true, "incremental": false, "objective": "calls" | "time" | "tokens"}
+    GET    /v1/jobs/<id>          Job status, result and error
+    GET    /v1/jobs/<id>/events   Job progress as Server-Sent Events
+    DELETE /v1/jobs/<id>          Cancel a job
+    GET    /v1/library?q=&limit=&offset=   Full-text search of saved summaries (recent first without q)
+    GET    /v1/library/<video id> Saved summary of a video, without any API call
+    GET    /health                Load and counters
+
+Modes: "sync" answers 200 with the summary (or 202 with a job handle for a long
+video); "stream" (or Accept: text/event-stream) answers with Server-Sent Events -
+progress, partial and result/error events; "job" always queues a background job.
+
+Usage:
+    python api_server.py --host 0.0.0.0 --port 8080
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from batch_planner import OBJECTIVES
+from job_queue import ACTIVE_STATUSES, PRIORITY_NORMAL, get_worker_pool, job_store
+from pipeline import PipelineReporter, TranscriptTooLong, extract_video_id, summarize_video, summary_library
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8080
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_MAX_QUEUED = 64
+# Roughly two hours of speech; longer transcripts become background jobs
+DEFAULT_SYNC_MAX_TOKENS = 100000
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+HEADER_TIMEOUT_SECONDS = 30.0
+SSE_HEARTBEAT_SECONDS = 15.0
+JOB_POLL_SECONDS = 0.5
+MODES = ("sync", "stream", "job")
+MAX_LIBRARY_LIMIT = 100
+STATUS_TEXT = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+_JOB_PATH = re.compile(r"^/v1/jobs/([0-9a-f]{32})(/events)?$")
+_LIBRARY_PATH = re.compile(r"^/v1/library(?:/([\w-]{1,64}))?$")
+
+
+def api_settings_from_env() -> dict:
+    """
+    API_HOST / API_PORT      - listen address (default 127.0.0.1:8080)
+    API_MAX_CONCURRENT       - summarizations running at once (default 4)
+    API_MAX_QUEUED           - requests waiting for a slot before new ones get 503 (default 64)
+    API_SYNC_MAX_TOKENS      - longer transcripts are answered with a job handle (default 100000; 0 = never)
+    """
+    return {
+        "host": os.getenv("API_HOST", "127.0.0.1"),
+        "port": int(os.getenv("API_PORT", DEFAULT_PORT)),
+        "max_concurrent": int(os.getenv("API_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT)),
+        "max_queued": int(os.getenv("API_MAX_QUEUED", DEFAULT_MAX_QUEUED)),
+        "sync_max_tokens": int(os.getenv("API_SYNC_MAX_TOKENS", DEFAULT_SYNC_MAX_TOKENS)),
+    }
+
+
+class HTTPError(Exception):
+    """Ends a request with an error status and a JSON body {"error": message}."""
+
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class EventReporter(PipelineReporter):
+    """
+    Forwards progress messages and partial summaries from the pipeline thread
+    to an asyncio queue that a streaming response drains.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        super().__init__()
+        self.loop = loop
+        self.queue = queue
+
+    def _emit(self, event: str, data: dict) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def info(self, message):
+        super().info(message)
+        self._emit("progress", {"level": "info", "message": message})
+
+    def warning(self, message):
+        super().warning(message)
+        self._emit("progress", {"level": "warning", "message": message})
+
+    def error(self, message):
+        super().error(message)
+        self._emit("progress", {"level": "error", "message": message})
+
+    def success(self, message):
+        super().success(message)
+        self._emit("progress", {"level": "success", "message": message})
+
+    def partial_summary(self, partial):
+        self._emit("partial", partial)
+
+
+class SummaryService:
+    """
+    Admission control and execution of summarization requests.
+
+    Args:
+        max_concurrent: Pipelines running at once (the size of the pipeline thread pool)
+        max_queued: Requests allowed to wait for a slot; more are rejected with 503
+        sync_max_tokens: Transcripts above this many tokens are queued as jobs (0 = never)
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, max_queued: int = DEFAULT_MAX_QUEUED,
+                 sync_max_tokens: int = DEFAULT_SYNC_MAX_TOKENS):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.sync_max_tokens = sync_max_tokens
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="api-pipeline")
+        # Job store reads and writes are short; a few threads serve every poller
+        self.io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="api-io")
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.waiting = 0
+        self.running = 0
+        self.average_seconds = 30.0
+        self.counters = {"completed": 0, "failed": 0, "rejected": 0, "jobs": 0}
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued work spread over the slots."""
+        return max(1, round(self.average_seconds * (self.waiting / self.max_concurrent + 1)))
+
+    def admit(self) -> None:
+        """
+        Reserve a place in the queue.
+
+        Raises:
+            HTTPError: 503 if the queue is full
+        """
+        free_slots = max(0, self.max_concurrent - self.running)
+        if self.waiting >= self.max_queued + free_slots:
+            self.counters["rejected"] += 1
+            raise HTTPError(503, "Too many summarization requests in progress; retry later",
+                            {"Retry-After": str(self.retry_after())})
+        self.waiting += 1
+
+    async def acquire(self) -> None:
+        """Wait for a pipeline slot; must follow a successful admit()."""
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self) -> None:
+        self.running -= 1
+        self._slots.release()
+
+    def _summarize(self, url: str, reporter: PipelineReporter, use_cache: bool, incremental: bool,
+                   stream: bool, objective: str = None) -> dict:
+        try:
+            summary = summarize_video(url, reporter, use_cache=use_cache, stream=stream, incremental=incremental,
+                                      objective=objective, max_tokens=0 if incremental else self.sync_max_tokens)
+        except TranscriptTooLong as e:
+            return {"too_long": e.tokens}
+        return {"summary": summary}
+
+    async def summarize(self, url: str, reporter: PipelineReporter, use_cache: bool, incremental: bool,
+                        stream: bool, objective: str = None) -> dict:
+        """
+        Run one summarization in the pipeline pool (caller holds a slot).
+
+        Returns:
+            dict: {"summary": dict or None} or {"too_long": transcript tokens}
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self.executor, self._summarize, url, reporter, use_cache, incremental, stream, objective
+            )
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        if "summary" in result:
+            self.counters["completed" if result["summary"] else "failed"] += 1
+            elapsed = time.monotonic() - started
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * elapsed
+        return result
+
+    async def submit_job(self, url: str, use_cache: bool, incremental: bool, objective: str = None) -> dict:
+        loop = asyncio.get_running_loop()
+        job_id = await loop.run_in_executor(
+            self.io_executor, lambda: job_store.submit(url, PRIORITY_NORMAL, stream=True, use_cache=use_cache,
+                                                       incremental=incremental, objective=objective)
+        )
+        self.counters["jobs"] += 1
+        return {"job_id": job_id, "status_url": f"/v1/jobs/{job_id}", "events_url": f"/v1/jobs/{job_id}/events"}
+
+    async def store_call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, fn, *args)
+
+    def health(self) -> dict:
+        return {"status": "ok", "running": self.running, "waiting": self.waiting,
+                "max_concurrent": self.max_concurrent, "max_queued": self.max_queued, **self.counters}
+
+
+def _public_job(job: dict) -> dict:
+    keys = ("job_id", "video_id", "status", "created_at", "started_at", "finished_at", "error", "result", "metadata")
+    return {key: job.get(key) for key in keys}
+
+
+class ApiServer:
+    """
+    Minimal HTTP/1.1 server (keep-alive, JSON and Server-Sent Events) on asyncio streams.
+
+    Args:
+        service: Executes and throttles the summarization requests
+    """
+
+    def __init__(self, service: SummaryService):
+        self.service = service
+        # Pipelines outliving a disconnected stream are kept referenced until they finish
+        self._background = set()
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                if not await self.dispatch(request, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader: asyncio.StreamReader):
+        """
+        Returns:
+            dict: method, path, headers (lower-cased names), body - or None when the client closed
+
+        Raises:
+            HTTPError: 400 / 413 for malformed or oversized requests, 411 for chunked bodies
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT_SECONDS)
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HTTPError(400, "Incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "Request headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        if "transfer-encoding" in headers:
+            # Bodies are small JSON documents; only Content-Length framing is supported
+            raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        return {"method": method.upper(), "path": path, "query": parse_qs(query), "headers": headers, "body": body,
+                "keep_alive": headers.get("connection", "").lower() != "close"}
+
+    async def dispatch(self, request: dict, writer: asyncio.StreamWriter) -> bool:
+        """Route one request; returns whether the connection may be reused."""
+        method, path = request["method"], request["path"]
+        try:
+            if path == "/health" and method == "GET":
+                await self.send_json(writer, 200, self.service.health(), keep_alive=request["keep_alive"])
+                return request["keep_alive"]
+            if path == "/v1/summaries":
+                if method != "POST":
+                    raise HTTPError(405, "Use POST")
+                return await self.post_summary(request, writer)
+            match = _JOB_PATH.match(path)
+            if match:
+                return await self.job_route(request, writer, match.group(1), bool(match.group(2)))
+            match = _LIBRARY_PATH.match(path)
+            if match:
+                if method != "GET":
+                    raise HTTPError(405, "Use GET")
+                return await self.library_route(request, writer, match.group(1))
+            raise HTTPError(404, f"No route for {method} {path}")
+        except HTTPError as e:
+            await self.send_json(writer, e.status, {"error": str(e)}, e.headers, keep_alive=request["keep_alive"])
+            return request["keep_alive"]
+
+    async def post_summary(self, request: dict, writer: asyncio.StreamWriter) -> bool:
+        try:
+            payload = json.loads(request["body"] or b"{}")
+            url = str(payload["url"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'Body must be a JSON object with a "url"')
+        accepts_events = "text/event-stream" in request["headers"].get("accept", "")
+        mode = payload.get("mode") or ("stream" if accepts_events else "sync")
+        if mode not in MODES:
+            raise HTTPError(400, f"mode must be one of {', '.join(MODES)}")
+        use_cache = bool(payload.get("use_cache", True))
+        incremental = bool(payload.get("incremental", False))
+        objective = payload.get("objective")
+        if objective is not None and objective not in OBJECTIVES:
+            raise HTTPError(400, f"objective must be one of {', '.join(OBJECTIVES)}")
+        try:
+            extract_video_id(url)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        if mode == "job":
+            await self.send_json(writer, 202, await self.service.submit_job(url, use_cache, incremental, objective),
+                                 keep_alive=request["keep_alive"])
+            return request["keep_alive"]
+
+        self.service.admit()
+        if mode == "stream":
+            await self.stream_summary(writer, url, use_cache, incremental, objective)
+            return False
+
+        await self.service.acquire()
+        reporter = PipelineReporter()
+        try:
+            result = await self.service.summarize(url, reporter, use_cache, incremental, stream=False,
+                                                  objective=objective)
+        except ValueError as e:
+            raise HTTPError(422, str(e))
+        except Exception as e:
+            logger.exception("Summarization of %s failed", url)
+            raise HTTPError(500, str(e))
+        finally:
+            self.service.release()
+        if "too_long" in result:
+            handle = await self.service.submit_job(url, use_cache, incremental, objective)
+            handle["reason"] = f"Transcript of ~{result['too_long']:,} tokens is summarized as a background job"
+            await self.send_json(writer, 202, handle, keep_alive=request["keep_alive"])
+        elif result["summary"] is None:
+            raise HTTPError(500, reporter.last_error or "Summarization failed")
+        else:
+            await self.send_json(writer, 200, {"summary": result["summary"], "metadata": reporter.metadata},
+                                 keep_alive=request["keep_alive"])
+        return request["keep_alive"]
+
+    async def stream_summary(self, writer: asyncio.StreamWriter, url: str, use_cache: bool,
+                             incremental: bool, objective: str = None) -> None:
+        """Answer with Server-Sent Events while the summary is produced (caller has admitted the request)."""
+        try:
+            await self.start_events(writer)
+            await self.send_event(writer, "queued", {"waiting": self.service.waiting,
+                                                     "running": self.service.running})
+            acquire = asyncio.ensure_future(self.service.acquire())
+        except BaseException:
+            self.service.waiting -= 1
+            raise
+        try:
+            while not acquire.done():
+                done, _ = await asyncio.wait({acquire}, timeout=SSE_HEARTBEAT_SECONDS)
+                if not done:
+                    await self.send_comment(writer, "waiting for a slot")
+        except BaseException:
+            # Client went away while queued: give the slot back once it is granted
+            acquire.add_done_callback(lambda task: task.cancelled() or self.service.release())
+            raise
+
+        queue = asyncio.Queue()
+        reporter = EventReporter(asyncio.get_running_loop(), queue)
+        task = asyncio.ensure_future(self.service.summarize(url, reporter, use_cache, incremental, stream=True,
+                                                            objective=objective))
+        # The slot is held until the pipeline finishes, even if the client disconnects
+        task.add_done_callback(lambda _: self.service.release())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        while not task.done() or not queue.empty():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, task}, timeout=SSE_HEARTBEAT_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await self.send_event(writer, *getter.result())
+            else:
+                getter.cancel()
+                if not done:
+                    await self.send_comment(writer, "working")
+        try:
+            result = task.result()
+        except Exception as e:
+            await self.send_event(writer, "error", {"message": str(e)})
+            return
+        if "too_long" in result:
+            handle = await self.service.submit_job(url, use_cache, incremental, objective)
+            await self.send_event(writer, "job", handle)
+            await self.follow_job(writer, handle["job_id"])
+        elif result["summary"] is None:
+            await self.send_event(writer, "error", {"message": reporter.last_error or "Summarization failed"})
+        else:
+            await self.send_event(writer, "result", {"summary": result["summary"], "metadata": reporter.metadata})
+
+    async def job_route(self, request: dict, writer: asyncio.StreamWriter, job_id: str, events: bool) -> bool:
+        job = await self.service.store_call(job_store.get, job_id)
+        if job is None:
+            raise HTTPError(404, f"No job {job_id}")
+        if events and request["method"] == "GET":
+            await self.start_events(writer)
+            await self.follow_job(writer, job_id)
+            return False
+        if request["method"] == "GET":
+            await self.send_json(writer, 200, _public_job(job), keep_alive=request["keep_alive"])
+        elif request["method"] == "DELETE" and not events:
+            await self.service.store_call(job_store.cancel, job_id)
+            await self.send_json(writer, 202, {"job_id": job_id, "cancel_requested": True},
+                                 keep_alive=request["keep_alive"])
+        else:
+            raise HTTPError(405, "Use GET or DELETE")
+        return request["keep_alive"]
+
+    async def library_route(self, request: dict, writer: asyncio.StreamWriter, video_id: str = None) -> bool:
+        if video_id:
+            entry = await self.service.store_call(summary_library.get, video_id)
+            if entry is None:
+                raise HTTPError(404, f"No saved summary of {video_id}")
+            await self.send_json(writer, 200, entry, keep_alive=request["keep_alive"])
+            return request["keep_alive"]
+        query = request["query"].get("q", [""])[0]
+        try:
+            limit = min(MAX_LIBRARY_LIMIT, max(1, int(request["query"].get("limit", ["20"])[0])))
+            offset = max(0, int(request["query"].get("offset", ["0"])[0]))
+        except ValueError:
+            raise HTTPError(400, "limit and offset must be integers")
+        results = await self.service.store_call(summary_library.search, query, limit, offset)
+        total = await self.service.store_call(summary_library.count, query)
+        await self.send_json(writer, 200, {"query": query, "total": total, "results": results},
+                             keep_alive=request["keep_alive"])
+        return request["keep_alive"]
+
+    async def follow_job(self, writer: asyncio.StreamWriter, job_id: str) -> None:
+        """Relay a background job's events and partial summaries until it finishes."""
+        after_seq = 0
+        last_partial = None
+        idle = 0.0
+        while True:
+            for event in await self.service.store_call(job_store.events, job_id, after_seq):
+                after_seq = event["seq"]
+                await self.send_event(writer, "progress", {"level": event["level"], "message": event["message"]})
+                idle = 0.0
+            job = await self.service.store_call(job_store.get, job_id)
+            if job["partial"] and job["partial"] != last_partial:
+                last_partial = job["partial"]
+                await self.send_event(writer, "partial", last_partial)
+            if job["status"] not in ACTIVE_STATUSES:
+                if job["status"] == "done":
+                    await self.send_event(writer, "result", {"summary": job["result"], "metadata": job["metadata"]})
+                else:
+                    await self.send_event(writer, "error", {"message": job["error"] or job["status"],
+                                                            "status": job["status"]})
+                return
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            idle += JOB_POLL_SECONDS
+            if idle >= SSE_HEARTBEAT_SECONDS:
+                await self.send_comment(writer, job["status"])
+                idle = 0.0
+
+    @staticmethod
+    async def send_json(writer: asyncio.StreamWriter, status: int, payload: dict, headers: dict = None,
+                        keep_alive: bool = True) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", "Content-Type: application/json",
+                 f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    @staticmethod
+    async def start_events(writer: asyncio.StreamWriter) -> None:
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def send_event(writer: asyncio.StreamWriter, event: str, data: dict) -> None:
+        writer.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    @staticmethod
+    async def send_comment(writer: asyncio.StreamWriter, text: str) -> None:
+        # SSE comment lines keep proxies from closing an idle stream
+        writer.write(f": {text}\n\n".encode("utf-8"))
+        await writer.drain()
+
+
+async def serve(host: str, port: int, service: SummaryService) -> None:
+    server = await ApiServer(service).start(host, port)
+    logger.info("Summary API listening on http://%s:%s", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    settings = api_settings_from_env()
+    parser = argparse.ArgumentParser(description="Asynchronous HTTP API for YouTube video summaries.")
+    parser.add_argument("--host", default=settings["host"])
+    parser.add_argument("--port", type=int, default=settings["port"])
+    parser.add_argument("--max-concurrent", type=int, default=settings["max_concurrent"])
+    parser.add_argument("--max-queued", type=int, default=settings["max_queued"])
+    parser.add_argument("--sync-max-tokens", type=int, default=settings["sync_max_tokens"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    # Background jobs (long videos, mode "job") run on the same workers as the Streamlit app's
+    get_worker_pool()
+    service = SummaryService(args.max_concurrent, args.max_queued, args.sync_max_tokens)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
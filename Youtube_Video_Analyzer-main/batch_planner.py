@@ -0,0 +1,240 @@
+"""
+Per-video choice of chunk size and fan-in against a selectable objective.
+
+The largest chunk a call can take is fixed by the model's context window, the
+prompt, the output reserve and the tokens/minute quota (chunking.chunk_token_budget).
+Within that limit the planner tries smaller chunk sizes and fan-ins, plans the
+map-reduce tree for each candidate and keeps the best one for the objective:
+
+- "calls":  fewest Gemini calls (largest chunks; the default, kindest to quotas)
+- "time":   lowest predicted wall time - smaller chunks run in parallel, but
+            every call pays a fixed overhead, rate-limit pacing and 429 retries
+- "tokens": fewest input tokens (every call re-sends the prompt)
+
+Predicted time comes from rolling measurements of this process's Gemini calls:
+a least-squares fit of latency against input tokens, plus the share of
+attempts answered with 429, each costing a cooldown before the retry. Until
+enough calls have been measured the static estimate of summary_tree is used.
+"""
+import math
+import os
+import threading
+from collections import deque
+
+from quota_pool import COOLDOWN_BASE_SECONDS
+from rate_limiter import estimate_tokens
+from summary_tree import (
+    EST_BASE_SECONDS,
+    EST_INPUT_TOKENS_PER_SECOND,
+    SUMMARY_TOKENS,
+    plan_summary_tree,
+)
+
+
+OBJECTIVES = ("calls", "time", "tokens")
+DEFAULT_OBJECTIVE = "calls"
+DEFAULT_WINDOW = 200
+# Calls measured before the fitted latency model replaces the static estimate
+MIN_SAMPLES = 8
+DEFAULT_MIN_CHUNK_TOKENS = 2000
+# Candidate chunk sizes step down from the largest budget by this factor
+CHUNK_SIZE_STEP = math.sqrt(2)
+# chunk_segments fills chunks to about this share of the budget
+CHUNK_FILL = 0.95
+MAX_RATE_LIMIT_RATE = 0.9
+
+
+class CallStats:
+    """
+    Rolling latency-vs-input-size samples and 429 rate of Gemini calls.
+
+    Args:
+        window: Most recent calls (and attempts) kept for the estimates
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._attempts = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CallStats":
+        """
+        PLANNER_WINDOW - calls kept for the latency and 429 estimates (default 200)
+        """
+        return cls(int(os.getenv("PLANNER_WINDOW", DEFAULT_WINDOW)))
+
+    def record(self, input_tokens: int, seconds: float) -> None:
+        """Record one successful call."""
+        with self._lock:
+            self._latencies.append((input_tokens, seconds))
+            self._attempts.append(False)
+
+    def record_rate_limited(self) -> None:
+        """Record one attempt answered with 429."""
+        with self._lock:
+            self._attempts.append(True)
+
+    def latency_model(self) -> tuple:
+        """
+        Fit seconds = base + input_tokens * per_token over the recent calls.
+
+        Returns:
+            tuple: (base_seconds, seconds_per_token, samples); the static estimate
+                while fewer than MIN_SAMPLES calls have been measured
+        """
+        with self._lock:
+            samples = list(self._latencies)
+        default = (EST_BASE_SECONDS, 1.0 / EST_INPUT_TOKENS_PER_SECOND, len(samples))
+        if len(samples) < MIN_SAMPLES:
+            return default
+        n = len(samples)
+        mean_x = sum(x for x, _ in samples) / n
+        mean_y = sum(y for _, y in samples) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+        if var_x <= 0:
+            # Every call had the same size: only the overall latency is known
+            return max(0.0, mean_y - mean_x * default[1]), default[1], n
+        slope = max(0.0, sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x)
+        return max(0.0, mean_y - slope * mean_x), slope, n
+
+    def rate_limit_rate(self) -> float:
+        """Share of recent attempts answered with 429."""
+        with self._lock:
+            attempts = list(self._attempts)
+        return sum(attempts) / len(attempts) if attempts else 0.0
+
+    def call_seconds_fn(self):
+        """
+        Expected seconds of one call by input size, including 429 retries.
+
+        Each attempt fails with the measured 429 rate p, so a call takes 1 / (1 - p)
+        attempts on average and every failed one waits out a cooldown.
+        """
+        base, per_token, _ = self.latency_model()
+        rate = min(self.rate_limit_rate(), MAX_RATE_LIMIT_RATE)
+        retry_seconds = rate / (1.0 - rate) * (COOLDOWN_BASE_SECONDS + base)
+
+        def call_seconds(input_tokens: int) -> float:
+            return base + input_tokens * per_token + retry_seconds
+
+        return call_seconds
+
+    def snapshot(self) -> dict:
+        base, per_token, samples = self.latency_model()
+        return {
+            "base_seconds": round(base, 3),
+            "seconds_per_1k_tokens": round(per_token * 1000, 4),
+            "samples": samples,
+            "fitted": samples >= MIN_SAMPLES,
+            "rate_limit_rate": round(self.rate_limit_rate(), 3),
+        }
+
+
+def planner_settings_from_env() -> dict:
+    """
+    PLAN_OBJECTIVE       - default objective: calls, time or tokens (default calls)
+    PLAN_MIN_CHUNK_TOKENS - smallest chunk size the planner tries (default 2000)
+    """
+    objective = os.getenv("PLAN_OBJECTIVE", DEFAULT_OBJECTIVE)
+    return {
+        "objective": objective if objective in OBJECTIVES else DEFAULT_OBJECTIVE,
+        "min_chunk_tokens": int(os.getenv("PLAN_MIN_CHUNK_TOKENS", DEFAULT_MIN_CHUNK_TOKENS)),
+    }
+
+
+def candidate_chunk_sizes(total_tokens: int, max_chunk_tokens: int, min_chunk_tokens: int) -> list:
+    """
+    Chunk sizes worth planning, largest first: one per distinct chunk count.
+    """
+    sizes = []
+    counts = set()
+    size = max_chunk_tokens
+    while True:
+        count = max(1, math.ceil(total_tokens / (size * CHUNK_FILL))) if total_tokens > size else 1
+        if count not in counts:
+            counts.add(count)
+            sizes.append(int(size))
+        if size <= min_chunk_tokens:
+            break
+        size = max(min_chunk_tokens, size / CHUNK_SIZE_STEP)
+    return sizes
+
+
+def _score(plan: dict, objective: str) -> tuple:
+    calls, tokens, seconds = plan["total_calls"], plan["estimated_tokens"], plan["estimated_seconds"]
+    if objective == "time":
+        return seconds, calls, tokens
+    if objective == "tokens":
+        return tokens, calls, seconds
+    return calls, seconds, tokens
+
+
+def choose_plan(total_tokens: int, max_chunk_tokens: int, map_prompt: str, reduce_prompt: str,
+                objective: str = DEFAULT_OBJECTIVE, fan_in: int = 10, max_depth: int = 3,
+                call_budget: int = 8, token_budget: int = None, concurrency: int = 4,
+                requests_per_minute: float = 10, tokens_per_minute: float = None,
+                tokens_available: float = None, call_seconds=None,
+                min_chunk_tokens: int = DEFAULT_MIN_CHUNK_TOKENS) -> dict:
+    """
+    Pick the chunk size and fan-in that best serve an objective.
+
+    Every candidate chunk size is planned with fan-ins from 2 up to `fan_in`,
+    assuming evenly filled chunks; candidates over the call or token budget are
+    skipped. Ties keep the larger chunks and fan-in, so the default objective
+    plans exactly like a fixed largest-chunk split.
+
+    Args:
+        total_tokens: Estimated tokens of the whole transcript
+        max_chunk_tokens: Largest chunk one call can take (chunk_token_budget)
+        map_prompt / reduce_prompt: Prompts sent with chunks and with merged summaries
+        objective: "calls", "time" or "tokens"
+        fan_in: Largest fan-in to try (SUMMARY_TREE_FAN_IN)
+        max_depth / call_budget / token_budget / concurrency / requests_per_minute /
+            tokens_per_minute / tokens_available: As for plan_summary_tree
+        call_seconds: Predicted seconds of one call by input tokens (CallStats.call_seconds_fn)
+        min_chunk_tokens: Smallest chunk size to try
+
+    Returns:
+        dict: objective, chunk_tokens, fan_in, predicted (calls, tokens, seconds) and
+              candidates (number of plans compared); chunk_tokens is max_chunk_tokens
+              when no candidate fits the budget
+    """
+    objective = objective if objective in OBJECTIVES else DEFAULT_OBJECTIVE
+    min_chunk_tokens = max(1, min(min_chunk_tokens, max_chunk_tokens))
+    # A reduce call must fit its summaries in the context as well
+    reduce_limit = max(2, (max_chunk_tokens + estimate_tokens(map_prompt) - estimate_tokens(reduce_prompt))
+                       // SUMMARY_TOKENS)
+    fan_ins = range(min(max(2, fan_in), reduce_limit), 1, -1)
+
+    best, best_score, compared = None, None, 0
+    for size in candidate_chunk_sizes(total_tokens, max_chunk_tokens, min_chunk_tokens):
+        count = max(1, math.ceil(total_tokens / (size * CHUNK_FILL))) if total_tokens > size else 1
+        chunk_tokens = [math.ceil(total_tokens / count)] * count
+        for fan in fan_ins:
+            plan = plan_summary_tree(chunk_tokens, map_prompt, reduce_prompt, fan_in=fan, max_depth=max_depth,
+                                     call_budget=call_budget, token_budget=token_budget, concurrency=concurrency,
+                                     requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                                     tokens_available=tokens_available, call_seconds=call_seconds)
+            compared += 1
+            if not plan["within_budget"]:
+                continue
+            score = _score(plan, objective)
+            if best_score is None or score < best_score:
+                best, best_score = (size, fan, plan), score
+            if count == 1:
+                # A single chunk has no reduce level: fan-in does not matter
+                break
+
+    if best is None:
+        return {"objective": objective, "chunk_tokens": max_chunk_tokens, "fan_in": fan_in, "predicted": None,
+                "candidates": compared}
+    size, fan, plan = best
+    return {
+        "objective": objective,
+        "chunk_tokens": size,
+        "fan_in": fan,
+        "predicted": {"calls": plan["total_calls"], "tokens": plan["estimated_tokens"],
+                      "seconds": plan["estimated_seconds"]},
+        "candidates": compared,
+    }
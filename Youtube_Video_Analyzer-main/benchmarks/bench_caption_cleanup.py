@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: caption clean-up on rolling auto-generated captions.
+
+Turns synthetic caption snippets into YouTube-style rolling captions (each
+snippet repeats the tail of the previous one, some lines are shown twice,
+[Music]/[Applause] markers are sprinkled in), then reports clean-up wall time,
+snippets per second, and the bytes, tokens and chunks removed.
+
+Usage:
+    python benchmarks/bench_caption_cleanup.py [--hours 100] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chunking import best_of, synthetic_snippets  # noqa: E402
+from caption_cleanup import clean_snippets  # noqa: E402
+from chunking import Segment, chunk_segments  # noqa: E402
+
+
+def rolling_captions(snippets: list, seed: int = 11) -> list:
+    """Re-emit snippets the way auto-captions roll: overlapping tails, repeats and markers."""
+    rng = random.Random(seed)
+    rolled = []
+    previous = []
+    for snippet in snippets:
+        words = snippet["text"].split()
+        carried = previous[-rng.randint(1, 4):] if previous and rng.random() < 0.7 else []
+        text = " ".join(carried + words)
+        if rng.random() < 0.03:
+            text = "[Music] " + text
+        # Carried words were spoken earlier, so the line starts while the previous one is shown
+        lead = len(carried) / 2.5
+        rolled.append({**snippet, "text": text, "start": round(snippet["start"] - lead, 2),
+                       "duration": round(snippet["duration"] + lead, 2)})
+        if rng.random() < 0.04:
+            rolled.append({**snippet, "text": text, "start": snippet["start"] + 0.5})
+        if rng.random() < 0.01:
+            rolled.append({"text": "[Applause]", "start": snippet["start"], "duration": 1.0})
+        previous = words
+    return rolled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=100.0, help="Synthetic transcript length (100h is ~100k snippets)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-tokens", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    raw = rolling_captions(synthetic_snippets(args.hours, punctuated=False))
+    seconds, (cleaned, stats) = best_of(args.repeat, lambda: clean_snippets(raw))
+
+    def chunks(snippets):
+        segments = (Segment(s["text"], s["start"], s["duration"]) for s in snippets)
+        return len(chunk_segments(segments, args.chunk_tokens))
+
+    report = {
+        "hours": args.hours,
+        "seconds": round(seconds, 3),
+        "snippets_per_second": int(len(raw) / seconds),
+        **stats,
+        "chunks_before": chunks(raw),
+        "chunks_after": chunks(cleaned),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f"{key:<24} {value:,}" if isinstance(value, int) else f"{key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
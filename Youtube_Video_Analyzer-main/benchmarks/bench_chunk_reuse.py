@@ -0,0 +1,133 @@
+"""
+Benchmark: Gemini calls saved by cross-video chunk reuse on overlapping videos.
+
+Builds one channel's worth of synthetic videos that share content - an
+original, a re-upload with a new intro and different caption errors, a
+compilation of clips from earlier videos, and a series part that opens with
+a recap - and summarizes them in order through the pipeline with the fake
+backend, once with the shared chunk store and once without. Reports calls
+per video, exact and near-duplicate chunk matches, and lookup overhead.
+
+Usage:
+    python benchmarks/bench_chunk_reuse.py [--hours 2] [--chunk-tokens 5000] [--similarity 0.7] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS_PER_SECOND = 2.5
+
+
+def speech(rng: random.Random, seconds: float, vocabulary: list) -> list:
+    """Random words for `seconds` of speech."""
+    return [rng.choice(vocabulary) for _ in range(int(seconds * WORDS_PER_SECOND))]
+
+
+def caption_noise(rng: random.Random, words: list, error_rate: float) -> list:
+    """Another caption track of the same speech: a fraction of the words is misheard."""
+    return [word[:-1] + "z" if rng.random() < error_rate else word for word in words]
+
+
+def to_snippets(words: list, words_per_snippet: int = 10) -> list:
+    snippets = []
+    for i in range(0, len(words), words_per_snippet):
+        snippets.append({"text": " ".join(words[i:i + words_per_snippet]), "start": i / WORDS_PER_SECOND,
+                         "duration": words_per_snippet / WORDS_PER_SECOND})
+    return snippets
+
+
+def channel_videos(hours: float, error_rate: float, seed: int = 5) -> list:
+    """(name, words) of overlapping videos from one channel, in upload order."""
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+                  for _ in range(5000)]
+    part1 = speech(rng, hours * 3600, vocabulary)
+    part2_new = speech(rng, hours * 3600, vocabulary)
+    clip = int(20 * 60 * WORDS_PER_SECOND)
+    return [
+        ("part 1", part1),
+        ("part 1 re-upload", speech(rng, 15, vocabulary) + caption_noise(rng, part1, error_rate)),
+        ("part 2 (with recap)", part1[:clip // 2] + part2_new),
+        ("best-of compilation", part1[:clip] + part2_new[clip:2 * clip] + part1[-clip:]),
+        ("unrelated video", speech(rng, hours * 3600, vocabulary)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=2.0, help="Length of each series part")
+    parser.add_argument("--chunk-tokens", type=int, default=5000)
+    parser.add_argument("--similarity", type=float, default=0.7, help="CHUNK_REUSE_SIMILARITY")
+    parser.add_argument("--caption-errors", type=float, default=0.03,
+                        help="Fraction of words that differ in the re-upload's captions")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "CACHE_DIR": tempfile.mkdtemp(prefix="yt-chunk-reuse-"),
+        "LLM_BACKEND": "fake",
+        "CHUNK_TOKENS": str(args.chunk_tokens),
+        "CHUNK_REUSE_SIMILARITY": str(args.similarity),
+        "MAX_API_CALLS": "1000",
+        "FAKE_LLM_LATENCY_MEAN": "0",
+        "GEMINI_RPM": os.getenv("GEMINI_RPM", "100000"),
+        "GEMINI_TPM": os.getenv("GEMINI_TPM", "1000000000"),
+    })
+    from compact_transcript import CompactTranscript
+    from pipeline import PipelineReporter, chunk_and_summarize, chunk_store
+
+    results = []
+    for name, words in channel_videos(args.hours, args.caption_errors):
+        transcript = CompactTranscript.from_snippets(to_snippets(words))
+        row = {"video": name}
+        for reuse in (False, True):
+            reporter = PipelineReporter()
+            started = time.perf_counter()
+            chunk_and_summarize(transcript, reporter, resume=False, reuse=reuse)
+            seconds = time.perf_counter() - started
+            meta = reporter.metadata
+            if reuse:
+                reuse_info = meta["chunk_reuse"]
+                lookup = reporter.trace.summary().get("chunk_reuse", {})
+                row.update({
+                    "chunks": meta["num_chunks"],
+                    "calls_with_reuse": meta["api_calls_used"],
+                    "exact_chunks": reuse_info["exact"],
+                    "near_duplicate_chunks": reuse_info["near_duplicate"],
+                    "reduce_reused": reuse_info["reduce"],
+                    "lookup_seconds": lookup.get("total_seconds", 0.0),
+                    "seconds_with_reuse": round(seconds, 3),
+                })
+            else:
+                row["calls_without_reuse"] = meta["api_calls_used"]
+        results.append(row)
+
+    total_without = sum(r["calls_without_reuse"] for r in results)
+    total_with = sum(r["calls_with_reuse"] for r in results)
+    summary = {
+        "calls_without_reuse": total_without,
+        "calls_with_reuse": total_with,
+        "calls_saved_fraction": round(1 - total_with / total_without, 3) if total_without else 0.0,
+        "store": chunk_store.stats(),
+    }
+    if args.json:
+        print(json.dumps({"videos": results, "total": summary}, indent=2))
+        return
+    print(f"{'video':<22} {'chunks':>6} {'calls':>11} {'exact':>5} {'near':>5} {'reduce':>6} {'lookup s':>8}")
+    for r in results:
+        print(f"{r['video']:<22} {r['chunks']:>6} {r['calls_without_reuse']:>4} → {r['calls_with_reuse']:<4} "
+              f"{r['exact_chunks']:>5} {r['near_duplicate_chunks']:>5} {r['reduce_reused']:>6} "
+              f"{r['lookup_seconds']:>8}")
+    print(f"total calls {total_without} → {total_with} ({summary['calls_saved_fraction']:.0%} saved); "
+          f"store: {summary['store']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Micro-benchmark: legacy character splitter vs. the token-aware chunker.
+
+Runs on synthetic 10-hour transcripts, with and without punctuation, and
+reports wall time, chunk counts, budget fill and the largest chunk produced.
+
+Usage:
+    python benchmarks/bench_chunking.py [--hours 10] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunking import Segment, chunk_segments, chunk_text  # noqa: E402
+from rate_limiter import estimate_tokens  # noqa: E402
+
+
+def legacy_split(text: str, chunk_size: int = 30000) -> list:
+    """The original splitter from chunk_and_summarize, kept verbatim for comparison."""
+    chunks = []
+    current_chunk = ""
+    sentences = text.split(". ")
+
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) + 2 <= chunk_size:
+            current_chunk += sentence + ". "
+        else:
+            if current_chunk:
+                chunks.append(current_chunk)
+            current_chunk = sentence + ". "
+
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def synthetic_snippets(hours: float, punctuated: bool, seed: int = 7) -> list:
+    """Caption-like snippets: ~150 words/minute, 6-12 words per snippet, occasional pauses."""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    snippets = []
+    t = 0.0
+    total_words = int(hours * 60 * 150)
+    produced = 0
+    while produced < total_words:
+        n = rng.randint(6, 12)
+        words = [rng.choice(vocabulary) for _ in range(n)]
+        if punctuated and rng.random() < 0.4:
+            words[-1] += "."
+        duration = n / 2.5
+        snippets.append({"text": " ".join(words), "start": round(t, 2), "duration": round(duration, 2)})
+        t += duration + (rng.uniform(2, 5) if rng.random() < 0.02 else 0.1)
+        produced += n
+    return snippets
+
+
+def best_of(repeat: int, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def describe(chunk_texts: list, budget_tokens: int) -> dict:
+    sizes = [estimate_tokens(c) for c in chunk_texts]
+    return {
+        "chunks": len(sizes),
+        "max_chunk_tokens": max(sizes),
+        "mean_fill": round(sum(sizes) / (len(sizes) * budget_tokens), 3),
+        "over_budget_chunks": sum(1 for s in sizes if s > budget_tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=200000, help="Token budget for the full-context run")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    legacy_budget = estimate_tokens("x" * 30000)
+    results = []
+    for punctuated in (True, False):
+        snippets = synthetic_snippets(args.hours, punctuated)
+        text = " ".join(s["text"] for s in snippets)
+        segments = [Segment(s["text"], s["start"], s["duration"]) for s in snippets]
+        label = "punctuated" if punctuated else "no-punctuation"
+
+        runs = [
+            ("legacy 30k chars", legacy_budget, lambda: legacy_split(text)),
+            ("chunk_text same budget", legacy_budget,
+             lambda: [c.text for c in chunk_text(text, legacy_budget)]),
+            ("chunk_segments same budget", legacy_budget,
+             lambda: [c.text for c in chunk_segments(segments, legacy_budget)]),
+            ("chunk_segments full budget", args.budget,
+             lambda: [c.text for c in chunk_segments(segments, args.budget)]),
+        ]
+        for name, budget, fn in runs:
+            seconds, chunks = best_of(args.repeat, fn)
+            results.append({
+                "transcript": label,
+                "chars": len(text),
+                "splitter": name,
+                "budget_tokens": budget,
+                "seconds": round(seconds, 4),
+                **describe(chunks, budget),
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'transcript':<15} {'splitter':<28} {'seconds':>8} {'chunks':>7} {'fill':>6} {'max tok':>9} {'over':>5}")
+    for r in results:
+        print(f"{r['transcript']:<15} {r['splitter']:<28} {r['seconds']:>8.4f} {r['chunks']:>7} "
+              f"{r['mean_fill']:>6.2f} {r['max_chunk_tokens']:>9} {r['over_budget_chunks']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark: extractive pre-compression - tokens and calls saved, and summary quality.
+
+Builds lecture-like synthetic transcripts (topic sections plus filler, sponsor
+reads and recaps) or loads real ones, compresses each at several ratios, and
+reports per video the transcript tokens and planned Gemini calls before and
+after. With --summarize, both versions are summarized through the pipeline
+and the compressed summary is scored against the uncompressed one (content-word
+ROUGE-1 F1). The default fake backend only exercises the plumbing; use
+--backend gemini (GOOGLE_API_KEY set) for a real quality comparison.
+
+Usage:
+    python benchmarks/bench_extractive.py [--hours 1 3] [--ratios 0.3 0.5] [--json]
+    python benchmarks/bench_extractive.py --snippets cached_transcript.json --summarize --backend gemini
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_CONTENT_WORD = re.compile(r"[a-z][a-z0-9']{2,}")
+FILLER_LINES = [
+    "um so yeah you know what I mean",
+    "okay so let's just jump right back into it",
+    "and uh basically that's kind of the thing right",
+]
+SPONSOR_LINES = [
+    "this video is sponsored by nordvpn go to the link in the description to get a discount",
+    "use code learn twenty to get twenty percent off your first order",
+    "thanks again to our sponsor for supporting the channel",
+]
+
+
+def synthetic_lecture(hours: float, topics: int = 8, seed: int = 3) -> tuple:
+    """
+    Caption snippets for a lecture of `topics` sections, with filler, sponsor reads and recaps.
+
+    Returns:
+        tuple: (snippets, topic vocabularies)
+    """
+    rng = random.Random(seed)
+    vocabularies = [[f"t{t}term{i}" for i in range(40)] for t in range(topics)]
+    snippets = []
+    t = 0.0
+    total_sentences = int(hours * 60 * 150 / 12)
+    for k in range(total_sentences):
+        section = min(topics - 1, k * topics // total_sentences)
+        roll = rng.random()
+        if k % 400 in range(0, 6):
+            words = SPONSOR_LINES[k % len(SPONSOR_LINES)].split()
+        elif roll < 0.15:
+            words = rng.choice(FILLER_LINES).split()
+        elif roll < 0.2 and section:
+            # Recap of an earlier section
+            words = ["as", "we", "saw", "earlier"] + rng.sample(vocabularies[rng.randrange(section)], 6)
+        else:
+            words = rng.sample(vocabularies[section], 7) + rng.choice([["and", "so", "on"], ["which", "matters"]])
+        text = " ".join(words) + "."
+        duration = len(words) / 2.5
+        snippets.append({"text": text, "start": round(t, 2), "duration": round(duration, 2)})
+        t += duration + 0.2
+    return snippets, vocabularies
+
+
+def content_words(text: str) -> dict:
+    counts = {}
+    for word in _CONTENT_WORD.findall(text.lower()):
+        counts[word] = counts.get(word, 0) + 1
+    return counts
+
+
+def rouge1_f1(candidate: str, reference: str) -> float:
+    """Unigram F1 over content words (no stemming)."""
+    cand, ref = content_words(candidate), content_words(reference)
+    overlap = sum(min(n, ref.get(word, 0)) for word, n in cand.items())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(cand.values())
+    recall = overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def summary_text(summary: dict) -> str:
+    return " ".join([summary.get("title", ""), summary.get("overview", ""),
+                     *summary.get("key_points", []), summary.get("conclusion", "")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, nargs="+", default=[0.5, 1.0, 3.0],
+                        help="Lengths of the synthetic lectures")
+    parser.add_argument("--snippets", nargs="*", default=[],
+                        help="JSON files of caption snippets [{text, start, duration}] to use instead")
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.3, 0.5])
+    parser.add_argument("--method", choices=("textrank", "tfidf"), default="textrank")
+    parser.add_argument("--chunk-tokens", type=int, default=5000, help="Per-call chunk budget for the plan")
+    parser.add_argument("--summarize", action="store_true", help="Also summarize and compare quality")
+    parser.add_argument("--backend", choices=("fake", "gemini"), default="fake")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "CACHE_DIR": tempfile.mkdtemp(prefix="yt-extractive-"),
+        "LLM_BACKEND": args.backend,
+        "CHUNK_TOKENS": str(args.chunk_tokens),
+        "MAX_API_CALLS": "1000",
+        "FAKE_LLM_LATENCY_MEAN": "0",
+        "GEMINI_RPM": os.getenv("GEMINI_RPM", "100000"),
+        "GEMINI_TPM": os.getenv("GEMINI_TPM", "1000000000"),
+    })
+    from chunking import chunk_segments
+    from compact_transcript import CompactTranscript
+    from extractive import compress_transcript
+    from pipeline import PipelineReporter, chunk_and_summarize, final_prompt, prompt
+    from summary_tree import plan_summary_tree, tree_settings_from_env
+
+    videos = []
+    for path in args.snippets:
+        with open(path, encoding="utf-8") as f:
+            videos.append((os.path.basename(path), json.load(f), None))
+    if not args.snippets:
+        for hours in args.hours:
+            snippets, vocabularies = synthetic_lecture(hours)
+            videos.append((f"lecture {hours:g}h", snippets, vocabularies))
+
+    settings = tree_settings_from_env()
+
+    def planned_calls(transcript):
+        chunks = chunk_segments(transcript.segments(), args.chunk_tokens)
+        plan = plan_summary_tree([c.tokens for c in chunks], prompt, final_prompt,
+                                 fan_in=settings["fan_in"], max_depth=settings["max_depth"], call_budget=1000)
+        return len(chunks), plan["total_calls"]
+
+    def summarize(transcript):
+        reporter = PipelineReporter()
+        summary = chunk_and_summarize(transcript, reporter, resume=False)
+        return summary_text(summary) if summary else ""
+
+    results = []
+    for name, snippets, vocabularies in videos:
+        full = CompactTranscript.from_snippets(snippets)
+        full_chunks, full_calls = planned_calls(full)
+        reference = summarize(full) if args.summarize else None
+        for ratio in args.ratios:
+            started = time.perf_counter()
+            compressed, stats = compress_transcript(full, ratio=ratio, method=args.method)
+            seconds = time.perf_counter() - started
+            chunks, calls = planned_calls(compressed)
+            row = {
+                "video": name,
+                "ratio": ratio,
+                "method": stats["method"],
+                "backend": stats["backend"],
+                "compress_seconds": round(seconds, 3),
+                "sentences": stats["sentences"],
+                "kept_sentences": stats["kept_sentences"],
+                "tokens_before": stats["input_tokens"],
+                "tokens_after": stats["output_tokens"],
+                "tokens_saved": stats["input_tokens"] - stats["output_tokens"],
+                "chunks_before": full_chunks,
+                "chunks_after": chunks,
+                "calls_before": full_calls,
+                "calls_after": calls,
+                "calls_saved": full_calls - calls,
+            }
+            kept = compressed.text.lower()
+            row["sponsor_lines_kept"] = sum(kept.count(line.lower()) for line in SPONSOR_LINES)
+            if vocabularies:
+                # A topic counts as covered if at least a quarter of its terms survive
+                row["topic_coverage"] = round(
+                    sum(1 for vocab in vocabularies if sum(term in kept for term in vocab) >= len(vocab) / 4)
+                    / len(vocabularies), 2)
+            if args.summarize:
+                row["summary_rouge1_f1"] = round(rouge1_f1(summarize(compressed), reference), 3)
+            results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'video':<14} {'ratio':>5} {'sec':>6} {'tokens':>17} {'calls':>9} {'sponsor':>7} "
+          f"{'topics':>6} {'rouge1':>6}")
+    for r in results:
+        print(f"{r['video']:<14} {r['ratio']:>5.2f} {r['compress_seconds']:>6.3f} "
+              f"{r['tokens_before']:>8,}→{r['tokens_after']:<8,} {r['calls_before']:>4}→{r['calls_after']:<4} "
+              f"{r['sponsor_lines_kept']:>7} {r.get('topic_coverage', '-'):>6} {r.get('summary_rouge1_f1', '-'):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: summary library writes, full-text search, lookups and bulk exports.
+
+Fills a fresh library with synthetic summaries (topic words mixed into filler
+vocabulary), then times FTS5 searches of several query shapes against a
+LIKE scan over the same rows, single-video lookups, and JSONL / Parquet
+exports of the whole library.
+
+Usage:
+    python benchmarks/bench_library.py [--entries 5000] [--repeat 50] [--json]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summary_library import SummaryLibrary, pa  # noqa: E402
+
+TOPICS = ["python", "kubernetes", "sourdough", "marathon", "inflation", "photosynthesis", "chess", "guitar",
+          "volcano", "negotiation", "rate limits", "machine learning"]
+QUERIES = {
+    "word": "kubernetes",
+    "phrase": '"machine learning"',
+    "prefix": "photo*",
+    "or": "chess OR guitar",
+    "field": "title:volcano",
+    "plain words": "rate limit",
+}
+
+
+def synthetic_summary(rng: random.Random, vocabulary: list) -> dict:
+    topics = rng.sample(TOPICS, 2)
+
+    def sentence(words):
+        picked = [rng.choice(vocabulary) for _ in range(words)]
+        picked.insert(rng.randrange(len(picked)), rng.choice(topics))
+        return " ".join(picked).capitalize() + "."
+
+    return {
+        "title": f"{topics[0].title()} {' '.join(rng.choice(vocabulary) for _ in range(4))}",
+        "overview": " ".join(sentence(18) for _ in range(4)),
+        "key_points": [sentence(12) for _ in range(rng.randint(4, 8))],
+        "conclusion": sentence(25),
+        "key_point_timestamps": [round(rng.uniform(0, 3600), 1) for _ in range(4)],
+    }
+
+
+def timings(repeat: int, fn) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {"p50_ms": round(samples[len(samples) // 2], 3), "p95_ms": round(samples[int(len(samples) * 0.95)], 3),
+            "result": result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vocabulary = [f"term{i}" for i in range(3000)]
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-library-"), "library.sqlite3")
+    library = SummaryLibrary(path)
+    started = time.perf_counter()
+    for i in range(args.entries):
+        library.put(f"video{i:06d}", synthetic_summary(rng, vocabulary), "gemini-2.5-flash",
+                    {"transcript_chars": rng.randint(10000, 500000), "chunk_time_spans": [[0.0, 3600.0]]})
+    put_seconds = time.perf_counter() - started
+
+    results = {"entries": args.entries, "puts_per_second": round(args.entries / put_seconds),
+               "database_mb": round(library.stats()["size_bytes"] / 2**20, 2), "search": {}}
+    conn = sqlite3.connect(path)
+    for name, query in QUERIES.items():
+        search = timings(args.repeat, lambda: library.search(query, limit=20))
+        # Finding every match without the index: a substring scan of all four fields
+        term = f"%{query.strip(chr(34)).split()[0].rstrip('*').split(':')[-1]}%"
+        scan = timings(max(3, args.repeat // 10), lambda: conn.execute(
+            "SELECT COUNT(*) FROM library WHERE title LIKE ?1 OR overview LIKE ?1 OR key_points LIKE ?1 "
+            "OR conclusion LIKE ?1", (term,)).fetchone())
+        results["search"][name] = {"query": query, "matches": library.count(query),
+                                   "p50_ms": search["p50_ms"], "p95_ms": search["p95_ms"],
+                                   "like_scan_p50_ms": scan["p50_ms"]}
+    conn.close()
+    get = timings(args.repeat, lambda: library.get(f"video{rng.randrange(args.entries):06d}"))
+    results["get"] = {"p50_ms": get["p50_ms"], "p95_ms": get["p95_ms"]}
+
+    exports = {}
+    for fmt in ("jsonl", "parquet"):
+        if fmt == "parquet" and pa is None:
+            continue
+        buffer = io.BytesIO()
+        started = time.perf_counter()
+        written = library.export(buffer, fmt)
+        seconds = time.perf_counter() - started
+        exports[fmt] = {"rows": written, "seconds": round(seconds, 3), "rows_per_second": round(written / seconds),
+                        "mb": round(len(buffer.getvalue()) / 2**20, 2)}
+    results["export"] = exports
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['entries']:,} summaries, {results['puts_per_second']:,} puts/s, "
+          f"{results['database_mb']} MB database")
+    print(f"{'search':<12} {'query':<20} {'matches':>8} {'p50 ms':>8} {'p95 ms':>8} {'LIKE ms':>8}")
+    for name, row in results["search"].items():
+        print(f"{name:<12} {row['query']:<20} {row['matches']:>8} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['like_scan_p50_ms']:>8.2f}")
+    print(f"get by video id: p50 {results['get']['p50_ms']:.2f} ms, p95 {results['get']['p95_ms']:.2f} ms")
+    for fmt, row in exports.items():
+        print(f"export {fmt:<8} {row['rows']:,} rows in {row['seconds']:.2f}s "
+              f"({row['rows_per_second']:,} rows/s, {row['mb']} MB)")
+
+
+if __name__ == "__main__":
+    main()
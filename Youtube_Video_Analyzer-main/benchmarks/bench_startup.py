@@ -0,0 +1,134 @@
+"""
+Benchmark: cold start - import time and first-request latency of a fresh process.
+
+Each measurement runs in a new interpreter, the way an autoscaled container
+or a freshly started job worker begins:
+
+- import: `import job_queue` (pulls in the whole pipeline, as a worker does)
+- warm-up: pipeline.warm_up() - only in the "warm" mode
+- first / second request: summarize_video on a video whose captions are
+  already in the transcript store (so no YouTube access is needed); the two
+  requests use different videos, so both are summary-cache misses
+
+It also reports, each in its own fresh process, what importing the heavy
+modules eagerly would cost and what building a Gemini client and model costs
+(the part of a first Gemini request that warm-up removes).
+
+The default fake backend keeps this offline; use --backend gemini with
+GOOGLE_API_KEY set to include real network latency in the first request.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--backend fake] [--json]
+"""
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "youtube_transcript_api", "requests")
+
+
+def synthetic_snippets(minutes: float, seed: int) -> list:
+    words = [f"topic{seed}word{i}" for i in range(200)]
+    return [
+        {"text": " ".join(words[(i * 7 + j) % len(words)] for j in range(10)), "start": i * 4.0, "duration": 4.0}
+        for i in range(int(minutes * 15))
+    ]
+
+
+def child_requests(warm: bool) -> dict:
+    started = time.perf_counter()
+    importlib.import_module("job_queue")
+    import pipeline
+    timings = {"import_seconds": time.perf_counter() - started}
+
+    started = time.perf_counter()
+    if warm:
+        pipeline.warm_up()
+    timings["warm_up_seconds"] = time.perf_counter() - started
+
+    for name, video_id in (("first_request_seconds", "benchvideo1"), ("second_request_seconds", "benchvideo2")):
+        pipeline.transcript_store.save(video_id, "en", False, synthetic_snippets(10, seed=len(name)))
+        started = time.perf_counter()
+        summary = pipeline.summarize_video(video_id, pipeline.PipelineReporter())
+        timings[name] = time.perf_counter() - started
+        if summary is None:
+            raise SystemExit(f"{name}: summarization failed")
+    return timings
+
+
+def child_eager_imports() -> dict:
+    started = time.perf_counter()
+    for name in HEAVY_MODULES:
+        __import__(name)
+    return {"eager_heavy_imports_seconds": time.perf_counter() - started}
+
+
+def child_gemini_client() -> dict:
+    from llm_backends import get_backend
+
+    started = time.perf_counter()
+    get_backend("gemini-2.5-flash", name="gemini", api_key="bench-key").warm_up()
+    return {"gemini_client_seconds": time.perf_counter() - started}
+
+
+def run_child(mode: str, env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per mode (medians are reported)")
+    parser.add_argument("--backend", choices=("fake", "gemini", "http"), default="fake")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        import warnings
+        warnings.simplefilter("ignore")
+        runners = {"cold": lambda: child_requests(False), "warm": lambda: child_requests(True),
+                   "eager": child_eager_imports, "gemini": child_gemini_client}
+        print(json.dumps(runners[args.child]()))
+        return
+
+    results = {}
+    for mode in ("cold", "warm", "eager", "gemini"):
+        if mode == "gemini" and importlib.util.find_spec("google") is None:
+            continue
+        runs = []
+        for _ in range(args.repeat):
+            env = {**os.environ, "CACHE_DIR": tempfile.mkdtemp(prefix="yt-startup-"), "LLM_BACKEND": args.backend,
+                   "FAKE_LLM_LATENCY_MEAN": "0", "METRICS_PORT": "0", "CHUNK_TOKENS": "2000",
+                   "JOB_WORKERS": "0"}
+            runs.append(run_child(mode, env))
+        results[mode] = {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for mode, values in results.items():
+        print(f"{mode:<7} " + "  ".join(f"{key}={value}" for key, value in values.items()))
+    if "cold" in results and "warm" in results:
+        cold, warm = results["cold"], results["warm"]
+        print(f"first request: {cold['first_request_seconds']}s cold, {warm['first_request_seconds']}s after a "
+              f"{warm['warm_up_seconds']}s warm-up; import {cold['import_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
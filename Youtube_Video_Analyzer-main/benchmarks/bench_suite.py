@@ -0,0 +1,373 @@
+"""
+Benchmark suite: the whole pipeline offline, as JSON, checked against a stored baseline.
+
+Everything runs on synthetic transcripts (1 minute to 12 hours, with and
+without punctuation) behind a simulated transcript source and the fake LLM
+backend, so runs are reproducible and free. Measured:
+
+- chunking: chunk_segments throughput (best of --repeat timed runs) on each transcript
+- json: parse_json_response on clean, fenced and repairable responses, format_json_summary
+- memory: tracemalloc peak of chunk_and_summarize on the longest transcript, in memory
+  and streamed from the transcript store, and process max RSS
+- e2e: summarize_video latency percentiles, throughput and Gemini calls with --users
+  concurrent simulated users, each fetching captions through the simulated source
+
+Every metric records its unit and whether lower or higher is better. With
+--baseline, each metric is compared to the stored run and the process exits
+with status 1 if any is worse by more than --threshold (call and chunk counts
+must match exactly). Timings are machine-specific: record the baseline on the
+machine that runs the comparison.
+
+Usage:
+    python benchmarks/bench_suite.py --profile quick --output results.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --threshold 0.25
+    python benchmarks/bench_suite.py --write-baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chunking import synthetic_snippets  # noqa: E402
+from load_test_pipeline import percentile  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+PROFILES = {
+    "quick": {"minutes": [1, 10, 60], "e2e_minutes": [10, 60], "users": 4, "videos_per_user": 2, "repeat": 3},
+    "full": {"minutes": [1, 10, 60, 180, 720], "e2e_minutes": [10, 60, 180], "users": 16, "videos_per_user": 3,
+             "repeat": 5},
+}
+
+
+def metric(value: float, unit: str, better: str = "lower", exact: bool = False) -> dict:
+    result = {"value": value, "unit": unit, "better": better}
+    if exact:
+        result["exact"] = True
+    return result
+
+
+def duration_label(minutes: float) -> str:
+    return f"{minutes // 60:g}h" if minutes >= 60 else f"{minutes:g}m"
+
+
+class _SimulatedTrack:
+    def __init__(self, source, video_id):
+        self.source = source
+        self.video_id = video_id
+        self.language_code = "en"
+        self.is_generated = True
+
+    def fetch(self):
+        time.sleep(self.source.latency)
+        return self
+
+    def to_raw_data(self):
+        return self.source.snippets(self.video_id)
+
+
+class SimulatedTranscriptSource:
+    """
+    Stands in for the youtube_transcript_api module: listing and fetching a
+    track each sleep for `latency` seconds, and every video id maps to a
+    deterministic synthetic transcript of the given length.
+
+    Args:
+        latency: Seconds per simulated YouTube request
+        minutes: Video id -> transcript length in minutes
+    """
+
+    def __init__(self, latency: float, minutes: dict):
+        self.latency = latency
+        self.minutes = minutes
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def snippets(self, video_id: str) -> list:
+        return synthetic_snippets(self.minutes[video_id] / 60, punctuated=int(video_id[3:]) % 2 == 0,
+                                  seed=int(video_id[3:]))
+
+    # youtube_transcript_api.YouTubeTranscriptApi(http_client=...) returns the source itself
+    def YouTubeTranscriptApi(self, http_client=None):
+        return self
+
+    def list(self, video_id: str) -> list:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        return [_SimulatedTrack(self, video_id)]
+
+
+def bench_chunking(profile: dict) -> dict:
+    from chunking import chunk_segments, chunk_token_budget
+    from compact_transcript import CompactTranscript
+    from pipeline import MODEL_NAME, prompt
+
+    budget = chunk_token_budget(MODEL_NAME, prompt)
+    results = {}
+    for minutes in profile["minutes"]:
+        for punctuated in (True, False):
+            transcript = CompactTranscript.from_snippets(synthetic_snippets(minutes / 60, punctuated))
+            chunks = chunk_segments(transcript.segments(), budget)
+            # Best of several >= 0.2s runs: short transcripts chunk in microseconds
+            timer = timeit.Timer(lambda: chunk_segments(transcript.segments(), budget))
+            number, _ = timer.autorange()
+            seconds = min(timer.repeat(repeat=profile["repeat"], number=number)) / number
+            name = f"chunking.{duration_label(minutes)}.{'punctuated' if punctuated else 'unpunctuated'}"
+            megabytes = len(transcript.text.encode("utf-8")) / 1e6
+            results[f"{name}.mb_per_second"] = metric(round(megabytes / seconds, 2), "MB/s", "higher")
+            results[f"{name}.chunks"] = metric(len(chunks), "chunks", exact=True)
+    return results
+
+
+def sample_summary(points: int = 8) -> dict:
+    rng = random.Random(3)
+    words = ["model", "latency", "budget", "transcript", "chunk", "summary", "token", "cache", "worker", "queue"]
+
+    def sentence(n):
+        return " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+
+    return {
+        "title": sentence(6),
+        "overview": " ".join(sentence(18) for _ in range(3)),
+        "key_points": [sentence(20) for _ in range(points)],
+        "conclusion": sentence(25),
+        "key_point_timestamps": [i * 311.5 for i in range(points)],
+    }
+
+
+def bench_json(profile: dict) -> dict:
+    from pipeline import format_json_summary, parse_json_response
+
+    summary = sample_summary()
+    clean = json.dumps(summary, ensure_ascii=False)
+    cases = {
+        "parse_clean": lambda: parse_json_response(clean),
+        "parse_fenced": lambda: parse_json_response(f"```json\n{clean}\n```"),
+        "parse_repaired": lambda: parse_json_response("Here is the summary:\n" + clean[:-1] + ',}\nHope it helps'),
+        "format": lambda: format_json_summary(summary, "sim00000001"),
+    }
+    results = {}
+    for name, fn in cases.items():
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=profile["repeat"], number=number)) / number
+        results[f"json.{name}.us_per_call"] = metric(round(best * 1e6, 2), "µs")
+    return results
+
+
+def bench_memory(profile: dict) -> dict:
+    from compact_transcript import CompactTranscript
+    from pipeline import PipelineReporter, chunk_and_summarize, open_transcript_stream, transcript_store
+
+    minutes = max(profile["minutes"])
+    snippets = synthetic_snippets(minutes / 60, punctuated=True)
+    # The same transcript streamed back from the transcript store
+    transcript_store.save("benchstream", "en", False, snippets)
+    reporter = PipelineReporter()
+    tracemalloc.start()
+    transcript = CompactTranscript.from_snippets(snippets)
+    del snippets
+    summary = chunk_and_summarize(transcript, reporter, resume=False, reuse=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if summary is None:
+        raise SystemExit(f"memory benchmark failed: {reporter.last_error}")
+    calls = reporter.metadata["api_calls_used"]
+
+    reporter = PipelineReporter()
+    tracemalloc.start()
+    streamed = open_transcript_stream("benchstream", min_chars=0)
+    summary = chunk_and_summarize(streamed, reporter, resume=False, reuse=False)
+    _, streamed_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if summary is None:
+        raise SystemExit(f"streamed memory benchmark failed: {reporter.last_error}")
+    label = duration_label(minutes)
+    return {
+        f"memory.chunk_and_summarize.{label}.peak_mb": metric(round(peak / 1e6, 2), "MB"),
+        f"memory.chunk_and_summarize.{label}.calls": metric(calls, "calls", exact=True),
+        f"memory.chunk_and_summarize.{label}.streamed_peak_mb": metric(round(streamed_peak / 1e6, 2), "MB"),
+        f"memory.chunk_and_summarize.{label}.streamed_calls": metric(reporter.metadata["api_calls_used"], "calls",
+                                                                      exact=True),
+    }
+
+
+def bench_e2e(profile: dict, transcript_latency: float) -> dict:
+    import pipeline
+
+    users, per_user = profile["users"], profile["videos_per_user"]
+    lengths = profile["e2e_minutes"]
+    videos = [[f"sim{user * per_user + i:08d}" for i in range(per_user)] for user in range(users)]
+    source = SimulatedTranscriptSource(transcript_latency, {
+        video_id: lengths[index % len(lengths)]
+        for index, video_id in enumerate(v for user_videos in videos for v in user_videos)
+    })
+    pipeline.youtube_transcript_api = source
+
+    def user_session(video_ids):
+        runs = []
+        for video_id in video_ids:
+            reporter = pipeline.PipelineReporter()
+            started = time.perf_counter()
+            summary = pipeline.summarize_video(video_id, reporter)
+            runs.append({"seconds": time.perf_counter() - started, "ok": summary is not None,
+                         "calls": (reporter.metadata or {}).get("api_calls_used", 0)})
+        return runs
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        runs = [run for session in executor.map(user_session, videos) for run in session]
+    wall = time.perf_counter() - started
+    latencies = [run["seconds"] for run in runs if run["ok"]]
+    return {
+        "e2e.latency_p50_seconds": metric(round(percentile(latencies, 50), 3), "s"),
+        "e2e.latency_p95_seconds": metric(round(percentile(latencies, 95), 3), "s"),
+        "e2e.videos_per_minute": metric(round(len(latencies) / wall * 60, 2), "videos/min", "higher"),
+        "e2e.failures": metric(sum(1 for run in runs if not run["ok"]), "videos", exact=True),
+        "e2e.api_calls": metric(sum(run["calls"] for run in runs), "calls", exact=True),
+        "e2e.transcript_requests": metric(source.requests, "requests", exact=True),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare two runs metric by metric.
+
+    Returns:
+        list[dict]: name, baseline, current, change (relative), status ("ok", "regression",
+            "improved", "new", "missing") for every metric in either run
+    """
+    rows = []
+    names = list(current["metrics"]) + [name for name in baseline["metrics"] if name not in current["metrics"]]
+    for name in names:
+        now, before = current["metrics"].get(name), baseline["metrics"].get(name)
+        if before is None or now is None:
+            rows.append({"name": name, "baseline": before and before["value"], "current": now and now["value"],
+                         "change": None, "status": "new" if before is None else "missing"})
+            continue
+        old, new = before["value"], now["value"]
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        worse = change if now["better"] == "lower" else -change
+        tolerance = 0.0 if now.get("exact") else threshold
+        status = "regression" if worse > tolerance else "improved" if worse < -tolerance else "ok"
+        rows.append({"name": name, "baseline": old, "current": new, "change": round(change, 4), "status": status})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", help="Comma-separated groups to run: chunking,json,memory,e2e")
+    parser.add_argument("--users", type=int, help="Concurrent simulated users (overrides the profile)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mean fake Gemini latency in seconds")
+    parser.add_argument("--transcript-latency", type=float, default=0.1, help="Simulated YouTube request seconds")
+    parser.add_argument("--chunk-tokens", type=int, default=8000)
+    parser.add_argument("--output", help="Write the results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this stored run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression")
+    parser.add_argument("--write-baseline", action="store_true", help=f"Store the results as {DEFAULT_BASELINE}")
+    args = parser.parse_args()
+
+    profile = dict(PROFILES[args.profile])
+    if args.users:
+        profile["users"] = args.users
+    os.environ.update({
+        "CACHE_DIR": tempfile.mkdtemp(prefix="yt-bench-suite-"),
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MEAN": str(args.llm_latency),
+        "FAKE_LLM_SEED": "0",
+        "CHUNK_TOKENS": str(args.chunk_tokens),
+        "MAX_API_CALLS": "1000",
+        "METRICS_PORT": "0",
+        "JOB_WORKERS": "0",
+        "GEMINI_RPM": "100000",
+        "GEMINI_TPM": "1000000000",
+    })
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+
+    groups = {
+        "chunking": lambda: bench_chunking(profile),
+        "json": lambda: bench_json(profile),
+        "memory": lambda: bench_memory(profile),
+        "e2e": lambda: bench_e2e(profile, args.transcript_latency),
+    }
+    selected = args.only.split(",") if args.only else list(groups)
+    metrics = {}
+    for name in selected:
+        started = time.perf_counter()
+        metrics.update(groups[name]())
+        print(f"{name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    metrics["memory.process_max_rss_mb"] = metric(
+        round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1), "MB"
+    )
+    result = {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "profile": args.profile,
+            "groups": selected,
+            "settings": {**profile, "llm_latency": args.llm_latency, "transcript_latency": args.transcript_latency,
+                         "chunk_tokens": args.chunk_tokens},
+        },
+        "metrics": metrics,
+    }
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.write_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    elif not args.baseline:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("settings") != result["meta"]["settings"]:
+            print("warning: baseline was recorded with different settings", file=sys.stderr)
+        rows = compare(result, baseline, args.threshold)
+        print(f"{'metric':<52} {'baseline':>11} {'current':>11} {'change':>8}  status")
+        for row in rows:
+            change = f"{row['change']:+.1%}" if row["change"] is not None else ""
+            print(f"{row['name']:<52} {str(row['baseline']):>11} {str(row['current']):>11} {change:>8}  "
+                  f"{row['status']}")
+        regressions = [row["name"] for row in rows if row["status"] == "regression"]
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"no regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test of the async HTTP API (api_server.py) against the fake LLM backend.
+
+Starts the API server in-process on a free port and opens --clients
+concurrent connections, each posting one summary request (a mix of sync and
+streaming requests over videos whose captions are already in the transcript
+store). Reports status codes, latency percentiles, time to the first
+streamed event and the peak number of threads, which stays at the pipeline
+pool size however many clients are connected. With --max-queued below the
+number of clients, the overflow is answered with 503 + Retry-After.
+
+Usage:
+    python benchmarks/load_test_api.py --clients 300 --videos 20 --max-concurrent 4 --max-queued 400
+    python benchmarks/load_test_api.py --clients 300 --max-queued 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test_pipeline import percentile  # noqa: E402
+
+
+def synthetic_snippets(minutes: float, seed: int) -> list:
+    words = [f"topic{seed}word{i}" for i in range(200)]
+    return [
+        {"text": " ".join(words[(i * 7 + j) % len(words)] for j in range(10)), "start": i * 4.0, "duration": 4.0}
+        for i in range(int(minutes * 15))
+    ]
+
+
+async def request(port: int, video_id: str, stream: bool) -> dict:
+    """POST one summary request; returns status, latency and (for streams) time to the first event."""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps({"url": video_id, "mode": "stream" if stream else "sync"}).encode()
+    writer.write(b"POST /v1/summaries HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 b"Connection: close\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    first_event = None
+    events = []
+    async for line in reader:
+        if line.startswith(b"event: "):
+            if first_event is None:
+                first_event = time.perf_counter() - started
+            events.append(line[7:].strip().decode())
+    writer.close()
+    return {"status": int(status_line.split()[1]), "seconds": time.perf_counter() - started,
+            "first_event_seconds": first_event, "result": "result" in events}
+
+
+async def run(args) -> dict:
+    import api_server
+    from pipeline import transcript_store
+
+    for i in range(args.videos):
+        transcript_store.save(f"apibench{i:03d}", "en", False, synthetic_snippets(args.minutes, seed=i))
+    service = api_server.SummaryService(args.max_concurrent, args.max_queued, sync_max_tokens=0)
+    server = await api_server.ApiServer(service).start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    peak_threads = threading.active_count()
+
+    async def watch_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.05)
+
+    watcher = asyncio.ensure_future(watch_threads())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        request(port, f"apibench{i % args.videos:03d}", stream=i % 2 == 1) for i in range(args.clients)
+    ))
+    wall = time.perf_counter() - started
+    watcher.cancel()
+    server.close()
+
+    statuses = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    served = [r["seconds"] for r in results if r["status"] == 200]
+    first_events = [r["first_event_seconds"] for r in results if r["first_event_seconds"] is not None]
+    return {
+        "clients": args.clients,
+        "statuses": statuses,
+        "completed_summaries": sum(1 for r in results if r["status"] == 200),
+        "wall_seconds": round(wall, 2),
+        "latency_p50": round(percentile(served, 50), 3),
+        "latency_p95": round(percentile(served, 95), 3),
+        "rejected_latency_max": round(max((r["seconds"] for r in results if r["status"] == 503), default=0.0), 3),
+        "first_event_p50": round(percentile(first_events, 50), 3),
+        "peak_threads": peak_threads,
+        "server": service.health(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=300, help="Concurrent HTTP clients")
+    parser.add_argument("--videos", type=int, default=20, help="Distinct videos (the rest coalesce or hit cache)")
+    parser.add_argument("--minutes", type=float, default=20, help="Length of each synthetic video")
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument("--max-queued", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean fake LLM latency in seconds")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "CACHE_DIR": tempfile.mkdtemp(prefix="yt-api-load-"),
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MEAN": str(args.latency),
+        "CHUNK_TOKENS": "2000",
+        "JOB_WORKERS": "0",
+        "METRICS_PORT": "0",
+        "GEMINI_RPM": os.getenv("GEMINI_RPM", "100000"),
+        "GEMINI_TPM": os.getenv("GEMINI_TPM", "1000000000"),
+    })
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['clients']} clients in {result['wall_seconds']}s: statuses {result['statuses']}")
+    print(f"served latency p50 {result['latency_p50']}s p95 {result['latency_p95']}s; "
+          f"first stream event p50 {result['first_event_p50']}s; "
+          f"slowest 503 {result['rejected_latency_max']}s; peak threads {result['peak_threads']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Offline load test of chunk_and_summarize against a fake LLM backend.
+
+Either uses the in-process fake backend or starts fake_gemini_server.py in a
+background thread and drives the real HTTP client path against it. No quota
+is spent and results are reproducible for a given --seed.
+
+Usage:
+    python benchmarks/load_test_pipeline.py --videos 20 --concurrency 5 --hours 3
+    python benchmarks/load_test_pipeline.py --backend http --rate-429 0.05 --malformed-rate 0.02
+    python benchmarks/load_test_pipeline.py --keys 4 --models gemini-2.5-flash,gemini-2.5-flash-lite --rpm 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=("fake", "http"), default="fake")
+    parser.add_argument("--videos", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4, help="Videos summarized at once")
+    parser.add_argument("--hours", type=float, default=2.0, help="Length of each synthetic transcript")
+    parser.add_argument("--chunk-tokens", type=int, default=20000)
+    parser.add_argument("--latency-mean", type=float, default=0.5)
+    parser.add_argument("--latency-dist", default="lognormal")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--tpm", type=float, default=4000000)
+    parser.add_argument("--keys", type=int, default=1, help="Fake API keys in the quota pool (--rpm/--tpm each)")
+    parser.add_argument("--models", default="gemini-2.5-flash", help="Comma-separated pool models, best first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+
+    # Configure the pipeline through its environment before importing it
+    os.environ.update({
+        "CACHE_DIR": tempfile.mkdtemp(prefix="yt-loadtest-"),
+        "LLM_BACKEND": args.backend,
+        "CHUNK_TOKENS": str(args.chunk_tokens),
+        "MAX_API_CALLS": "1000",
+        "GEMINI_RPM": str(args.rpm),
+        "GEMINI_TPM": str(args.tpm),
+        "FAKE_LLM_LATENCY_MEAN": str(args.latency_mean),
+        "FAKE_LLM_LATENCY_DIST": args.latency_dist,
+        "FAKE_LLM_429_RATE": str(args.rate_429),
+        "FAKE_LLM_MALFORMED_RATE": str(args.malformed_rate),
+        "FAKE_LLM_SEED": str(args.seed),
+        "GOOGLE_API_KEYS": ",".join(f"fake-key-{i + 1}" for i in range(args.keys)),
+        "GEMINI_MODELS": args.models,
+    })
+    server = None
+    if args.backend == "http":
+        from fake_gemini_server import make_server
+        from llm_backends import FakeResponder
+
+        server = make_server("127.0.0.1", args.port, FakeResponder.from_env())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["LLM_BACKEND_URL"] = f"http://127.0.0.1:{args.port}"
+
+    from bench_chunking import synthetic_snippets
+    from compact_transcript import CompactTranscript
+    from pipeline import PipelineReporter, chunk_and_summarize
+
+    transcripts = [
+        CompactTranscript.from_snippets(synthetic_snippets(args.hours, punctuated=i % 2 == 0, seed=args.seed + i))
+        for i in range(args.videos)
+    ]
+
+    def run_one(transcript):
+        reporter = PipelineReporter()
+        started = time.perf_counter()
+        result = chunk_and_summarize(transcript, reporter)
+        return {
+            "seconds": time.perf_counter() - started,
+            "ok": result is not None,
+            "calls": (reporter.metadata or {}).get("api_calls_used", 0),
+            "error": reporter.last_error,
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        runs = list(executor.map(run_one, transcripts))
+    wall = time.perf_counter() - started
+
+    latencies = [r["seconds"] for r in runs if r["ok"]]
+    report = {
+        "backend": args.backend,
+        "videos": args.videos,
+        "concurrency": args.concurrency,
+        "keys": args.keys,
+        "models": args.models,
+        "hours_per_video": args.hours,
+        "succeeded": sum(1 for r in runs if r["ok"]),
+        "failed": sum(1 for r in runs if not r["ok"]),
+        "api_calls": sum(r["calls"] for r in runs),
+        "wall_seconds": round(wall, 3),
+        "videos_per_minute": round(args.videos / wall * 60, 2),
+        "latency_p50": round(percentile(latencies, 50), 3),
+        "latency_p95": round(percentile(latencies, 95), 3),
+        "latency_mean": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "errors": sorted({r["error"][:120] for r in runs if r["error"]}),
+    }
+    if server:
+        report["server_stats"] = dict(server.stats)
+        server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
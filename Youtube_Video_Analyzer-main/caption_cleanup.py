@@ -0,0 +1,226 @@
+"""
+Clean-up of caption snippets before they are joined into a transcript.
+
+Auto-generated tracks are written as rolling captions: each snippet often
+starts with the words the previous one ended with, and lines are repeated
+verbatim or nearly so. Non-speech markers ("[Music]", "[Applause]", ♪) add
+tokens without content. The pipeline only cleans auto-generated tracks;
+manually created captions are used as written. One forward pass over the
+snippets
+
+1. strips configured non-speech markers,
+2. drops the longest word overlap between the end of the previous snippet and
+   the start of the current one - if it is at least MIN_OVERLAP_WORDS long or
+   the two snippets overlap in time, so a sentence that merely opens with the
+   word the last one closed on ("... do this." / "This is ...") is kept whole,
+3. drops lines that are near-duplicates (shingle-hash Jaccard) of one of the
+   last few kept lines, extending the kept line's duration to cover them.
+   Lines shorter than a shingle ("Yes.") are only dropped while the line they
+   repeat is still on screen.
+
+Each step looks at a bounded window, so the pass is linear in the number of
+snippets, and a snippet's result depends only on the snippets before it -
+growing transcripts stay prefix-stable for incremental runs.
+"""
+import os
+import re
+import string
+from collections import deque
+from typing import Iterable, Iterator
+
+from rate_limiter import CHARS_PER_TOKEN
+
+
+DEFAULT_NON_SPEECH = ("music", "applause", "laughter", "laughing", "laughs", "cheering", "cheers",
+                      "inaudible", "silence", "noise", "background noise", "no audio", "foreign")
+# Longest rolling-caption overlap looked for, in words
+MAX_OVERLAP_WORDS = 24
+# Shortest overlap removed between snippets that do not overlap in time
+MIN_OVERLAP_WORDS = 2
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+DEFAULT_DUPLICATE_WINDOW = 8
+_MUSIC_SYMBOLS = re.compile(r"[♪♫♬]+")
+_PUNCTUATION = string.punctuation.replace("'", "") + "“”‘’…–—"
+
+
+def cleanup_settings_from_env() -> dict:
+    """
+    Read clean-up settings from the environment.
+
+    CAPTION_CLEANUP              - 0 disables the clean-up (default 1)
+    CAPTION_NON_SPEECH           - comma-separated markers dropped in [] or () (default: music, applause, ...)
+    CAPTION_DUPLICATE_THRESHOLD  - shingle Jaccard similarity at which a line is a duplicate (default 0.8)
+    CAPTION_DUPLICATE_WINDOW     - how many recent lines a line is compared with (default 8)
+    """
+    markers = os.getenv("CAPTION_NON_SPEECH")
+    return {
+        "enabled": os.getenv("CAPTION_CLEANUP", "1") == "1",
+        "non_speech": tuple(m.strip() for m in markers.split(",") if m.strip()) if markers is not None
+        else DEFAULT_NON_SPEECH,
+        "duplicate_threshold": float(os.getenv("CAPTION_DUPLICATE_THRESHOLD", DEFAULT_DUPLICATE_THRESHOLD)),
+        "duplicate_window": int(os.getenv("CAPTION_DUPLICATE_WINDOW", DEFAULT_DUPLICATE_WINDOW)),
+    }
+
+
+def non_speech_pattern(markers) -> re.Pattern:
+    """Regex matching any of the markers in square brackets or parentheses, case-insensitively."""
+    if not markers:
+        return None
+    alternatives = "|".join(re.escape(m).replace(r"\ ", r"\s+") for m in sorted(markers, key=len, reverse=True))
+    return re.compile(rf"[\[(]\s*(?:{alternatives})\s*[\])]", re.IGNORECASE)
+
+
+def overlap_length(previous: list, current: list, limit: int = MAX_OVERLAP_WORDS) -> int:
+    """
+    Longest k <= limit such that the last k words of previous equal the first k of current.
+
+    Uses the KMP prefix function over current's head + previous's tail, so the
+    cost is linear in the (bounded) window.
+    """
+    head = current[:limit]
+    tail = previous[-limit:]
+    if not head or head[0] not in tail:
+        return 0
+    sequence = head + [None] + tail
+    prefix = [0] * len(sequence)
+    for i in range(1, len(sequence)):
+        k = prefix[i - 1]
+        while k and sequence[i] != sequence[k]:
+            k = prefix[k - 1]
+        if sequence[i] == sequence[k]:
+            k += 1
+        prefix[i] = k
+    return prefix[-1]
+
+
+def shingles(words: list, size: int = DEFAULT_SHINGLE_SIZE) -> frozenset:
+    """Hashed word n-grams of a line (the whole line for lines shorter than size)."""
+    if len(words) < size:
+        return frozenset([hash(tuple(words))]) if words else frozenset()
+    return frozenset(hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1))
+
+
+def iter_clean_snippets(snippets: Iterable, stats: dict = None, non_speech=DEFAULT_NON_SPEECH,
+                        duplicate_threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                        duplicate_window: int = DEFAULT_DUPLICATE_WINDOW) -> Iterator[dict]:
+    """
+    Remove non-speech markers, rolling-caption overlaps and near-duplicate lines,
+    yielding cleaned snippets as the input is read.
+
+    A kept line's duration may still grow to cover the duplicates and emptied
+    snippets after it, so each line is yielded once the next line is kept (or
+    the input ends): one snippet of look-ahead, whatever the transcript length.
+
+    Args:
+        snippets: {"text", "start", "duration"} dicts in time order (any iterable)
+        stats: Filled with counts, bytes/tokens before and after and removed;
+            complete once the generator is exhausted
+        non_speech: Markers to drop when written as [marker] or (marker)
+        duplicate_threshold: Jaccard similarity of shingle sets at which a line is dropped
+        duplicate_window: Number of recent kept lines a line is compared with
+
+    Yields:
+        dict: Cleaned {"text", "start", "duration"} snippets
+    """
+    marker_pattern = non_speech_pattern(non_speech)
+    pending = None
+    kept_count = 0
+    recent = deque(maxlen=max(1, duplicate_window))
+    previous_words = []
+    previous_end = None
+    stats = {} if stats is None else stats
+    stats.update({"snippets_in": 0, "markers_removed": 0, "overlap_words_removed": 0,
+                  "duplicate_lines_removed": 0, "empty_snippets_removed": 0})
+    bytes_in = chars_in = bytes_out = chars_out = 0
+
+    for snippet in snippets:
+        stats["snippets_in"] += 1
+        text = snippet["text"]
+        bytes_in += len(text.encode("utf-8"))
+        chars_in += len(text) + 1
+        start = float(snippet.get("start") or 0.0)
+        duration = float(snippet.get("duration") or 0.0)
+
+        if marker_pattern is not None and ("[" in text or "(" in text):
+            text, markers = marker_pattern.subn(" ", text)
+            stats["markers_removed"] += markers
+        if not text.isascii():
+            text, symbols = _MUSIC_SYMBOLS.subn(" ", text)
+            stats["markers_removed"] += symbols
+        words = text.split()
+
+        # Rolling captions: skip the words already shown at the end of the previous snippet
+        normalized = [w.lower().strip(_PUNCTUATION) for w in words]
+        overlap = overlap_length(previous_words, normalized)
+        # One shared word between lines shown one after the other is ordinary speech
+        if overlap < MIN_OVERLAP_WORDS and not (previous_end is not None and start < previous_end):
+            overlap = 0
+        if words:
+            # The next snippet rolls on from everything shown in this one
+            previous_words = normalized
+            previous_end = start + duration
+        if overlap:
+            words, normalized = words[overlap:], normalized[overlap:]
+            stats["overlap_words_removed"] += overlap
+        if not words:
+            stats["empty_snippets_removed"] += 1
+            if pending is not None:
+                pending["duration"] = max(pending["duration"], start + duration - pending["start"])
+            continue
+
+        line_shingles = shingles(normalized)
+        # A short line is one hash of the whole line: repeating it is only a caption echo in time
+        short = len(normalized) < DEFAULT_SHINGLE_SIZE
+        duplicate_of = None
+        for kept_index, kept_shingles, kept_end in recent:
+            union = len(line_shingles | kept_shingles)
+            if union and len(line_shingles & kept_shingles) / union >= duplicate_threshold:
+                if short:
+                    if kept_index == kept_count - 1:
+                        kept_end = pending["start"] + pending["duration"]
+                    if start >= kept_end:
+                        continue
+                duplicate_of = kept_index
+                break
+        if duplicate_of is not None:
+            stats["duplicate_lines_removed"] += 1
+            if duplicate_of == kept_count - 1:
+                pending["duration"] = max(pending["duration"], start + duration - pending["start"])
+            continue
+
+        if pending is not None:
+            yield pending
+        text = " ".join(words)
+        pending = {"text": text, "start": start, "duration": duration}
+        recent.append((kept_count, line_shingles, start + duration))
+        kept_count += 1
+        bytes_out += len(text.encode("utf-8"))
+        chars_out += len(text) + 1
+    if pending is not None:
+        yield pending
+
+    tokens_in, tokens_out = int(chars_in / CHARS_PER_TOKEN), int(chars_out / CHARS_PER_TOKEN)
+    stats.update({
+        "snippets_out": kept_count,
+        "input_bytes": bytes_in,
+        "output_bytes": bytes_out,
+        "input_tokens": tokens_in,
+        "output_tokens": tokens_out,
+        "bytes_removed": bytes_in - bytes_out,
+        "tokens_removed": tokens_in - tokens_out,
+    })
+
+
+def clean_snippets(snippets: list, non_speech=DEFAULT_NON_SPEECH,
+                   duplicate_threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                   duplicate_window: int = DEFAULT_DUPLICATE_WINDOW) -> tuple:
+    """
+    Clean a whole snippet list at once (see iter_clean_snippets).
+
+    Returns:
+        tuple: (cleaned snippets, stats dict with counts, bytes/tokens before and after and removed)
+    """
+    stats = {}
+    cleaned = list(iter_clean_snippets(snippets, stats, non_speech, duplicate_threshold, duplicate_window))
+    return cleaned, stats
@@ -0,0 +1,227 @@
+"""
+Durable checkpoints of map/reduce results for resumable summarization runs.
+
+A run id identifies one summarization of one transcript with one set of
+chunking parameters, prompts and model. Within a run every finished call is
+stored under a hash of its input (the chunk text, or the merged summaries a
+reduce call received), so a retry after a quota error or a bad response only
+pays for the calls that never completed - including reduce calls whose inputs
+are all available again.
+
+Incremental runs (growing livestream transcripts) use a run id per video
+instead of per transcript and keep their results after success, so a refresh
+only summarizes the new tail and the reduce groups it feeds into.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_CACHE_DIR = "./cache"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Per-run map/reduce results in SQLite (WAL), shared by every worker process.
+
+    Args:
+        path: SQLite database file
+        ttl_seconds: Checkpoints of runs older than this are discarded
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS checkpoints (
+                    run_id TEXT NOT NULL,
+                    node_key TEXT NOT NULL,
+                    summary_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, node_key)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints(created_at)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS incremental_state (
+                    run_id TEXT PRIMARY KEY,
+                    transcript_chars INTEGER NOT NULL,
+                    prefix_sha256 TEXT NOT NULL,
+                    num_chunks INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+
+    @classmethod
+    def from_env(cls) -> "CheckpointStore":
+        """
+        CACHE_DIR               - directory holding checkpoints.sqlite3 (default ./cache)
+        CHECKPOINT_TTL_SECONDS  - how long an unfinished run can be resumed (default 7 days)
+        """
+        return cls(
+            os.path.join(os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR), "checkpoints.sqlite3"),
+            ttl_seconds=float(os.getenv("CHECKPOINT_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_run_id(transcript_text: str, chunk_tokens: int, fan_in: int, prompt_text: str,
+                    model_name: str, transcript_digest: str = None) -> str:
+        """
+        Identify a run by transcript, chunking parameters, prompts and model.
+
+        Args:
+            transcript_digest: SHA-256 hex digest of the transcript, used instead of
+                transcript_text when the text is streamed and never held in full
+
+        Returns:
+            str: Hex digest
+        """
+        text_hash = transcript_digest or _sha256(transcript_text)
+        parts = [text_hash, str(chunk_tokens), str(fan_in), _sha256(prompt_text), model_name]
+        return _sha256("\x1f".join(parts))
+
+    @staticmethod
+    def make_incremental_run_id(video_id: str, chunk_tokens: int, prompt_text: str, model_name: str) -> str:
+        """
+        Identify the incremental run of a video: stable while its transcript grows.
+
+        Returns:
+            str: Hex digest
+        """
+        parts = ["incremental", video_id, str(chunk_tokens), _sha256(prompt_text), model_name]
+        return _sha256("\x1f".join(parts))
+
+    @staticmethod
+    def node_key(kind: str, content: str) -> str:
+        """Key of one call within a run: its kind ("map"/"reduce") and a hash of its input."""
+        return f"{kind}:{_sha256(content)}"
+
+    def get(self, run_id: str, node_key: str):
+        """Return the checkpointed summary dict, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary_json FROM checkpoints WHERE run_id = ? AND node_key = ? AND created_at >= ?",
+                (run_id, node_key, time.time() - self.ttl_seconds),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, run_id: str, node_key: str, summary: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, node_key, summary_json, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (run_id, node_key, json.dumps(summary, ensure_ascii=False), time.time()),
+            )
+
+    def existing(self, run_id: str, node_keys: list) -> set:
+        """Subset of node_keys that are checkpointed for a run."""
+        found = set()
+        with self._connect() as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(node_keys), 500):
+                batch = node_keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT node_key FROM checkpoints WHERE run_id = ? AND created_at >= ? "
+                    f"AND node_key IN ({', '.join('?' * len(batch))})",
+                    (run_id, time.time() - self.ttl_seconds, *batch),
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def retain(self, run_id: str, node_keys: set) -> int:
+        """
+        Keep (and refresh the age of) only the given nodes of a run.
+
+        Returns:
+            int: Number of superseded checkpoints removed
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = [
+                    (run_id, key)
+                    for (key,) in conn.execute("SELECT node_key FROM checkpoints WHERE run_id = ?", (run_id,))
+                    if key not in node_keys
+                ]
+                conn.executemany("DELETE FROM checkpoints WHERE run_id = ? AND node_key = ?", stale)
+                conn.execute("UPDATE checkpoints SET created_at = ? WHERE run_id = ?", (time.time(), run_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(stale)
+
+    def get_state(self, run_id: str):
+        """
+        Last completed incremental run of a video.
+
+        Returns:
+            dict: transcript_chars, prefix_sha256, num_chunks, updated_at - or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT transcript_chars, prefix_sha256, num_chunks, updated_at FROM incremental_state "
+                "WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("transcript_chars", "prefix_sha256", "num_chunks", "updated_at"), row))
+
+    def put_state(self, run_id: str, transcript_text: str, num_chunks: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO incremental_state VALUES (?, ?, ?, ?, ?)",
+                (run_id, len(transcript_text), _sha256(transcript_text), num_chunks, time.time()),
+            )
+
+    @staticmethod
+    def is_extension(state: dict, transcript_text: str) -> bool:
+        """True if transcript_text starts with the transcript of a stored incremental run."""
+        prefix = transcript_text[:state["transcript_chars"]]
+        return len(prefix) == state["transcript_chars"] and _sha256(prefix) == state["prefix_sha256"]
+
+    def count(self, run_id: str) -> int:
+        """Number of checkpointed calls of a run."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM checkpoints WHERE run_id = ? AND created_at >= ?",
+                (run_id, time.time() - self.ttl_seconds),
+            ).fetchone()[0]
+
+    def discard(self, run_id: str) -> None:
+        """Drop a finished run's checkpoints (its result lives in the summary cache)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+    def purge_expired(self) -> int:
+        """
+        Remove checkpoints older than the TTL.
+
+        Returns:
+            int: Number of rows removed
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM checkpoints WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
@@ -0,0 +1,343 @@
+"""
+Content-addressed store of chunk and merge summaries, shared across videos.
+
+Re-uploads, clip compilations and multi-part series repeat long stretches of
+transcript. Every finished map call (one chunk) and reduce call (one group of
+merged summaries) is stored under a hash of its input, prompt and model, so
+any later video that sends the same input reuses the summary instead of paying
+for the call again.
+
+Chunks that are only nearly identical (another caption track, a few seconds
+cut from the start) are found with MinHash over word 3-gram shingles and an
+LSH banding index in the same SQLite file: a chunk's signature is split into
+bands, each band hashed to a bucket, and only chunks sharing a bucket are
+compared. A candidate is reused when the estimated Jaccard similarity of the
+shingle sets reaches the configured threshold.
+
+NumPy is used for the signatures when installed (imported on first use); the
+pure-Python path gives the same signatures, more slowly.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+
+from lazy_imports import lazy_import
+
+# Optional: the pure-Python path gives the same signatures
+np = lazy_import("numpy")
+
+
+DEFAULT_CACHE_DIR = "./cache"
+DEFAULT_SIMILARITY_THRESHOLD = 0.7
+DEFAULT_MAX_ENTRIES = 200000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: chunks at Jaccard 0.7 share a bucket with probability > 0.99
+LSH_BANDS = 32
+SHINGLE_SIZE = 3
+# Shingles hashed per numpy step of a MinHash signature
+MINHASH_BLOCK = 1024
+_PRIME = 4294967291  # largest prime below 2**32, so a*x + b fits in 64 bits
+_WORD = re.compile(r"\w+")
+
+_rng = random.Random(20240611)
+_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERMUTATIONS)]
+_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERMUTATIONS)]
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> list:
+    """Stable 32-bit hashes of the distinct lower-cased word n-grams of a text."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return [zlib.crc32(" ".join(words).encode("utf-8"))] if words else []
+    return list({zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)})
+
+
+def minhash_signature(text: str) -> array:
+    """
+    MinHash signature of a text's shingle set (NUM_PERMUTATIONS unsigned 32-bit values).
+
+    Returns:
+        array: typecode "I", or None for a text without words
+    """
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return None
+    if np is not None:
+        x = np.asarray(hashes, dtype=np.uint64)
+        a = np.asarray(_A, dtype=np.uint64)[:, None]
+        b = np.asarray(_B, dtype=np.uint64)[:, None]
+        # Blocks of shingles keep the permutations x shingles temporaries small for large chunks
+        signature = np.full(NUM_PERMUTATIONS, _PRIME, dtype=np.uint64)
+        for i in range(0, len(x), MINHASH_BLOCK):
+            np.minimum(signature, ((a * x[i:i + MINHASH_BLOCK] + b) % np.uint64(_PRIME)).min(axis=1), out=signature)
+        return array("I", signature.astype(np.uint32).tobytes())
+    return array("I", [min((a * h + b) % _PRIME for h in hashes) for a, b in zip(_A, _B)])
+
+
+def similarity(signature_a: array, signature_b: array) -> float:
+    """Estimated Jaccard similarity: the fraction of equal signature positions."""
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / NUM_PERMUTATIONS
+
+
+def lsh_buckets(signature: array, scope: str) -> list:
+    """One bucket id per band; the scope (prompt and model) keeps unrelated entries apart."""
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets = []
+    for band in range(LSH_BANDS):
+        digest = hashlib.blake2b(
+            signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8, person=band.to_bytes(2, "little"),
+            key=scope.encode("utf-8")[:64],
+        ).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+class ChunkSummaryStore:
+    """
+    Chunk and merge summaries by content hash, plus a MinHash/LSH index of chunk text.
+
+    Args:
+        path: SQLite database file
+        similarity_threshold: Estimated Jaccard similarity at which a stored chunk summary
+            is reused for a new chunk (1.0 reuses identical chunks only)
+        max_entries: Least recently used entries beyond this are evicted
+        ttl_seconds: Entries unused for longer than this are evicted
+        enabled: False turns every lookup into a miss and every put into a no-op
+    """
+
+    def __init__(self, path: str, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 enabled: bool = True):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS chunk_summaries (
+                    content_key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    summary_json TEXT NOT NULL,
+                    signature BLOB,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    reuses INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_summaries_last_used ON chunk_summaries(last_used)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS chunk_lsh (
+                    bucket INTEGER NOT NULL,
+                    content_key TEXT NOT NULL,
+                    PRIMARY KEY (bucket, content_key)
+                ) WITHOUT ROWID"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_lsh_key ON chunk_lsh(content_key)")
+
+    @classmethod
+    def from_env(cls) -> "ChunkSummaryStore":
+        """
+        CACHE_DIR                - directory holding chunk_summaries.sqlite3 (default ./cache)
+        CHUNK_REUSE              - 0 disables cross-video reuse (default 1)
+        CHUNK_REUSE_SIMILARITY   - similarity for reusing a near-duplicate chunk (default 0.7; 1 = exact only)
+        CHUNK_STORE_MAX_ENTRIES  - maximum number of stored summaries (default 200000)
+        CHUNK_STORE_TTL_SECONDS  - entries unused for longer are evicted (default 30 days)
+        """
+        return cls(
+            os.path.join(os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR), "chunk_summaries.sqlite3"),
+            similarity_threshold=float(os.getenv("CHUNK_REUSE_SIMILARITY", DEFAULT_SIMILARITY_THRESHOLD)),
+            max_entries=int(os.getenv("CHUNK_STORE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("CHUNK_STORE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            enabled=os.getenv("CHUNK_REUSE", "1") == "1",
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_scope(kind: str, prompt_text: str, model_name: str) -> str:
+        """Entries are only shared between calls of the same kind, prompt and model."""
+        return _sha256("\x1f".join([kind, _sha256(prompt_text), model_name]))
+
+    @staticmethod
+    def make_key(scope: str, content: str) -> str:
+        return _sha256(scope + "\x1f" + content)
+
+    def _touch(self, conn, content_keys: list) -> None:
+        conn.executemany(
+            "UPDATE chunk_summaries SET last_used = ?, reuses = reuses + 1 WHERE content_key = ?",
+            [(time.time(), key) for key in content_keys],
+        )
+
+    def get(self, kind: str, content: str, prompt_text: str, model_name: str):
+        """
+        Summary stored for exactly this input, or None.
+        """
+        if not self.enabled:
+            return None
+        key = self.make_key(self.make_scope(kind, prompt_text, model_name), content)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary_json FROM chunk_summaries WHERE content_key = ? AND last_used >= ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                self._touch(conn, [key])
+        return json.loads(row[0]) if row else None
+
+    def lookup_chunks(self, chunks: list, prompt_text: str, model_name: str) -> dict:
+        """
+        Find stored map summaries for a list of chunks: identical chunks first,
+        then near-duplicates through the LSH index.
+
+        Args:
+            chunks: Chunk texts
+            prompt_text: Map prompt
+            model_name: Gemini model
+
+        Returns:
+            dict: {chunk index: {"summary": dict, "similarity": float}}; similarity 1.0 is an exact match
+        """
+        if not self.enabled or not chunks:
+            return {}
+        scope = self.make_scope("map", prompt_text, model_name)
+        keys = [self.make_key(scope, chunk) for chunk in chunks]
+        cutoff = time.time() - self.ttl_seconds
+        found = {}
+        with self._connect() as conn:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT content_key, summary_json FROM chunk_summaries WHERE last_used >= ? "
+                    f"AND content_key IN ({', '.join('?' * len(batch))})",
+                    (cutoff, *batch),
+                ).fetchall()
+                found.update(rows)
+            matches = {
+                index: {"summary": json.loads(found[key]), "similarity": 1.0}
+                for index, key in enumerate(keys) if key in found
+            }
+            used = set(found)
+
+            if self.similarity_threshold < 1.0:
+                for index, chunk in enumerate(chunks):
+                    if index in matches:
+                        continue
+                    signature = minhash_signature(chunk)
+                    if signature is None:
+                        continue
+                    buckets = lsh_buckets(signature, scope)
+                    candidates = conn.execute(
+                        f"SELECT s.content_key, s.summary_json, s.signature FROM chunk_summaries s "
+                        f"WHERE s.last_used >= ? AND s.content_key IN (SELECT content_key FROM chunk_lsh "
+                        f"WHERE bucket IN ({', '.join('?' * len(buckets))}))",
+                        (cutoff, *buckets),
+                    ).fetchall()
+                    best = None
+                    for key, summary_json, blob in candidates:
+                        score = similarity(signature, array("I", blob))
+                        if score >= self.similarity_threshold and (best is None or score > best[0]):
+                            best = (score, key, summary_json)
+                    if best:
+                        matches[index] = {"summary": json.loads(best[2]), "similarity": round(best[0], 3)}
+                        used.add(best[1])
+            if used:
+                self._touch(conn, list(used))
+        return matches
+
+    def put(self, kind: str, content: str, prompt_text: str, model_name: str, summary: dict) -> None:
+        """
+        Store the summary of one call; map inputs are also indexed for near-duplicate lookups.
+        """
+        if not self.enabled:
+            return
+        scope = self.make_scope(kind, prompt_text, model_name)
+        key = self.make_key(scope, content)
+        signature = minhash_signature(content) if kind == "map" else None
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO chunk_summaries "
+                    "(content_key, kind, summary_json, signature, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, json.dumps(summary, ensure_ascii=False),
+                     signature.tobytes() if signature is not None else None, now, now),
+                )
+                if signature is not None:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO chunk_lsh (bucket, content_key) VALUES (?, ?)",
+                        [(bucket, key) for bucket in lsh_buckets(signature, scope)],
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def evict(self) -> int:
+        """
+        Drop entries unused for longer than the TTL, then the least recently used
+        ones beyond max_entries, together with their LSH buckets.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                victims = [row[0] for row in conn.execute(
+                    "SELECT content_key FROM chunk_summaries WHERE last_used < ?", (time.time() - self.ttl_seconds,)
+                )]
+                excess = conn.execute("SELECT COUNT(*) FROM chunk_summaries").fetchone()[0] - len(victims) \
+                    - self.max_entries
+                if excess > 0:
+                    victims += [row[0] for row in conn.execute(
+                        "SELECT content_key FROM chunk_summaries WHERE last_used >= ? ORDER BY last_used ASC LIMIT ?",
+                        (time.time() - self.ttl_seconds, excess),
+                    )]
+                conn.executemany("DELETE FROM chunk_summaries WHERE content_key = ?", [(k,) for k in victims])
+                conn.executemany("DELETE FROM chunk_lsh WHERE content_key = ?", [(k,) for k in victims])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(victims)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: entries, map_entries, reduce_entries, reuses
+        """
+        with self._connect() as conn:
+            rows = dict(
+                (kind, (count, reuses)) for kind, count, reuses in conn.execute(
+                    "SELECT kind, COUNT(*), COALESCE(SUM(reuses), 0) FROM chunk_summaries GROUP BY kind"
+                )
+            )
+        return {
+            "entries": sum(count for count, _ in rows.values()),
+            "map_entries": rows.get("map", (0, 0))[0],
+            "reduce_entries": rows.get("reduce", (0, 0))[0],
+            "reuses": sum(reuses for _, reuses in rows.values()),
+        }
@@ -0,0 +1,190 @@
+"""
+Token-aware, single-pass transcript chunking.
+
+Chunks are sized in (estimated) model tokens rather than characters and are
+filled as close to the per-call budget as possible. Boundaries prefer sentence
+ends and pauses between caption snippets; segments larger than the budget
+(e.g. auto-captions without any punctuation) are hard-split.
+"""
+import os
+import re
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from rate_limiter import estimate_tokens
+
+
+# Input context windows (tokens) of the Gemini models this app can use
+MODEL_CONTEXT_TOKENS = {
+    "gemini-2.5-flash": 1048576,
+    "gemini-2.5-flash-lite": 1048576,
+    "gemini-2.0-flash": 1048576,
+    "gemini-2.0-flash-lite": 1048576,
+}
+DEFAULT_CONTEXT_TOKENS = 1048576
+OUTPUT_RESERVE_TOKENS = 2048
+DEFAULT_PAUSE_GAP_SECONDS = 2.0
+# Prefer a sentence/pause break only if it keeps the chunk at least this full
+MIN_BREAK_FILL = 0.5
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class Segment(NamedTuple):
+    text: str
+    start: Optional[float] = None
+    duration: Optional[float] = None
+
+
+class Chunk(NamedTuple):
+    text: str
+    tokens: int
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+
+def chunk_token_budget(model_name: str, prompt_text: str, tokens_per_minute: float = None) -> int:
+    """
+    Largest transcript chunk (in tokens) that fits in one call.
+
+    The budget is the model context minus the prompt and an output reserve, capped
+    by the tokens/minute quota (a call larger than that could never be admitted by
+    the rate limiter) and by CHUNK_TOKENS if set.
+
+    Args:
+        model_name: Gemini model name
+        prompt_text: Prompt sent together with each chunk
+        tokens_per_minute: Token quota per minute (defaults to GEMINI_TPM)
+
+    Returns:
+        int: Token budget per chunk
+    """
+    context = MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+    budget = context - estimate_tokens(prompt_text) - OUTPUT_RESERVE_TOKENS
+    if tokens_per_minute is None:
+        tokens_per_minute = float(os.getenv("GEMINI_TPM", 250000))
+    budget = min(budget, int(tokens_per_minute) - estimate_tokens(prompt_text))
+    if os.getenv("CHUNK_TOKENS"):
+        budget = min(budget, int(os.getenv("CHUNK_TOKENS")))
+    return max(1, budget)
+
+
+def _hard_split(text: str, max_tokens: int) -> list:
+    """Split one oversized segment at whitespace near the budget (or mid-word if none)."""
+    pieces = []
+    max_chars = max(1, int(len(text) * (max_tokens - 1) / max(1, estimate_tokens(text))))
+    pos = 0
+    while pos < len(text):
+        end = min(len(text), pos + max_chars)
+        if end < len(text):
+            space = text.rfind(" ", pos + max_chars // 2, end)
+            if space > pos:
+                end = space
+        pieces.append(text[pos:end].strip())
+        pos = end
+    return [p for p in pieces if p]
+
+
+def iter_chunks(segments: Iterable[Segment], max_tokens: int,
+                pause_gap: float = DEFAULT_PAUSE_GAP_SECONDS) -> Iterator[Chunk]:
+    """
+    Pack segments into chunks of at most max_tokens in one pass, yielding each
+    chunk as soon as it is cut.
+
+    When the next segment does not fit, the chunk is cut at the last sentence end
+    or pause longer than pause_gap, provided the chunk is at least half full;
+    otherwise it is cut right there. Text is collected in lists and joined once
+    per chunk. Only the chunk being built is held, so `segments` may be a
+    generator over a transcript that never exists as one string.
+
+    Args:
+        segments: Caption snippets or sentences, in order
+        max_tokens: Token budget per chunk
+        pause_gap: Silence (seconds) between snippets treated as a natural break
+
+    Yields:
+        Chunk: Chunks with token counts and time spans (None without timestamps)
+    """
+    # Current chunk as parallel lists: text, tokens, start, end per segment
+    texts, tokens, starts, ends = [], [], [], []
+    used = 0
+    break_at = 0  # index in `texts` after which a natural break occurs
+    break_used = 0
+    prev_end = None
+
+    def take(upto):
+        # The one " ".join per chunk keeps chunk building linear in transcript length
+        chunk_starts = [s for s in starts[:upto] if s is not None]
+        chunk_ends = [e for e in ends[:upto] if e is not None]
+        chunk = Chunk(
+            " ".join(texts[:upto]),
+            sum(tokens[:upto]),
+            chunk_starts[0] if chunk_starts else None,
+            chunk_ends[-1] if chunk_ends else None,
+        )
+        del texts[:upto], tokens[:upto], starts[:upto], ends[:upto]
+        return chunk
+
+    for segment in segments:
+        text = segment.text.strip()
+        if not text:
+            continue
+        start = segment.start
+        end = start + (segment.duration or 0.0) if start is not None else None
+        if start is not None and prev_end is not None and start - prev_end >= pause_gap and texts:
+            break_at, break_used = len(texts), used
+        prev_end = end if end is not None else prev_end
+
+        n = estimate_tokens(text)
+        pieces = [(piece, estimate_tokens(piece)) for piece in _hard_split(text, max_tokens)] \
+            if n > max_tokens else [(text, n)]
+        for piece, n in pieces:
+            if used + n > max_tokens and texts:
+                if break_at and break_used >= max_tokens * MIN_BREAK_FILL:
+                    yield take(break_at)
+                    used = sum(tokens)
+                if used + n > max_tokens and texts:
+                    yield take(len(texts))
+                    used = 0
+                break_at, break_used = 0, 0
+            texts.append(piece)
+            tokens.append(n)
+            starts.append(start)
+            ends.append(end)
+            used += n
+
+        if text[-1] in ".!?":
+            break_at, break_used = len(texts), used
+
+    if texts:
+        yield take(len(texts))
+
+
+def chunk_segments(segments: Iterable[Segment], max_tokens: int,
+                   pause_gap: float = DEFAULT_PAUSE_GAP_SECONDS) -> list:
+    """
+    Pack segments into chunks of at most max_tokens (see iter_chunks).
+
+    Returns:
+        list[Chunk]: Chunks with token counts and time spans (None without timestamps)
+    """
+    return list(iter_chunks(segments, max_tokens, pause_gap))
+
+
+def split_sentences(text: str):
+    """Yield sentence segments of a plain transcript string."""
+    pos = 0
+    for match in _SENTENCE_END.finditer(text):
+        yield Segment(text[pos:match.start()])
+        pos = match.end()
+    if pos < len(text):
+        yield Segment(text[pos:])
+
+
+def chunk_text(text: str, max_tokens: int) -> list:
+    """
+    Chunk a plain transcript string (no timestamps) by sentences.
+
+    Returns:
+        list[Chunk]: Chunks of at most max_tokens estimated tokens
+    """
+    return chunk_segments(split_sentences(text), max_tokens)
@@ -0,0 +1,189 @@
+"""
+Headless batch summarizer.
+
+Reads YouTube URLs or video ids (one per line) from a file or stdin, summarizes
+them on a bounded worker pool and streams one JSON line per video to the output
+file as each one finishes.
+
+Usage:
+    python cli.py urls.txt -o summaries.jsonl --workers 4
+    cat urls.txt | python cli.py - -o summaries.jsonl --resume
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from batch_planner import OBJECTIVES
+from pipeline import PipelineReporter, extract_video_id, summarize_video
+
+logger = logging.getLogger(__name__)
+
+
+class CollectingReporter(PipelineReporter):
+    """
+    Keeps warnings for one video so they can be written to its output line.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.warnings = []
+
+    def warning(self, message):
+        super().warning(message)
+        self.warnings.append(message)
+
+
+def read_inputs(source) -> list:
+    """
+    Read non-empty, non-comment lines from an open text stream.
+    """
+    return [line.strip() for line in source if line.strip() and not line.lstrip().startswith("#")]
+
+
+def load_completed(output_path: str, retry_failed: bool) -> set:
+    """
+    Collect video ids already written to an existing output file.
+
+    A trailing partial line (from an interrupted run) is truncated so new
+    results can be appended safely.
+
+    Args:
+        output_path: JSONL output file
+        retry_failed: If True, lines with an error are not treated as done
+
+    Returns:
+        set: Video ids to skip
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+
+    completed = set()
+    for line in data.decode("utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if retry_failed and record.get("error"):
+            continue
+        completed.add(record.get("video_id"))
+    return completed
+
+
+def summarize_one(source: str, use_cache: bool, incremental: bool = False, objective: str = None) -> dict:
+    """
+    Summarize one URL or video id and build its output record. Never raises.
+    """
+    reporter = CollectingReporter()
+    record = {"input": source, "video_id": None, "summary": None, "metadata": None, "error": None}
+    try:
+        record["video_id"] = extract_video_id(source)
+        record["summary"] = summarize_video(source, reporter, use_cache=use_cache, incremental=incremental,
+                                            objective=objective)
+        if record["summary"] is None:
+            record["error"] = reporter.last_error or "Summarization failed"
+    except Exception as e:
+        record["error"] = str(e)
+    record["metadata"] = reporter.metadata
+    record["warnings"] = reporter.warnings
+    record["completed_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return record
+
+
+def run(sources: list, output_path: str, workers: int, resume: bool,
+        retry_failed: bool, use_cache: bool, incremental: bool = False, objective: str = None) -> int:
+    """
+    Summarize every source on a worker pool, appending JSONL records as they finish.
+
+    At most 2 x workers videos are queued at once, so memory stays flat for
+    input lists with many thousands of URLs.
+
+    Returns:
+        int: Number of videos that failed
+    """
+    done = load_completed(output_path, retry_failed) if resume else set()
+    pending = []
+    seen = set()
+    for source in sources:
+        try:
+            video_id = extract_video_id(source)
+        except ValueError:
+            video_id = source
+        if video_id in done or video_id in seen:
+            continue
+        seen.add(video_id)
+        pending.append(source)
+
+    logger.info("%d inputs, %d already done, %d to summarize", len(sources), len(done), len(pending))
+    failures = 0
+    mode = "a" if resume else "w"
+    with open(output_path, mode, encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        queue = iter(pending)
+        in_flight = set()
+        finished = 0
+        while True:
+            while len(in_flight) < workers * 2:
+                source = next(queue, None)
+                if source is None:
+                    break
+                in_flight.add(executor.submit(summarize_one, source, use_cache, incremental, objective))
+            if not in_flight:
+                break
+            completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                finished += 1
+                if record["error"]:
+                    failures += 1
+                    logger.warning("[%d/%d] %s failed: %s", finished, len(pending), record["input"], record["error"])
+                else:
+                    logger.info("[%d/%d] %s done", finished, len(pending), record["input"])
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize YouTube videos in bulk without the Streamlit UI.")
+    parser.add_argument("input", help="File with one URL or video id per line, or '-' for stdin")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to write results to")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Videos processed concurrently (default: 4)")
+    parser.add_argument("--resume", action="store_true", help="Skip videos already present in the output file")
+    parser.add_argument("--retry-failed", action="store_true", help="With --resume, redo videos that previously failed")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the summary cache")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-fetch captions and summarize only what was added since the last incremental run")
+    parser.add_argument("--objective", choices=OBJECTIVES,
+                        help="What the batch planner minimizes: calls, time or tokens (default: PLAN_OBJECTIVE)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log pipeline progress messages")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    # Per-video progress is always shown; pipeline messages only with --verbose
+    logger.setLevel(logging.INFO)
+
+    if args.input == "-":
+        sources = read_inputs(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            sources = read_inputs(f)
+
+    failures = run(sources, args.output, max(1, args.workers), args.resume, args.retry_failed, not args.no_cache,
+                   args.incremental, args.objective)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
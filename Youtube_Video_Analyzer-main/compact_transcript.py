@@ -0,0 +1,197 @@
+"""
+Compact, array-backed transcript that keeps caption timestamps.
+
+All snippet text lives in one string; per-snippet character offsets and
+start/duration times are stored in typed arrays instead of thousands of
+per-snippet Python objects. Views over a character or time range reference
+the parent buffer and only build a string when their text is requested.
+"""
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+from chunking import Segment
+
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "the a an and or but of to in on for with at by from is are was were be been this that "
+    "these those it its as into about over than then they them their there here what which "
+    "who how why when where will would can could should also more most very just not".split()
+)
+
+
+class TranscriptView:
+    """
+    Lazy view of snippets [first, last) of a CompactTranscript.
+    """
+
+    __slots__ = ("transcript", "first", "last")
+
+    def __init__(self, transcript: "CompactTranscript", first: int, last: int):
+        self.transcript = transcript
+        self.first = first
+        self.last = last
+
+    def __len__(self) -> int:
+        return self.last - self.first
+
+    @property
+    def char_range(self) -> tuple:
+        offsets = self.transcript.offsets
+        if self.first >= self.last:
+            return (offsets[self.first], offsets[self.first])
+        # Exclude the joining space after the last snippet
+        return (offsets[self.first], offsets[self.last] - 1)
+
+    @property
+    def text(self) -> str:
+        lo, hi = self.char_range
+        return self.transcript.text[lo:hi]
+
+    @property
+    def start(self) -> float:
+        return self.transcript.starts[self.first] if len(self) else None
+
+    @property
+    def end(self) -> float:
+        if not len(self):
+            return None
+        i = self.last - 1
+        return self.transcript.starts[i] + self.transcript.durations[i]
+
+    def segments(self):
+        """Yield the view's snippets as chunking.Segment tuples."""
+        t = self.transcript
+        for i in range(self.first, self.last):
+            yield Segment(t.snippet_text(i), t.starts[i], t.durations[i])
+
+
+class CompactTranscript:
+    """
+    One text buffer plus array('I') offsets and array('d') start/duration columns.
+
+    Snippet i spans text[offsets[i]:offsets[i+1] - 1]; snippets are joined with a
+    single space, so `text` equals the plain transcript string used elsewhere.
+    """
+
+    __slots__ = ("text", "offsets", "starts", "durations")
+
+    def __init__(self, text: str, offsets: array, starts: array, durations: array):
+        self.text = text
+        self.offsets = offsets
+        self.starts = starts
+        self.durations = durations
+
+    @classmethod
+    def from_snippets(cls, snippets: Iterable) -> "CompactTranscript":
+        """
+        Build from {"text", "start", "duration"} dicts (or objects with those attributes).
+        """
+        texts = []
+        offsets = array("I", [0])
+        starts = array("d")
+        durations = array("d")
+        position = 0
+        for snippet in snippets:
+            if isinstance(snippet, dict):
+                text, start, duration = snippet["text"], snippet.get("start", 0.0), snippet.get("duration", 0.0)
+            else:
+                text, start, duration = snippet.text, snippet.start, snippet.duration
+            texts.append(text)
+            position += len(text) + 1
+            offsets.append(position)
+            starts.append(float(start or 0.0))
+            durations.append(float(duration or 0.0))
+        return cls(" ".join(texts), offsets, starts, durations)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def duration_seconds(self) -> float:
+        if not len(self):
+            return 0.0
+        return self.starts[-1] + self.durations[-1]
+
+    def snippet_text(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def nbytes(self) -> int:
+        """Approximate payload size of the buffers (text as UTF-8 plus arrays)."""
+        arrays = (self.offsets, self.starts, self.durations)
+        return len(self.text.encode("utf-8")) + sum(a.itemsize * len(a) for a in arrays)
+
+    def view(self) -> TranscriptView:
+        return TranscriptView(self, 0, len(self))
+
+    def slice_chars(self, lo: int, hi: int) -> TranscriptView:
+        """View of every snippet overlapping the character range [lo, hi)."""
+        first = max(0, bisect_right(self.offsets, lo) - 1)
+        last = min(len(self), bisect_left(self.offsets, hi))
+        return TranscriptView(self, first, max(first, last))
+
+    def slice_time(self, t0: float, t1: float) -> TranscriptView:
+        """View of every snippet starting within [t0, t1) seconds."""
+        return TranscriptView(self, bisect_left(self.starts, t0), bisect_left(self.starts, t1))
+
+    def time_at_char(self, offset: int) -> float:
+        """Start time of the snippet containing a character offset."""
+        i = min(len(self) - 1, max(0, bisect_right(self.offsets, offset) - 1))
+        return self.starts[i]
+
+    def segments(self):
+        """Yield every snippet as a chunking.Segment (for chunk_segments)."""
+        return self.view().segments()
+
+    def locate(self, phrases: list, window_seconds: float = 30.0) -> list:
+        """
+        Estimate where in the video each phrase (e.g. a summary key point) is discussed.
+
+        See locate_phrases; the transcript's snippets are the segments.
+        """
+        return locate_phrases(self.segments(), phrases, window_seconds)
+
+
+def locate_phrases(segments: Iterable, phrases: list, window_seconds: float = 30.0) -> list:
+    """
+    Estimate where in the video each phrase (e.g. a summary key point) is discussed.
+
+    The transcript is cut into fixed time windows; each phrase is matched to the
+    window sharing the most distinctive words with it. Windows are scored as
+    they are read, so only one window's word set is held at a time and the
+    segments may come from a generator.
+
+    Args:
+        segments: chunking.Segment tuples with start times, in time order
+        phrases: Text to place on the timeline
+        window_seconds: Granularity of the returned timestamps
+
+    Returns:
+        list[float|None]: Window start time per phrase (None if nothing matched)
+    """
+    phrase_words = [
+        {w for w in _WORD.findall(str(phrase).lower()) if len(w) > 2 and w not in _STOPWORDS}
+        for phrase in phrases
+    ]
+    located = [None] * len(phrases)
+    best_scores = [0] * len(phrases)
+
+    def score(start, window):
+        for i, words in enumerate(phrase_words):
+            matched = len(words & window)
+            if matched > best_scores[i]:
+                located[i], best_scores[i] = start, matched
+
+    window, window_start = None, None
+    for segment in segments:
+        start = segment.start or 0.0
+        if window is None or start >= window_start + window_seconds:
+            if window is not None:
+                score(window_start, window)
+            window, window_start = set(), start
+        window.update(_WORD.findall(segment.text.lower()))
+    if window is not None:
+        score(window_start, window)
+    return located
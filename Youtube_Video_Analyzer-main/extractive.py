@@ -0,0 +1,281 @@
+"""
+Local extractive pre-compression of transcripts before any Gemini call.
+
+Spoken transcripts carry filler, sponsor reads and repetition that cost
+tokens (and, on long videos, whole map calls) without adding to the summary.
+This stage scores each sentence locally and keeps the most central ones, in
+their original order and with their caption timestamps, until a target ratio
+or token budget is met.
+
+Scoring uses a TF-IDF term matrix in sparse (CSR) form:
+
+- "textrank": PageRank over the cosine-similarity graph of the sentences.
+  The graph is never materialized; S @ r is computed as X @ (X.T @ r), so each
+  iteration costs O(non-zeros) instead of O(sentences^2).
+- "tfidf": cosine similarity of each sentence to the transcript centroid.
+
+NumPy is used when installed (imported on first use); otherwise the same
+sparse arithmetic runs in plain Python (slower, same result).
+"""
+import math
+import os
+import re
+
+from compact_transcript import _STOPWORDS, _WORD, CompactTranscript
+from lazy_imports import lazy_import
+from rate_limiter import estimate_tokens
+
+# Optional: the pure-Python path gives the same scores
+np = lazy_import("numpy")
+
+
+METHODS = ("textrank", "tfidf")
+DEFAULT_METHOD = "textrank"
+# Auto-captions often have no punctuation; cap "sentences" at this many words
+MAX_UNIT_WORDS = 40
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+# Spoken filler that carries no topic, on top of the usual stopwords
+_FILLER = frozenset(
+    "um uh erm ah oh like yeah okay ok right so really actually basically literally gonna wanna "
+    "gotta kind sort know mean thing things stuff guys you your i me my we our us he she him her "
+    "do does did don't doesn't it's that's i'm you're we're there's let's get got go going".split()
+)
+_UNIT_END = re.compile(r"[.!?]+(?=\s|$)")
+
+
+def compression_settings_from_env() -> dict:
+    """
+    Read pre-compression targets from the environment. Disabled unless one is set.
+
+    EXTRACTIVE_RATIO         - fraction of transcript tokens to keep, e.g. 0.4
+    EXTRACTIVE_TOKEN_BUDGET  - keep at most this many transcript tokens
+    EXTRACTIVE_METHOD        - textrank (default) or tfidf
+    """
+    ratio = os.getenv("EXTRACTIVE_RATIO")
+    budget = os.getenv("EXTRACTIVE_TOKEN_BUDGET")
+    return {
+        "ratio": float(ratio) if ratio else None,
+        "token_budget": int(budget) if budget else None,
+        "method": os.getenv("EXTRACTIVE_METHOD", DEFAULT_METHOD),
+    }
+
+
+def split_units(text: str) -> list:
+    """
+    Character ranges of the sentences of a transcript.
+
+    Sentences longer than MAX_UNIT_WORDS (unpunctuated auto-captions) are cut
+    every MAX_UNIT_WORDS words so each unit can be kept or dropped on its own.
+
+    Returns:
+        list[tuple]: (start, end) offsets into text
+    """
+    units = []
+    pos = 0
+    ends = [m.end() for m in _UNIT_END.finditer(text)]
+    if not ends or ends[-1] < len(text):
+        ends.append(len(text))
+    for end in ends:
+        words = [m.start() for m in re.finditer(r"\S+", text[pos:end])]
+        for i in range(0, len(words), MAX_UNIT_WORDS):
+            lo = pos + words[i]
+            hi = pos + words[i + MAX_UNIT_WORDS] if i + MAX_UNIT_WORDS < len(words) else end
+            while hi > lo and text[hi - 1].isspace():
+                hi -= 1
+            units.append((lo, hi))
+        pos = end
+    return units
+
+
+def _term_matrix(texts: list) -> tuple:
+    """
+    L2-normalized TF-IDF rows in CSR form (sublinear tf, smoothed idf).
+
+    Returns:
+        tuple: (indptr, indices, data, vocabulary_size) as plain lists
+    """
+    vocabulary = {}
+    rows = []
+    document_frequency = {}
+    for text in texts:
+        counts = {}
+        for word in _WORD.findall(text.lower()):
+            if len(word) > 2 and word not in _STOPWORDS and word not in _FILLER:
+                term = vocabulary.setdefault(word, len(vocabulary))
+                counts[term] = counts.get(term, 0) + 1
+        for term in counts:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+        rows.append(counts)
+
+    n = len(texts)
+    idf = {term: math.log((1 + n) / (1 + df)) + 1.0 for term, df in document_frequency.items()}
+    indptr, indices, data = [0], [], []
+    for counts in rows:
+        weights = [(term, (1.0 + math.log(tf)) * idf[term]) for term, tf in counts.items()]
+        norm = math.sqrt(sum(w * w for _, w in weights)) or 1.0
+        for term, w in weights:
+            indices.append(term)
+            data.append(w / norm)
+        indptr.append(len(indices))
+    return indptr, indices, data, len(vocabulary)
+
+
+def _scores_numpy(indptr, indices, data, vocabulary_size: int, method: str) -> list:
+    n = len(indptr) - 1
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    data = np.asarray(data, dtype=np.float64)
+    row_of = np.repeat(np.arange(n), np.diff(indptr))
+
+    def xt_dot(v):  # X.T @ v
+        return np.bincount(indices, weights=data * v[row_of], minlength=vocabulary_size)
+
+    def x_dot(w):  # X @ w
+        return np.bincount(row_of, weights=data * w[indices], minlength=n)
+
+    if method == "tfidf":
+        return (x_dot(xt_dot(np.ones(n)) / n)).tolist()
+
+    # Similarity without self-loops: S @ v = X @ (X.T @ v) - v for non-empty rows
+    self_similarity = (np.diff(indptr) > 0).astype(np.float64)
+    degree = x_dot(xt_dot(np.ones(n))) - self_similarity
+    dangling = degree <= 1e-12
+    safe_degree = np.where(dangling, 1.0, degree)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        share = np.where(dangling, 0.0, rank / safe_degree)
+        spread = x_dot(xt_dot(share)) - self_similarity * share
+        updated = (1 - DAMPING) / n + DAMPING * (spread + rank[dangling].sum() / n)
+        converged = np.abs(updated - rank).sum() < TOLERANCE
+        rank = updated
+        if converged:
+            break
+    return rank.tolist()
+
+
+def _scores_python(indptr, indices, data, vocabulary_size: int, method: str) -> list:
+    n = len(indptr) - 1
+
+    def xt_dot(v):
+        out = [0.0] * vocabulary_size
+        for row in range(n):
+            if v[row]:
+                for k in range(indptr[row], indptr[row + 1]):
+                    out[indices[k]] += data[k] * v[row]
+        return out
+
+    def x_dot(w):
+        return [
+            sum(data[k] * w[indices[k]] for k in range(indptr[row], indptr[row + 1]))
+            for row in range(n)
+        ]
+
+    if method == "tfidf":
+        centroid = [x / n for x in xt_dot([1.0] * n)]
+        return x_dot(centroid)
+
+    self_similarity = [1.0 if indptr[row + 1] > indptr[row] else 0.0 for row in range(n)]
+    degree = [d - s for d, s in zip(x_dot(xt_dot([1.0] * n)), self_similarity)]
+    dangling = [d <= 1e-12 for d in degree]
+    rank = [1.0 / n] * n
+    for _ in range(MAX_ITERATIONS):
+        share = [0.0 if dangling[i] else rank[i] / degree[i] for i in range(n)]
+        spread = x_dot(xt_dot(share))
+        leaked = sum(r for r, d in zip(rank, dangling) if d) / n
+        updated = [
+            (1 - DAMPING) / n + DAMPING * (spread[i] - self_similarity[i] * share[i] + leaked)
+            for i in range(n)
+        ]
+        converged = sum(abs(a - b) for a, b in zip(updated, rank)) < TOLERANCE
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def score_units(texts: list, method: str = DEFAULT_METHOD) -> list:
+    """
+    Importance score per sentence (higher is more central to the transcript).
+
+    Raises:
+        ValueError: If method is not one of METHODS
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if not texts:
+        return []
+    matrix = _term_matrix(texts)
+    scorer = _scores_numpy if np is not None else _scores_python
+    return scorer(*matrix, method)
+
+
+def compress_transcript(transcript: CompactTranscript, ratio: float = None, token_budget: int = None,
+                        method: str = DEFAULT_METHOD) -> tuple:
+    """
+    Keep the highest-scoring sentences of a transcript within a token target.
+
+    Kept sentences stay in their original order; each becomes one snippet of
+    the returned transcript, timed from the captions it came from, so chunk
+    time spans and key point timestamps still point into the video.
+
+    Args:
+        transcript: Full transcript
+        ratio: Fraction of the transcript's tokens to keep (0-1)
+        token_budget: Absolute cap on kept tokens; the tighter target wins
+        method: "textrank" or "tfidf"
+
+    Returns:
+        tuple: (CompactTranscript, stats dict) - the input unchanged if it already fits
+
+    Raises:
+        ValueError: If neither target is given, or the method is unknown
+    """
+    if ratio is None and token_budget is None:
+        raise ValueError("compress_transcript needs a ratio or a token_budget")
+    text = transcript.text
+    input_tokens = estimate_tokens(text)
+    targets = [input_tokens]
+    if ratio is not None:
+        targets.append(int(input_tokens * ratio))
+    if token_budget is not None:
+        targets.append(token_budget)
+    target = max(1, min(targets))
+
+    units = split_units(text)
+    stats = {
+        "method": method,
+        "backend": "numpy" if np is not None else "python",
+        "input_tokens": input_tokens,
+        "target_tokens": target,
+        "sentences": len(units),
+    }
+    if input_tokens <= target:
+        return transcript, {**stats, "output_tokens": input_tokens, "kept_sentences": len(units)}
+
+    unit_texts = [text[lo:hi] for lo, hi in units]
+    scores = score_units(unit_texts, method)
+    kept = []
+    kept_tokens = 0
+    seen = set()
+    for i in sorted(range(len(units)), key=lambda i: scores[i], reverse=True):
+        # A repeated sentence (recurring sponsor line, re-stated point) is kept once
+        normalized = " ".join(_WORD.findall(unit_texts[i].lower()))
+        if normalized in seen:
+            continue
+        tokens = estimate_tokens(unit_texts[i])
+        if kept_tokens + tokens <= target:
+            kept.append(i)
+            kept_tokens += tokens
+            seen.add(normalized)
+
+    snippets = []
+    for i in sorted(kept):
+        lo, hi = units[i]
+        start = transcript.time_at_char(lo)
+        last = max(0, min(len(transcript) - 1, transcript.slice_chars(lo, hi).last - 1))
+        end = transcript.starts[last] + transcript.durations[last]
+        snippets.append({"text": unit_texts[i], "start": start, "duration": max(0.0, end - start)})
+    compressed = CompactTranscript.from_snippets(snippets)
+    return compressed, {**stats, "output_tokens": estimate_tokens(compressed.text), "kept_sentences": len(kept)}
@@ -0,0 +1,121 @@
+"""
+Local fake of Gemini's generateContent REST endpoint for offline load tests.
+
+Responses are schema-valid summaries built from the request text, with
+configurable latency distribution, 429 rate and malformed-JSON rate. Point the
+app at it with LLM_BACKEND=http and LLM_BACKEND_URL=http://localhost:8787.
+
+Usage:
+    python fake_gemini_server.py --port 8787 --latency-mean 2 --rate-429 0.05 --malformed-rate 0.02
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import LATENCY_DISTRIBUTIONS, FakeResponder
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGemini/1.0"
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.split("?")[0].endswith(":generateContent"):
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            prompt_text = "".join(
+                part.get("text", "") for content in request["contents"] for part in content["parts"]
+            )
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": {"code": 400, "message": "Invalid request body"}})
+            return
+
+        latency, status, text = self.server.responder.respond(prompt_text)
+        time.sleep(latency)
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+            self.server.stats[status] += 1
+        if status == "rate_limited":
+            self._send_json(
+                429,
+                {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": text}},
+                {"Retry-After": "1"},
+            )
+            return
+        self._send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+        })
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host: str, port: int, responder: FakeResponder, verbose: bool = False) -> ThreadingHTTPServer:
+    """Create (but do not start) a fake Gemini server."""
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.responder = responder
+    server.verbose = verbose
+    server.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "malformed": 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent server for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-mean", type=float, default=1.0, help="Mean response latency in seconds")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="Half-width for uniform, sigma for lognormal")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of calls with broken JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    responder = FakeResponder(
+        latency_mean=args.latency_mean,
+        latency_distribution=args.latency_dist,
+        latency_spread=args.latency_spread,
+        rate_limit_rate=args.rate_429,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    server = make_server(args.host, args.port, responder, args.verbose)
+    print(f"Fake Gemini listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
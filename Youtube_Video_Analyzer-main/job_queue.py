@@ -0,0 +1,586 @@
+"""
+Background summarization jobs.
+
+The UI submits a video and gets a job id back; a pool of worker processes
+claims queued jobs (highest priority first) and runs the pipeline. Progress
+messages, the streamed partial summary, the result and any error are written
+to a SQLite job store under CACHE_DIR, so a Streamlit rerun or a closed tab
+never loses work and throughput scales with the number of workers.
+
+Workers normally run inside the Streamlit process (JOB_WORKERS, default 2),
+but can also be started on their own, sharing the same CACHE_DIR:
+
+    python job_queue.py --workers 4
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from pipeline import (
+    MODEL_NAME,
+    PipelineReporter,
+    extract_video_id,
+    final_prompt,
+    prompt,
+    summarize_video,
+    warm_up,
+    warm_up_settings_from_env,
+)
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+from single_flight import flight_key
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "./cache"
+DEFAULT_WORKERS = 2
+DEFAULT_POLL_SECONDS = 1.0
+# A running job whose worker has not reported for this long is handed to another worker
+DEFAULT_STALE_SECONDS = 600
+# How often a worker refreshes the heartbeat of the job it runs (at most a quarter of the stale timeout)
+HEARTBEAT_SECONDS = 30.0
+PARTIAL_WRITE_INTERVAL = 0.5
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the job it is running was cancelled."""
+
+
+class JobStore:
+    """
+    SQLite-backed queue of summarization jobs and their progress events.
+
+    Args:
+        path: SQLite database file
+        stale_seconds: Heartbeat age after which a running job is requeued
+    """
+
+    def __init__(self, path: str, stale_seconds: float = DEFAULT_STALE_SECONDS):
+        self.path = path
+        self.stale_seconds = stale_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    request_key TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    stream INTEGER NOT NULL,
+                    use_cache INTEGER NOT NULL,
+                    incremental INTEGER NOT NULL DEFAULT 0,
+                    objective TEXT,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    joined INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL,
+                    partial_json TEXT,
+                    result_json TEXT,
+                    metadata_json TEXT,
+                    error TEXT,
+                    error_type TEXT
+                )"""
+            )
+            # Job stores created before incremental refreshes / planner objectives existed
+            for column in ("incremental INTEGER NOT NULL DEFAULT 0", "objective TEXT"):
+                try:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+                except sqlite3.OperationalError:
+                    pass
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, created_at)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_request ON jobs(request_key, status)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS job_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    level TEXT NOT NULL,
+                    message TEXT NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, seq)")
+
+    @classmethod
+    def from_env(cls) -> "JobStore":
+        """
+        CACHE_DIR          - directory holding jobs.sqlite3 (default ./cache)
+        JOB_STALE_SECONDS  - heartbeat age after which a running job is requeued
+        """
+        return cls(
+            os.path.join(os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR), "jobs.sqlite3"),
+            stale_seconds=float(os.getenv("JOB_STALE_SECONDS", DEFAULT_STALE_SECONDS)),
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        job = dict(row)
+        for column in ("partial_json", "result_json", "metadata_json"):
+            value = job.pop(column)
+            job[column[:-5]] = json.loads(value) if value else None
+        job["stream"] = bool(job["stream"])
+        job["use_cache"] = bool(job["use_cache"])
+        job["incremental"] = bool(job["incremental"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def submit(self, url: str, priority: int = PRIORITY_NORMAL, stream: bool = True,
+               use_cache: bool = True, incremental: bool = False, objective: str = None) -> str:
+        """
+        Queue a video for summarization.
+
+        An identical request (same video, prompt and model) that is still queued
+        or running is joined instead of queued twice; its priority is raised to
+        the higher of the two. objective (what the batch planner minimizes, None
+        for PLAN_OBJECTIVE) does not change the summary, so it does not prevent joining.
+
+        Returns:
+            str: Job id
+
+        Raises:
+            ValueError: If the URL is not a recognizable YouTube URL
+        """
+        video_id = extract_video_id(url)
+        request_key = flight_key(video_id, prompt + final_prompt, MODEL_NAME)
+        if not use_cache:
+            request_key += "-nocache"
+        if incremental:
+            request_key += "-incremental"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id FROM jobs WHERE request_key = ? AND status IN ('queued', 'running') "
+                    "AND cancel_requested = 0 ORDER BY created_at LIMIT 1",
+                    (request_key,),
+                ).fetchone()
+                if row is not None:
+                    job_id = row["job_id"]
+                    conn.execute(
+                        "UPDATE jobs SET joined = joined + 1, priority = MAX(priority, ?) WHERE job_id = ?",
+                        (priority, job_id),
+                    )
+                else:
+                    job_id = uuid.uuid4().hex
+                    conn.execute(
+                        """INSERT INTO jobs (job_id, url, video_id, request_key, priority, stream,
+                                             use_cache, incremental, objective, status, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?)""",
+                        (job_id, url, video_id, request_key, priority, int(stream), int(use_cache),
+                         int(incremental), objective, time.time()),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim_next(self, worker: str):
+        """
+        Atomically take the highest-priority queued job, requeueing stale ones first.
+
+        Returns:
+            dict: The claimed job, or None if the queue is empty
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL "
+                    "WHERE status = 'running' AND heartbeat_at < ?",
+                    (now - self.stale_seconds,),
+                )
+                row = conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? "
+                        "WHERE job_id = ?",
+                        (worker, now, now, row["job_id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["job_id"]) if row is not None else None
+
+    def get(self, job_id: str):
+        """Return one job as a dict, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def add_event(self, job_id: str, level: str, message: str) -> bool:
+        """
+        Record a progress message and refresh the job's heartbeat.
+
+        Returns:
+            bool: True if cancellation of the job has been requested
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_events (job_id, created_at, level, message) VALUES (?, ?, ?, ?)",
+                (job_id, now, level, message),
+            )
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?", (now, job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def heartbeat(self, job_id: str, worker: str) -> str:
+        """
+        Refresh the heartbeat of a job this worker is running.
+
+        Returns:
+            str: "running", "cancel" if cancellation has been requested, or "lost" if the
+                job is no longer running on this worker (requeued as stale, or finished)
+        """
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND status = 'running' AND worker = ?",
+                (time.time(), job_id, worker),
+            ).rowcount
+            if not updated:
+                return "lost"
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return "cancel" if row["cancel_requested"] else "running"
+
+    def events(self, job_id: str, after_seq: int = 0) -> list:
+        """Progress events of a job in order: dicts with seq, created_at, level, message."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, created_at, level, message FROM job_events WHERE job_id = ? AND seq > ? "
+                "ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def update(self, job_id: str, **fields) -> None:
+        """Set columns of a job; partial/result/metadata are stored as JSON."""
+        columns = []
+        values = []
+        for name, value in fields.items():
+            if name in ("partial", "result", "metadata"):
+                name, value = f"{name}_json", json.dumps(value, ensure_ascii=False) if value is not None else None
+            columns.append(f"{name} = ?")
+            values.append(value)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(columns)} WHERE job_id = ?", (*values, job_id))
+
+    def cancel(self, job_id: str) -> None:
+        """
+        Cancel a job: a queued job is cancelled at once, a running one at the first progress
+        report after its worker's next heartbeat sees the request.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,)
+            )
+
+    def list_jobs(self, limit: int = 50) -> list:
+        """Most recent jobs first."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def stats(self) -> dict:
+        """Job counts by status plus the number of submissions that joined an existing job."""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            joined = conn.execute("SELECT COALESCE(SUM(joined), 0) FROM jobs").fetchone()[0]
+        return {
+            status: counts.get(status, 0)
+            for status in ("queued", "running", "done", "failed", "cancelled")
+        } | {"joined": joined}
+
+
+class JobReporter(PipelineReporter):
+    """
+    Writes pipeline progress into the job store and stops the run once the
+    job is cancelled.
+    """
+
+    def __init__(self, store: JobStore, job_id: str):
+        super().__init__()
+        self.store = store
+        self.job_id = job_id
+        self._last_partial = 0.0
+        # Set by the heartbeat: "cancel" or "lost" stops the run at its next report
+        self.stop_reason = None
+
+    def _check_stop(self) -> None:
+        if self.stop_reason is not None:
+            raise JobCancelled(self.job_id)
+
+    def _event(self, level: str, message: str) -> None:
+        if self.store.add_event(self.job_id, level, message) and self.stop_reason is None:
+            self.stop_reason = "cancel"
+        self._check_stop()
+
+    def info(self, message):
+        self._event("info", message)
+
+    def warning(self, message):
+        self._event("warning", message)
+
+    def error(self, message):
+        super().error(message)
+        self.store.add_event(self.job_id, "error", message)
+
+    def success(self, message):
+        self._event("success", message)
+
+    def record_metadata(self, metadata):
+        super().record_metadata(metadata)
+        self.store.update(self.job_id, metadata=metadata)
+
+    def partial_summary(self, partial):
+        self._check_stop()
+        # Partial summaries arrive per streamed chunk; throttle the writes
+        now = time.monotonic()
+        if now - self._last_partial >= PARTIAL_WRITE_INTERVAL:
+            self._last_partial = now
+            self.store.update(self.job_id, partial=partial)
+
+
+@contextmanager
+def keep_alive(store: JobStore, job: dict, reporter: JobReporter):
+    """
+    Refresh a running job's heartbeat from a background thread and watch for
+    cancellation on the same tick, however long the pipeline goes without
+    reporting progress (one slow call, quota cooldowns, a large reduce level).
+    """
+    interval = min(HEARTBEAT_SECONDS, store.stale_seconds / 4)
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(interval):
+            try:
+                state = store.heartbeat(job["job_id"], job["worker"])
+            except sqlite3.Error as e:
+                logger.warning("Heartbeat of job %s failed: %s", job["job_id"], e)
+                continue
+            if state != "running":
+                reporter.stop_reason = reporter.stop_reason or state
+                if state == "lost":
+                    return
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job['job_id'][:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(store: JobStore, job: dict) -> None:
+    """Run one claimed job to completion, recording its outcome in the store."""
+    job_id = job["job_id"]
+    reporter = JobReporter(store, job_id)
+    try:
+        with keep_alive(store, job, reporter):
+            summary = summarize_video(job["url"], reporter, use_cache=job["use_cache"], stream=job["stream"],
+                                      incremental=job["incremental"], objective=job["objective"])
+    except JobCancelled:
+        if reporter.stop_reason == "lost":
+            logger.warning("Job %s is no longer ours; dropping this run", job_id)
+            return
+        current = store.get(job_id)
+        if current and current["cancel_requested"]:
+            store.update(job_id, status="cancelled", finished_at=time.time(), partial=None)
+        else:
+            # Joined a run that another job's cancellation stopped; try again
+            store.update(job_id, status="queued", worker=None)
+        return
+    except Exception as e:
+        if reporter.stop_reason != "lost":
+            store.update(job_id, status="failed", finished_at=time.time(), error=str(e),
+                         error_type=type(e).__name__, partial=None)
+        return
+    if reporter.stop_reason == "lost":
+        # Another worker owns the job now; its outcome is the one recorded
+        logger.warning("Job %s is no longer ours; discarding this run's result", job_id)
+        return
+    if summary:
+        store.update(job_id, status="done", finished_at=time.time(), result=summary,
+                     metadata=reporter.metadata, partial=None)
+    else:
+        store.update(job_id, status="failed", finished_at=time.time(),
+                     error=reporter.last_error or "Summarization failed", partial=None)
+
+
+def run_worker(worker: str, poll_seconds: float = DEFAULT_POLL_SECONDS, rate_share: float = 1.0,
+               parent_pid: int = None) -> None:
+    """
+    Worker loop: claim, run, repeat.
+
+    Args:
+        worker: Name recorded on claimed jobs
+        poll_seconds: Sleep between polls of an empty queue
+        rate_share: Fraction of GEMINI_RPM/GEMINI_TPM this worker may use, so
+            all workers together stay within the quota
+        parent_pid: Exit once this process (the app that started the worker) is gone
+    """
+    if rate_share < 1.0:
+        for name, default in (("GEMINI_RPM", DEFAULT_REQUESTS_PER_MINUTE),
+                              ("GEMINI_TPM", DEFAULT_TOKENS_PER_MINUTE)):
+            os.environ[name] = str(float(os.getenv(name, default)) * rate_share)
+    settings = warm_up_settings_from_env()
+    if settings["enabled"]:
+        # Before claiming anything, so the first job does not pay for SDK imports and clients
+        logger.info("Worker %s warmed up: %s", worker, warm_up(connect=settings["connect"]))
+    logger.info("Worker %s started", worker)
+    while parent_pid is None or os.getppid() == parent_pid:
+        job = job_store.claim_next(worker)
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+        logger.info("Worker %s running job %s (%s)", worker, job["job_id"], job["video_id"])
+        run_job(job_store, job)
+
+
+class WorkerPool:
+    """
+    Worker processes sharing one job store.
+
+    Workers are started as separate interpreters running this file rather than
+    through multiprocessing: Streamlit executes app.py as __main__, which
+    multiprocessing's spawn mode would re-run in every child.
+
+    Args:
+        workers: Number of processes
+        poll_seconds: Sleep between polls of an empty queue
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._processes = []
+
+    @classmethod
+    def from_env(cls) -> "WorkerPool":
+        """
+        JOB_WORKERS       - worker processes started with the app (default 2, 0 = external workers only)
+        JOB_POLL_SECONDS  - idle poll interval
+        """
+        return cls(
+            workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+            poll_seconds=float(os.getenv("JOB_POLL_SECONDS", DEFAULT_POLL_SECONDS)),
+        )
+
+    def start(self) -> None:
+        host = socket.gethostname()
+        for index in range(self.workers):
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--run-worker", f"{host}:{os.getpid()}:{index}",
+                "--poll-seconds", str(self.poll_seconds),
+                "--rate-share", str(1.0 / self.workers),
+                "--parent-pid", str(os.getpid()),
+            ]
+            self._processes.append(subprocess.Popen(command))
+
+    def alive(self) -> int:
+        return sum(1 for process in self._processes if process.poll() is None)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+## Shared by the UI and by the worker loop in this process
+job_store = JobStore.from_env()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    """Start (once per process) and return the process-wide worker pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = WorkerPool.from_env()
+                pool.start()
+                atexit.register(pool.stop)
+                _pool = pool
+    return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run summarization workers against the shared job store.")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS)
+    # Internal: run a single worker loop (used by WorkerPool)
+    parser.add_argument("--run-worker", metavar="NAME", help=argparse.SUPPRESS)
+    parser.add_argument("--rate-share", type=float, default=1.0, help=argparse.SUPPRESS)
+    parser.add_argument("--parent-pid", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.run_worker:
+        try:
+            run_worker(args.run_worker, args.poll_seconds, args.rate_share, args.parent_pid)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    pool = WorkerPool(args.workers, args.poll_seconds)
+    pool.start()
+    try:
+        while pool.alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
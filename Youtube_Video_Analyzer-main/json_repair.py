@@ -0,0 +1,153 @@
+"""
+Local repair of almost-valid summary JSON.
+
+Models occasionally wrap the object in prose or code fences, leave a trailing
+comma, emit Python literals or raw newlines inside strings, stop before the
+closing brace, or return key points as objects instead of strings. Each of
+these used to fail the whole batch; repairing them locally costs nothing,
+while re-asking costs a Gemini call.
+"""
+import json
+import re
+
+from partial_json import parse_partial_summary
+
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def extract_json_object(text: str) -> str:
+    """
+    Return the outermost {...} object in text, dropping fences and surrounding prose.
+
+    An object that is never closed (truncated output) is returned up to the end.
+    """
+    fenced = _FENCE.search(text)
+    if fenced and "{" in fenced.group(1):
+        text = fenced.group(1)
+    start = text.find("{")
+    if start < 0:
+        return text.strip()
+    depth = 0
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix common syntax slips in one string-aware pass.
+
+    - raw newlines and tabs inside strings
+    - trailing commas before } or ]
+    - Python True/False/None
+    """
+    text = extract_json_object(text)
+    out = []
+    in_string = escaped = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch in _STRING_ESCAPES:
+                ch = _STRING_ESCAPES[ch]
+            out.append(ch)
+            i += 1
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == ",":
+            j = i + 1
+            while j < len(text) and text[j] in " \t\r\n":
+                j += 1
+            if j >= len(text) or text[j] in "}]":
+                i += 1
+                continue
+        elif ch.isalpha():
+            j = i
+            while j < len(text) and text[j].isalpha():
+                j += 1
+            word = text[i:j]
+            out.append(_PYTHON_LITERALS.get(word, word))
+            i = j
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _as_text(value) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return " — ".join(_as_text(v) for v in value.values() if v not in (None, ""))
+    if isinstance(value, (list, tuple)):
+        return " ".join(_as_text(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def coerce_summary(data: dict) -> dict:
+    """
+    Bring a parsed object into the summary schema: text fields as strings and
+    key_points as a list of non-empty strings.
+    """
+    data = dict(data)
+    for field in ("title", "overview", "conclusion"):
+        if field in data and not isinstance(data[field], str):
+            data[field] = _as_text(data[field])
+    points = data.get("key_points")
+    if isinstance(points, str):
+        points = [_BULLET.sub("", line) for line in points.splitlines()]
+    elif isinstance(points, dict):
+        points = list(points.values())
+    if isinstance(points, list):
+        data["key_points"] = [text for text in (_as_text(point) for point in points) if text]
+    return data
+
+
+def loads_lenient(text: str) -> dict:
+    """
+    Parse a summary object, repairing it if needed.
+
+    Truncated output falls back to its completed fields only, so a value cut
+    off mid-sentence is dropped rather than kept half-written. Recovery also
+    stops at a closer that does not match (`["a", 1}`), keeping what came before.
+
+    Raises:
+        ValueError: If no object can be recovered
+    """
+    repaired = repair_json(text)
+    try:
+        data = json.loads(repaired)
+    except json.JSONDecodeError:
+        data = parse_partial_summary(repaired)
+        if not data:
+            raise ValueError("No JSON object could be recovered from the response")
+    if not isinstance(data, dict):
+        raise ValueError("Response is not a JSON object")
+    return coerce_summary(data)
@@ -0,0 +1,61 @@
+"""
+Deferred imports of heavy modules.
+
+NumPy, the YouTube transcript client and the Gemini SDK together take around
+a second to import - time every cold worker process and every fresh
+Streamlit server would otherwise spend before its first request. Modules that
+only need them on some code paths hold a LazyModule instead: the real import
+happens on first attribute access (the interpreter's import lock makes that
+safe from several threads), and a missing optional package still shows up as
+None at import time without executing anything.
+"""
+import importlib
+import importlib.util
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Args:
+        name: Absolute module name
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}'{' (loaded)' if self.loaded else ''}>"
+
+
+def lazy_import(name: str):
+    """
+    Return a LazyModule for an installed module, or None if it is not installed.
+
+    Only the module's spec is looked up here; nothing is executed.
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+    return LazyModule(name) if spec is not None else None
+
+
+def preload(*modules) -> None:
+    """Import lazily held modules now (warm-up); None entries are skipped."""
+    for module in modules:
+        if isinstance(module, LazyModule):
+            module._load()
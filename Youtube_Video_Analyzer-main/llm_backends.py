@@ -0,0 +1,383 @@
+"""
+Pluggable LLM backends.
+
+The pipeline talks to an LLMBackend instead of the Gemini SDK directly. Three
+backends ship with the app:
+
+- "gemini": the google-generativeai SDK (default)
+- "http":   Gemini's REST API at a configurable base URL - point it at
+            fake_gemini_server.py to load-test the full HTTP path offline
+- "fake":   in-process stand-in with configurable latency, 429 and
+            malformed-JSON rates, for deterministic offline benchmarks
+
+Select one with LLM_BACKEND; register more with register_backend().
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from rate_limiter import estimate_tokens
+
+
+class LLMError(Exception):
+    """A generation call failed and should not be retried."""
+
+
+class RateLimitError(LLMError):
+    """The backend rejected the call for quota/rate reasons (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMBackend:
+    """
+    Interface every backend implements.
+
+    generate() returns the full response text. With stream=True, on_chunk is
+    called with each piece of text as it arrives. response_schema (an OpenAPI
+    style dict) requests JSON output matching it from backends that support
+    structured output; others ignore it.
+    """
+
+    name = "base"
+    requires_api_key = False
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def generate(self, prompt_text: str, stream: bool = False, on_chunk=None, response_schema: dict = None) -> str:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt_text: str) -> str:
+        return await asyncio.to_thread(self.generate, prompt_text)
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def warm_up(self) -> None:
+        """Pay one-off set-up costs (SDK import, client creation) before the first call."""
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Gemini through the google-generativeai SDK.
+
+    The SDK is imported, and the client and GenerativeModel built, on the first
+    call (or warm_up) and then reused by every call and retry of the process.
+    """
+
+    name = "gemini"
+    requires_api_key = True
+
+    def __init__(self, model_name: str, api_key: str = None):
+        super().__init__(model_name)
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self._model_instance = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _client_options(self) -> dict:
+        return {"api_key": self.api_key} if self.api_key else None
+
+    def _model(self):
+        if self._model_instance is None:
+            with self._lock:
+                if self._model_instance is None:
+                    import google.generativeai as genai
+                    from google.ai import generativelanguage as glm
+
+                    model = genai.GenerativeModel(self.model_name)
+                    # A client per key instead of genai.configure(), which is process-global
+                    model._client = glm.GenerativeServiceClient(client_options=self._client_options())
+                    self._model_instance = model
+        return self._model_instance
+
+    def _async_model(self):
+        model = self._model()
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    from google.ai import generativelanguage as glm
+
+                    # Created on first async use: grpc.aio channels belong to the running event loop
+                    self._async_client = glm.GenerativeServiceAsyncClient(client_options=self._client_options())
+                    model._async_client = self._async_client
+        return model
+
+    def warm_up(self) -> None:
+        self._model()
+
+    @staticmethod
+    def _generation_config(response_schema: dict):
+        if not response_schema:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    @staticmethod
+    def _translate(e: Exception) -> LLMError:
+        from google.api_core import exceptions as google_exceptions
+
+        message = str(e)
+        if isinstance(e, google_exceptions.TooManyRequests) or "429" in message or "quota" in message.lower():
+            return RateLimitError(message)
+        return LLMError(message)
+
+    def generate(self, prompt_text: str, stream: bool = False, on_chunk=None, response_schema: dict = None) -> str:
+        config = self._generation_config(response_schema)
+        try:
+            if not stream:
+                return self._model().generate_content(prompt_text, generation_config=config).text
+            parts = []
+            for chunk in self._model().generate_content(prompt_text, stream=True, generation_config=config):
+                # Stream chunks carrying only finish/safety metadata have no text parts
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                parts.append(text)
+                if on_chunk:
+                    on_chunk(text)
+            return "".join(parts)
+        except LLMError:
+            raise
+        except Exception as e:
+            raise self._translate(e) from e
+
+    async def agenerate(self, prompt_text: str) -> str:
+        try:
+            response = await self._async_model().generate_content_async(prompt_text)
+            return response.text
+        except Exception as e:
+            raise self._translate(e) from e
+
+    def count_tokens(self, text: str) -> int:
+        try:
+            return self._model().count_tokens(text).total_tokens
+        except Exception:
+            return estimate_tokens(text)
+
+
+class GeminiRESTBackend(LLMBackend):
+    """
+    Gemini's generateContent REST endpoint over a pooled requests session.
+
+    LLM_BACKEND_URL overrides the base URL (e.g. http://localhost:8787 for the
+    fake server).
+    """
+
+    name = "http"
+    requires_api_key = False
+    DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+
+    def __init__(self, model_name: str, api_key: str = None, base_url: str = None, timeout: float = 300):
+        super().__init__(model_name)
+        from transcript_store import get_http_session
+
+        self.session = get_http_session()
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY", "")
+        self.base_url = (base_url or os.getenv("LLM_BACKEND_URL") or self.DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout
+
+    def generate(self, prompt_text: str, stream: bool = False, on_chunk=None, response_schema: dict = None) -> str:
+        url = f"{self.base_url}/v1beta/models/{self.model_name}:generateContent"
+        body = {"contents": [{"parts": [{"text": prompt_text}]}]}
+        if response_schema:
+            body["generationConfig"] = {"responseMimeType": "application/json", "responseSchema": response_schema}
+        try:
+            response = self.session.post(url, params={"key": self.api_key}, json=body, timeout=self.timeout)
+        except Exception as e:
+            raise LLMError(f"Request to {url} failed: {e}") from e
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitError(f"429 {response.text[:200]}", float(retry_after) if retry_after else None)
+        if response.status_code >= 400:
+            raise LLMError(f"{response.status_code} {response.text[:200]}")
+        try:
+            parts = response.json()["candidates"][0]["content"]["parts"]
+            text = "".join(part.get("text", "") for part in parts)
+        except (ValueError, KeyError, IndexError) as e:
+            raise LLMError(f"Unexpected response shape: {e}") from e
+        if stream and on_chunk:
+            on_chunk(text)
+        return text
+
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+class FakeResponder:
+    """
+    Deterministic stand-in for Gemini's behaviour.
+
+    Each call's outcome (latency, 429, malformed JSON) is drawn from an RNG
+    seeded by the seed, the prompt and how many times that prompt was seen, so
+    results do not depend on thread scheduling and retries can succeed.
+    """
+
+    def __init__(self, latency_mean: float = 1.0, latency_distribution: str = "lognormal",
+                 latency_spread: float = 0.5, rate_limit_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.latency_mean = latency_mean
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "FakeResponder":
+        """
+        FAKE_LLM_LATENCY_MEAN, FAKE_LLM_LATENCY_DIST, FAKE_LLM_LATENCY_SPREAD,
+        FAKE_LLM_429_RATE, FAKE_LLM_MALFORMED_RATE, FAKE_LLM_SEED
+        """
+        return cls(
+            latency_mean=float(os.getenv("FAKE_LLM_LATENCY_MEAN", 1.0)),
+            latency_distribution=os.getenv("FAKE_LLM_LATENCY_DIST", "lognormal"),
+            latency_spread=float(os.getenv("FAKE_LLM_LATENCY_SPREAD", 0.5)),
+            rate_limit_rate=float(os.getenv("FAKE_LLM_429_RATE", 0.0)),
+            malformed_rate=float(os.getenv("FAKE_LLM_MALFORMED_RATE", 0.0)),
+            seed=int(os.getenv("FAKE_LLM_SEED", 0)),
+        )
+
+    def _rng(self, prompt_text: str) -> random.Random:
+        digest = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    def _latency(self, rng: random.Random) -> float:
+        mean, spread = self.latency_mean, self.latency_spread
+        if self.latency_distribution == "constant":
+            return mean
+        if self.latency_distribution == "uniform":
+            return max(0.0, rng.uniform(mean - spread, mean + spread))
+        if self.latency_distribution == "exponential":
+            return rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        # lognormal with the requested mean; spread is sigma of the underlying normal
+        mu = math.log(mean) - spread ** 2 / 2 if mean > 0 else 0.0
+        return rng.lognormvariate(mu, spread) if mean > 0 else 0.0
+
+    def respond(self, prompt_text: str) -> tuple:
+        """
+        Decide the outcome of one call.
+
+        Returns:
+            tuple: (latency_seconds, status, text) where status is "ok", "rate_limited" or "malformed"
+        """
+        rng = self._rng(prompt_text)
+        latency = self._latency(rng)
+        if rng.random() < self.rate_limit_rate:
+            return latency * 0.1, "rate_limited", "429 Resource has been exhausted (e.g. check quota)."
+        summary = fake_summary(prompt_text)
+        text = json.dumps(summary)
+        if rng.random() < self.malformed_rate:
+            # Typical model slips: preamble text, trailing comma, or a cut-off object
+            text = rng.choice([
+                "Here is the summary:\n" + text,
+                text[:-1] + ",}",
+                text[: len(text) // 2],
+            ])
+            return latency, "malformed", text
+        return latency, "ok", text
+
+
+_WORDS = re.compile(r"[A-Za-z][A-Za-z']+")
+
+
+def fake_summary(prompt_text: str) -> dict:
+    """Schema-valid summary built from the words of the input."""
+    words = _WORDS.findall(prompt_text[-20000:])
+    if not words:
+        words = ["empty", "transcript"]
+    step = max(1, len(words) // 5)
+    points = [" ".join(words[i:i + 8]) for i in range(0, len(words), step)][:5]
+    return {
+        "title": " ".join(words[:6]).title(),
+        "overview": " ".join(words[:30]) + ".",
+        "key_points": points,
+        "conclusion": " ".join(words[-12:]) + ".",
+    }
+
+
+class FakeBackend(LLMBackend):
+    """In-process fake driven by a FakeResponder; no network, no quota."""
+
+    name = "fake"
+
+    def __init__(self, model_name: str, responder: FakeResponder = None, api_key: str = None):
+        super().__init__(model_name)
+        self.responder = responder or FakeResponder.from_env()
+        self.api_key = api_key
+
+    def generate(self, prompt_text: str, stream: bool = False, on_chunk=None, response_schema: dict = None) -> str:
+        latency, status, text = self.responder.respond(prompt_text)
+        if status == "rate_limited":
+            time.sleep(latency)
+            raise RateLimitError(text)
+        if not (stream and on_chunk):
+            time.sleep(latency)
+            return text
+        pieces = [text[i:i + 40] for i in range(0, len(text), 40)] or [""]
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            on_chunk(piece)
+        return text
+
+    async def agenerate(self, prompt_text: str) -> str:
+        latency, status, text = self.responder.respond(prompt_text)
+        await asyncio.sleep(latency)
+        if status == "rate_limited":
+            raise RateLimitError(text)
+        return text
+
+
+BACKENDS = {
+    GeminiBackend.name: GeminiBackend,
+    GeminiRESTBackend.name: GeminiRESTBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def register_backend(name: str, backend_class) -> None:
+    """Make a custom LLMBackend subclass selectable via LLM_BACKEND=name."""
+    BACKENDS[name] = backend_class
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(model_name: str, name: str = None, api_key: str = None) -> LLMBackend:
+    """
+    Return the process-wide backend instance for a model (and API key).
+
+    Args:
+        model_name: Model to generate with
+        name: Backend name (defaults to LLM_BACKEND, else "gemini")
+        api_key: Key to call with (defaults to GOOGLE_API_KEY)
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = name or os.getenv("LLM_BACKEND", GeminiBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    key = (name, model_name, api_key)
+    if key not in _backends:
+        with _backends_lock:
+            if key not in _backends:
+                _backends[key] = BACKENDS[name](model_name, api_key=api_key) if api_key else BACKENDS[name](model_name)
+    return _backends[key]
@@ -0,0 +1,146 @@
+"""
+Incremental parsing of a summary JSON object while it is still being streamed.
+
+Only fields whose string values are complete are reported, so the UI never
+shows half a sentence. Final validation still happens in parse_json_response
+once the full response has arrived.
+"""
+from json.decoder import scanstring
+
+
+class _Incomplete(Exception):
+    """Raised when the buffer ends before the current value is finished, or the value is malformed."""
+
+
+def _skip_ws(text: str, i: int) -> int:
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return i
+
+
+def _string(text: str, i: int):
+    # scanstring expects the index just past the opening quote
+    try:
+        return scanstring(text, i + 1)
+    except ValueError:
+        raise _Incomplete()
+
+
+def _skip_value(text: str, i: int) -> int:
+    """Skip over a non-string scalar or nested container without interpreting it."""
+    depth = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '"':
+            _, i = _string(text, i)
+            continue
+        if ch in "[{":
+            depth += 1
+        elif ch in "]}":
+            if depth == 0:
+                return i
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        elif ch == "," and depth == 0:
+            return i
+        i += 1
+    raise _Incomplete()
+
+
+def _parse_array(text: str, i: int, out: list) -> int:
+    # `out` receives each completed string element as soon as it is closed
+    i = _skip_ws(text, i + 1)
+    while True:
+        if i >= len(text):
+            raise _Incomplete()
+        if text[i] == "]":
+            return i + 1
+        start = i
+        if text[i] == '"':
+            value, i = _string(text, i)
+            out.append(value)
+        else:
+            i = _skip_value(text, i)
+        if i == start:
+            # A closer that does not match (`["a" }`): nothing after it can be read
+            raise _Incomplete()
+        i = _skip_ws(text, i)
+        if i < len(text) and text[i] == ",":
+            i = _skip_ws(text, i + 1)
+
+
+def parse_partial_summary(text: str) -> dict:
+    """
+    Extract every completed field from a possibly truncated JSON object.
+
+    Tolerates a leading ```json fence or preamble text before the opening brace.
+
+    Args:
+        text: Response text received so far
+
+    Returns:
+        dict: Completed top-level string fields and completed list entries
+    """
+    result = {}
+    start = text.find("{")
+    if start < 0:
+        return result
+    i = _skip_ws(text, start + 1)
+    try:
+        while i < len(text) and text[i] != "}":
+            if text[i] != '"':
+                break
+            key, i = _string(text, i)
+            i = _skip_ws(text, i)
+            if i >= len(text) or text[i] != ":":
+                break
+            i = _skip_ws(text, i + 1)
+            if i >= len(text):
+                break
+            start = i
+            if text[i] == '"':
+                value, i = _string(text, i)
+                result[key] = value
+            elif text[i] == "[":
+                # A repeated key replaces the earlier value, as in json.loads
+                items = result[key] = []
+                i = _parse_array(text, i, items)
+            else:
+                i = _skip_value(text, i)
+            if i == start:
+                break
+            i = _skip_ws(text, i)
+            if i < len(text) and text[i] == ",":
+                i = _skip_ws(text, i + 1)
+    except _Incomplete:
+        pass
+    return result
+
+
+class StreamingSummaryParser:
+    """
+    Accumulates streamed response chunks and reports newly completed fields.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._last = {}
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str):
+        """
+        Add a chunk of response text.
+
+        Returns:
+            dict: The partial summary if a field was completed by this chunk, else None
+        """
+        self._parts.append(chunk)
+        partial = parse_partial_summary(self.text)
+        if partial == self._last:
+            return None
+        self._last = partial
+        return partial
@@ -0,0 +1,1160 @@
+"""
+Streamlit-free summarization pipeline.
+
+Everything needed to turn a YouTube URL into a validated JSON summary lives
+here so it can run from the Streamlit UI, the batch CLI or any other host.
+Progress messages and processing metadata go to a PipelineReporter instead of
+calling Streamlit directly.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv() ##load all the environment variables
+
+from batch_planner import CallStats, candidate_chunk_sizes, choose_plan, planner_settings_from_env
+from checkpoints import CheckpointStore
+from chunk_store import ChunkSummaryStore
+from chunking import chunk_segments, chunk_text, chunk_token_budget
+from caption_cleanup import clean_snippets, cleanup_settings_from_env
+from compact_transcript import CompactTranscript
+from extractive import compress_transcript, compression_settings_from_env
+from json_repair import coerce_summary, loads_lenient
+from lazy_imports import lazy_import, preload
+from llm_backends import LLMError, RateLimitError, get_backend
+from partial_json import StreamingSummaryParser
+from quota_pool import get_quota_pool
+from single_flight import SingleFlight, flight_key
+from summary_cache import SummaryCache
+from summary_library import SummaryLibrary
+from summary_tree import describe_plan, plan_summary_tree, run_summary_tree, tree_settings_from_env
+from tracing import Trace, count_event, export_trace
+from transcript_store import TranscriptStore, get_http_session
+from transcript_stream import StreamedTranscript, streaming_settings_from_env
+from rate_limiter import estimate_tokens, max_concurrent_calls
+
+# Only needed when captions are not in the transcript store; slow to import
+youtube_transcript_api = lazy_import("youtube_transcript_api")
+
+logger = logging.getLogger(__name__)
+
+api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEYS", "").split(",")[0].strip() or None
+
+
+class TranscriptTooLong(Exception):
+    """Raised by summarize_video when the transcript is longer than its max_tokens."""
+    
+    def __init__(self, tokens: int):
+        super().__init__(f"Transcript of ~{tokens:,} tokens is too long to summarize here")
+        self.tokens = tokens
+
+
+class PipelineReporter:
+    """
+    Receives progress messages and processing metadata from the pipeline.
+    
+    The default implementation logs messages and keeps the last metadata and
+    error on the instance. The Streamlit UI and the CLI subclass it. Each
+    reporter carries the Trace that the run's stage spans are recorded on.
+    """
+    
+    def __init__(self):
+        self.metadata = None
+        self.last_error = None
+        self.trace = Trace()
+    
+    def info(self, message: str) -> None:
+        logger.info(message)
+    
+    def warning(self, message: str) -> None:
+        logger.warning(message)
+    
+    def error(self, message: str) -> None:
+        self.last_error = message
+        logger.error(message)
+    
+    def success(self, message: str) -> None:
+        logger.info(message)
+    
+    def record_metadata(self, metadata: dict) -> None:
+        self.metadata = metadata
+    
+    def partial_summary(self, partial: dict) -> None:
+        """Called while a streamed summary arrives, with every field completed so far."""
+
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# Persistent summary cache shared by every session and process using the same CACHE_DIR
+summary_cache = SummaryCache.from_env()
+# Raw caption snippets, reused until TRANSCRIPT_CACHE_TTL_SECONDS expires
+transcript_store = TranscriptStore.from_env()
+## Finished map/reduce calls of unfinished runs, so a retry resumes where it stopped
+checkpoint_store = CheckpointStore.from_env()
+## Chunk and merge summaries by content hash, reused by any video that repeats the input
+chunk_store = ChunkSummaryStore.from_env()
+## Concurrent requests for the same video/prompt/model share one pipeline run;
+## runs and joins are counted in the shared metrics store, so every process sees them
+in_flight = SingleFlight.from_env(on_count=lambda name: count_event(f"single_flight_{name}"))
+## Rolling latency and 429 rate of this process's Gemini calls, for the batch planner
+call_stats = CallStats.from_env()
+## Latest summary of every video, full-text searchable without any API call
+summary_library = SummaryLibrary.from_env()
+
+prompt="""You are YouTube video summarizer. Return a strict JSON object (no markdown, no extra text) with this exact schema:
+{
+  "title": "Brief title of the video content",
+  "overview": "2-3 sentence overview of the video",
+  "key_points": ["point 1", "point 2", "point 3", "..."],
+  "conclusion": "Brief conclusion or takeaway"
+}
+
+Summarize the given transcript within 250 words total. Return ONLY valid JSON, nothing else.
+
+Transcript: """
+
+final_prompt = """You are a YouTube video summarizer. You will be taking multiple batch summaries
+and creating one final, coherent summary of the entire video. Consolidate the key points,
+eliminate redundancy, and maintain a logical flow. 
+
+Return a strict JSON object (no markdown, no extra text) with this exact schema:
+{
+  "title": "Brief title of the entire video",
+  "overview": "2-3 sentence overview of the whole video",
+  "key_points": ["point 1", "point 2", "point 3", "..."],
+  "conclusion": "Brief conclusion or main takeaway"
+}
+
+Keep the summary within 250 words total. Return ONLY valid JSON, nothing else.
+
+Consolidated batch summaries: """
+
+reask_prompt = """The text below was supposed to be a JSON object with this exact schema:
+{"title": string, "overview": string, "key_points": [string, ...], "conclusion": string}
+
+It could not be used: {error}
+Return ONLY the corrected JSON object, keeping its content. No markdown, no extra text.
+
+Text: """
+
+## Response schema for Gemini's structured-output mode (JSON MIME type)
+SUMMARY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "overview": {"type": "STRING"},
+        "key_points": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "conclusion": {"type": "STRING"},
+    },
+    "required": ["title", "overview", "key_points", "conclusion"],
+}
+
+
+def structured_output_enabled() -> bool:
+    """STRUCTURED_OUTPUT=0 turns off the JSON MIME type / response schema request."""
+    return os.getenv("STRUCTURED_OUTPUT", "1") == "1"
+
+
+# Priority list for manually created English transcripts
+MANUAL_LANGUAGE_PRIORITY = ["en-IN", "en-US", "en-GB", "en"]
+# Fallback priority for auto-generated transcripts
+AUTO_LANGUAGE_PRIORITY = ["en", "hi"]
+# Last resort: any track (manual or generated) in one of these languages
+ANY_LANGUAGE_PRIORITY = ["en", "en-IN", "en-US", "en-GB", "hi"]
+
+
+def rank_transcript(language_code: str, is_generated: bool):
+    """
+    Rank a transcript track by the language priority (lower is better).
+    
+    Returns:
+        int: Rank of the track, or None if it should never be used
+    """
+    priority = AUTO_LANGUAGE_PRIORITY if is_generated else MANUAL_LANGUAGE_PRIORITY
+    if language_code in priority:
+        offset = len(MANUAL_LANGUAGE_PRIORITY) if is_generated else 0
+        return offset + priority.index(language_code)
+    if language_code in ANY_LANGUAGE_PRIORITY:
+        base = len(MANUAL_LANGUAGE_PRIORITY) + len(AUTO_LANGUAGE_PRIORITY)
+        return base + 2 * ANY_LANGUAGE_PRIORITY.index(language_code) + int(is_generated)
+    return None
+
+
+def select_best_track(tracks):
+    """
+    Pick the best (language_code, is_generated) key in a single pass.
+    
+    Args:
+        tracks: Iterable of (language_code, is_generated) keys
+    
+    Returns:
+        tuple: Best key, or None if no track matches the language priority
+    """
+    best, best_rank = None, None
+    for key in tracks:
+        rank = rank_transcript(*key)
+        if rank is not None and (best_rank is None or rank < best_rank):
+            best, best_rank = key, rank
+    return best
+
+
+def fetch_best_transcript(video_id: str, trace: Trace = None, refresh: bool = False) -> tuple:
+    """
+    Fetch the best available English transcript for a YouTube video.
+    
+    Priority order for manually created transcripts:
+    1. en-IN (Indian English)
+    2. en-US (American English)
+    3. en-GB (British English)
+    4. en (Generic English)
+    
+    Falls back to auto-generated transcripts:
+    1. en (English)
+    2. hi (Hindi)
+    
+    Fresh tracks are served from the transcript store without contacting YouTube.
+    Otherwise the track list is fetched once over the shared HTTP session and the
+    best track is chosen in one pass over its metadata.
+    
+    Args:
+        video_id: YouTube video id
+        trace: Records transcript.lookup / transcript.list / transcript.fetch spans
+        refresh: Skip the transcript store and fetch the captions again (growing livestreams)
+    
+    Returns:
+        tuple: (list of {"text": str, "start": float, "duration": float} snippets,
+                whether the track is auto-generated)
+    
+    Raises:
+        ValueError: If no transcript is available
+        Exception: For API errors
+    """
+    trace = trace or Trace()
+    if not refresh:
+        with trace.span("transcript.lookup"):
+            # Only the chosen track is parsed
+            cached_key = select_best_track(transcript_store.tracks(video_id))
+            cached = transcript_store.load(video_id, *cached_key) if cached_key is not None else None
+        if cached is not None:
+            return cached, cached_key[1]
+    
+    api = youtube_transcript_api.YouTubeTranscriptApi(http_client=get_http_session())
+    
+    try:
+        with trace.span("transcript.list"):
+            transcripts = api.list(video_id)
+    except Exception as e:
+        raise Exception(f"Failed to list transcripts for video {video_id}: {str(e)}")
+    
+    tracks = {(t.language_code, t.is_generated): t for t in transcripts}
+    best_key = select_best_track(tracks)
+    
+    if best_key is None:
+        # No transcript available - raise with helpful error message
+        raise ValueError(
+            f"No English transcript available for video {video_id}. "
+            "The video either has no captions or only has transcripts in other languages."
+        )
+    
+    with trace.span("transcript.fetch") as span:
+        snippets = tracks[best_key].fetch().to_raw_data()
+        span["output_bytes"] = sum(len(snippet["text"].encode("utf-8")) for snippet in snippets)
+    transcript_store.save(video_id, best_key[0], best_key[1], snippets)
+    return snippets, best_key[1]
+
+
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def extract_video_id(youtube_video_url: str) -> str:
+    """
+    Extract the video id from a YouTube watch URL (bare video ids are accepted as-is).
+    
+    Raises:
+        ValueError: If URL is invalid
+    """
+    if VIDEO_ID_PATTERN.match(youtube_video_url.strip()):
+        return youtube_video_url.strip()
+    try:
+        return youtube_video_url.split("=")[1]
+    except IndexError:
+        raise ValueError("Invalid YouTube URL format. Use: https://www.youtube.com/watch?v=VIDEO_ID")
+
+
+def extract_transcript(youtube_video_url: str, trace: Trace = None, refresh: bool = False) -> CompactTranscript:
+    """
+    Fetch a transcript as a compact, timestamped structure.
+    
+    Args:
+        youtube_video_url: Full YouTube URL or bare video id
+        trace: Records the fetch, transcript.cleanup and transcript.join spans
+        refresh: Fetch the captions again instead of using the transcript store
+    
+    Returns:
+        CompactTranscript: Joined text plus per-snippet offsets and start/duration times
+    
+    Raises:
+        ValueError: If URL is invalid or no transcript available
+        Exception: For API errors
+    """
+    trace = trace or Trace()
+    video_id = extract_video_id(youtube_video_url)
+    snippets, is_generated = fetch_best_transcript(video_id, trace, refresh)
+    settings = cleanup_settings_from_env()
+    if settings.pop("enabled") and is_generated:
+        # Rolling auto-captions and [Music] markers; the store keeps the raw track.
+        # Manually created captions are summarized as written.
+        with trace.span("transcript.cleanup") as span:
+            snippets, stats = clean_snippets(snippets, **settings)
+            span.update(stats)
+    with trace.span("transcript.join") as span:
+        transcript = CompactTranscript.from_snippets(snippets)
+        span["output_bytes"] = transcript.nbytes()
+        span["output_tokens"] = estimate_tokens(transcript.text)
+    return transcript
+
+
+def open_transcript_stream(youtube_video_url: str, trace: Trace = None, min_chars: int = 0) -> StreamedTranscript:
+    """
+    Open a long transcript for bounded-memory summarization.
+    
+    The best track is read back from the transcript store one block at a time
+    on every pass, so neither the snippet list nor the joined text is ever
+    built. A track that is not stored yet is fetched (the caption API returns
+    it whole), saved and released first. One measuring pass runs here.
+    
+    Args:
+        youtube_video_url: Full YouTube URL or bare video id
+        trace: Records the fetch and transcript.scan spans
+        min_chars: Only stream tracks whose stored captions are at least this long
+    
+    Returns:
+        StreamedTranscript: Measured transcript, or None if the track is shorter than min_chars
+    
+    Raises:
+        ValueError: If URL is invalid or no transcript available
+        Exception: For API errors
+    """
+    trace = trace or Trace()
+    video_id = extract_video_id(youtube_video_url)
+    with trace.span("transcript.lookup"):
+        tracks = transcript_store.tracks(video_id)
+        key = select_best_track(tracks)
+    if key is None:
+        fetch_best_transcript(video_id, trace, refresh=True)
+        tracks = transcript_store.tracks(video_id)
+        key = select_best_track(tracks)
+        if key is None:
+            return None
+    if tracks[key]["chars"] < min_chars:
+        return None
+    
+    settings = cleanup_settings_from_env()
+    fetched_at = tracks[key]["fetched_at"]
+    transcript = StreamedTranscript(
+        lambda: transcript_store.iter_snippets(video_id, *key, fetched_at=fetched_at),
+        # key[1]: only auto-generated tracks have rolling captions to clean
+        cleanup=settings if settings.pop("enabled") and key[1] else None,
+    )
+    with trace.span("transcript.scan", input_chars=tracks[key]["chars"]) as span:
+        transcript.measure()
+        span.update(output_bytes=transcript.nbytes, output_tokens=transcript.tokens, snippets=transcript.snippets)
+    return transcript
+
+
+## getting the transcript data from yt videos
+def extract_transcript_details(youtube_video_url: str) -> str:
+    """
+    Extract and concatenate transcript from a YouTube URL.
+    
+    Args:
+        youtube_video_url: Full YouTube URL (https://www.youtube.com/watch?v=VIDEO_ID)
+    
+    Returns:
+        str: Concatenated transcript text
+    
+    Raises:
+        ValueError: If URL is invalid or no transcript available
+        Exception: For API errors
+    """
+    return extract_transcript(youtube_video_url).text
+    
+## JSON parsing and validation helpers
+def parse_json_response(response_text: str, repair: bool = True) -> dict:
+    """
+    Parse and validate JSON response from Gemini.
+    
+    When strict parsing fails and repair is True, the response is repaired
+    locally (surrounding prose, trailing commas, raw newlines, Python literals,
+    truncation) and key_points are coerced to a list of strings.
+    
+    Schema:
+    {
+      "title": string,
+      "overview": string,
+      "key_points": [string],
+      "conclusion": string
+    }
+    
+    Args:
+        response_text: Raw response from Gemini
+        repair: Try local repair when the response is not valid as-is
+    
+    Returns:
+        dict: Validated JSON with required fields
+    
+    Raises:
+        ValueError: If JSON is invalid or missing required fields
+    """
+    required_fields = ["title", "overview", "key_points", "conclusion"]
+    
+    try:
+        # Parse JSON (handle potential markdown code blocks)
+        text = response_text.strip()
+        if text.startswith("```json"):
+            text = text[7:]
+        if text.startswith("```"):
+            text = text[3:]
+        if text.endswith("```"):
+            text = text[:-3]
+        text = text.strip()
+        
+        json_data = json.loads(text)
+    except json.JSONDecodeError as e:
+        if not repair:
+            raise ValueError(f"Invalid JSON response from Gemini: {str(e)}\n\nRaw response:\n{response_text[:200]}")
+        try:
+            json_data = loads_lenient(response_text)
+        except ValueError:
+            raise ValueError(f"Invalid JSON response from Gemini: {str(e)}\n\nRaw response:\n{response_text[:200]}")
+    
+    if not isinstance(json_data, dict):
+        raise ValueError("Response is not a JSON object")
+    if repair:
+        json_data = coerce_summary(json_data)
+    
+    # Validate required fields
+    missing_fields = [field for field in required_fields if field not in json_data]
+    if missing_fields:
+        raise ValueError(f"Missing required JSON fields: {', '.join(missing_fields)}")
+    
+    # Validate key_points is a list of strings
+    key_points = json_data.get("key_points")
+    if not isinstance(key_points, list) or not all(isinstance(point, str) for point in key_points):
+        raise ValueError("'key_points' must be a list of strings")
+    
+    return json_data
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as H:MM:SS or M:SS."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def format_json_summary(json_data: dict, video_id: str = None) -> str:
+    """
+    Convert structured JSON summary to readable text format.
+    Maintains backward compatibility with text-based display.
+    
+    Args:
+        json_data: Validated JSON summary dictionary
+        video_id: If given, key points with a timestamp link to that moment (&t=)
+    
+    Returns:
+        str: Formatted readable summary
+    """
+    output = []
+    
+    # Title
+    if json_data.get("title"):
+        output.append(f"**{json_data['title']}**\n")
+    
+    # Overview
+    if json_data.get("overview"):
+        output.append(f"{json_data['overview']}\n")
+    
+    # Key Points
+    if json_data.get("key_points") and isinstance(json_data["key_points"], list):
+        output.append("**Key Points:**")
+        timestamps = json_data.get("key_point_timestamps") or []
+        for i, point in enumerate(json_data["key_points"]):
+            seconds = timestamps[i] if i < len(timestamps) else None
+            if video_id and seconds is not None:
+                link = f"https://www.youtube.com/watch?v={video_id}&t={int(seconds)}s"
+                output.append(f"• {point} ([{format_timestamp(seconds)}]({link}))")
+            else:
+                output.append(f"• {point}")
+        output.append("")
+    
+    # Conclusion
+    if json_data.get("conclusion"):
+        output.append(f"**Conclusion:**\n{json_data['conclusion']}")
+    
+    return "\n".join(output)
+    
+## getting the summary based on Prompt from Google Gemini Pro
+def generate_gemini_content(transcript_text,prompt,reporter=None,stream=False,response_schema=None,role="final"):
+    """
+    Call the configured LLM backend (Gemini by default) with rate limiting and retries.
+    
+    Each attempt is routed through the quota pool: "batch" calls may use any
+    key and prefer cheaper models, "final" calls use the best model. After a
+    429 the key/model cools down and the retry goes to another one with
+    headroom, so spare keys absorb the limit instead of a fixed sleep.
+    
+    Errors are returned as text (and then fail JSON validation) rather than raised,
+    so one failed call is reported like any other unusable response.
+    
+    With stream=True the response is read incrementally and every newly completed
+    summary field is passed to reporter.partial_summary as it arrives. The full
+    response text is returned either way. With response_schema, backends that
+    support it are asked for JSON matching the schema (structured output).
+    
+    Every attempt is recorded as a gemini.attempt span (with the model and pool
+    endpoint used), the wait for quota as limiter.wait, and the wait before a
+    retry (backoff after a 429) as gemini.backoff.
+    """
+    pool = get_quota_pool(MODEL_NAME)
+    if get_backend(MODEL_NAME).requires_api_key and not pool.has_api_keys:
+        return "Missing `GOOGLE_API_KEY`: cannot call Gemini API. Add your key to `.env` or set the environment variable and restart."
+
+    # One retry per extra key/model: a 429 on one endpoint is retried on another
+    max_retries = 2 + len(pool.candidates(role))
+    trace = reporter.trace if reporter else Trace()
+    prompt_text = prompt + transcript_text
+    input_tokens = estimate_tokens(prompt_text)
+    input_bytes = len(prompt_text.encode("utf-8"))
+    
+    for attempt in range(max_retries):
+        try:
+            # Wait for request/token budget before sending, instead of discovering the limit via 429
+            # After a 429 the wait includes the backoff penalty: keep it visible as its own stage
+            with trace.span("gemini.backoff" if attempt else "limiter.wait", attempt=attempt + 1):
+                endpoint = pool.acquire(input_tokens, role)
+            backend = get_backend(endpoint.model_name, api_key=endpoint.api_key)
+            with trace.span("gemini.attempt", attempt=attempt + 1, stream=stream, role=role,
+                            model=endpoint.model_name, endpoint=endpoint.label,
+                            input_tokens=input_tokens, input_bytes=input_bytes) as span:
+                started = time.monotonic()
+                if stream:
+                    parser = StreamingSummaryParser()
+                    
+                    def on_chunk(text):
+                        partial = parser.feed(text)
+                        if partial and reporter:
+                            reporter.partial_summary(partial)
+                    
+                    response_text = backend.generate(prompt_text, stream=True, on_chunk=on_chunk,
+                                                     response_schema=response_schema)
+                else:
+                    response_text = backend.generate(prompt_text, response_schema=response_schema)
+                call_stats.record(input_tokens, time.monotonic() - started)
+                span["output_tokens"] = estimate_tokens(response_text)
+                span["output_bytes"] = len(response_text.encode("utf-8"))
+            pool.report_success(endpoint)
+            return response_text
+        except RateLimitError as e:
+            error_msg = str(e)
+            call_stats.record_rate_limited()
+            # Server-side limit is tighter than configured: hold back every caller of this key/model
+            cooldown = pool.report_rate_limited(endpoint, e.retry_after)
+            if attempt < max_retries - 1:
+                if reporter:
+                    reporter.warning(f"⏳ Rate limit hit on {endpoint.label}. Cooling it down for {cooldown:g} seconds "
+                                     f"and retrying on the pool... (Attempt {attempt + 1}/{max_retries})")
+            else:
+                return f"⚠️ Quota exceeded after {max_retries} retries. Free tier limit reached. Please:\n\n1. Wait a minute and try again\n2. Upgrade to a paid Google Cloud plan for higher limits\n3. Use a different API key\n\nError: {error_msg}"
+        except LLMError as e:
+            return f"Error: {str(e)}"
+    
+    return "Unexpected error generating summary."
+
+## Hierarchical summarization with quota-aware batching
+def summaries_to_text(summaries: list) -> str:
+    """
+    Convert summary JSONs back to text for a consolidation (reduce) call.
+    """
+    texts = []
+    for summary in summaries:
+        texts.append(
+            f"Title: {summary.get('title', '')}\nOverview: {summary.get('overview', '')}\n"
+            f"Key Points: {', '.join(str(point) for point in summary.get('key_points', []))}"
+        )
+    return "\n\n".join(texts)
+
+
+def chunk_and_summarize(text, reporter: PipelineReporter = None, stream: bool = False,
+                        resume: bool = True, incremental_key: str = None, reuse: bool = True,
+                        objective: str = None) -> dict:
+    """
+    Hierarchical map-reduce summarization planned against a call/token budget.
+    
+    Strategy:
+    1. Pick the chunk size and fan-in that best serve the objective (fewest calls,
+       least wall time or fewest tokens) within the model's context, then split
+       the transcript into token-budgeted chunks of that size
+    2. Plan a reduce tree (configurable fan-in and depth) and check it against
+       MAX_API_CALLS / MAX_TOKENS_PER_RUN before making any call
+    3. Report the plan: calls, estimated tokens, estimated time
+    4. Map: summarize every chunk, in parallel
+    5. Reduce: merge groups of summaries level by level, in parallel, until one remains
+    
+    Every finished call is checkpointed under a run id (transcript, chunking
+    parameters, prompts, model), so a run that fails part-way can be retried
+    without paying again for the calls that already succeeded.
+    
+    With incremental_key (a video id) the run id stays the same while the
+    transcript grows and results are kept after success: chunking is
+    prefix-stable, so a refresh reuses every unchanged chunk summary and reduce
+    group and only pays for the new tail and the reduce nodes above it.
+    
+    With reuse, chunks that are identical or near-identical to a chunk of any
+    earlier video, and reduce groups with exactly the same inputs, take their
+    summary from the shared chunk store instead of calling Gemini.
+    
+    A StreamedTranscript is never held in full: a layout pass sizes the chunks
+    for the budget check, then chunk texts are cut again one at a time and
+    handed to the map calls as workers free up, so memory is bounded by the
+    chunks in flight rather than by the length of the video.
+    
+    Reports progress and processing metadata to the reporter for display.
+    
+    Args:
+        text: Full transcript text, or a CompactTranscript (or StreamedTranscript) to
+            chunk on caption boundaries and record each chunk's time span
+        reporter: Receives progress messages and metadata (defaults to logging)
+        stream: Stream the final (user-visible) call and report partial summaries
+        resume: Reuse checkpointed calls from an earlier attempt of the same run
+        incremental_key: Video id for an incremental refresh of a growing transcript
+        reuse: Look up and store chunk and merge summaries in the shared chunk store
+        objective: "calls", "time" or "tokens" (defaults to PLAN_OBJECTIVE)
+    
+    Returns:
+        dict: Final JSON summary or None if error
+    """
+    reporter = reporter or PipelineReporter()
+    trace = reporter.trace
+    start_time = time.time()
+    settings = tree_settings_from_env()
+    
+    # Step 1: Choose the chunk size for the objective, then split preferring sentence boundaries
+    max_chunk_tokens = chunk_token_budget(MODEL_NAME, prompt)
+    streamed = isinstance(text, StreamedTranscript)
+    if streamed:
+        # Measured when it was opened; the text itself is never built
+        full_text, total_tokens, text_digest = None, text.tokens, text.digest
+    else:
+        full_text = text.text if isinstance(text, CompactTranscript) else text
+        total_tokens, text_digest = estimate_tokens(full_text), None
+    planner = planner_settings_from_env()
+    objective = objective or planner["objective"]
+    call_seconds = call_stats.call_seconds_fn()
+    latency_model = call_stats.snapshot()
+    pool = get_quota_pool(MODEL_NAME)
+    if incremental_key:
+        # A refresh must chunk exactly like the previous one to reuse its prefix
+        choice = {"objective": objective, "chunk_tokens": max_chunk_tokens, "fan_in": settings["fan_in"],
+                  "candidates": 0}
+    else:
+        with trace.span("plan_batches", objective=objective) as span:
+            choice = choose_plan(
+                total_tokens, max_chunk_tokens, prompt, final_prompt, objective=objective,
+                fan_in=settings["fan_in"], max_depth=settings["max_depth"], call_budget=settings["call_budget"],
+                token_budget=settings["token_budget"], concurrency=max_concurrent_calls(),
+                requests_per_minute=pool.requests_per_minute("batch"),
+                tokens_per_minute=pool.tokens_per_minute("batch"), tokens_available=pool.available_tokens("batch"),
+                call_seconds=call_seconds, min_chunk_tokens=planner["min_chunk_tokens"],
+            )
+            if resume:
+                # A retry keeps the chunk size of the attempt whose calls are checkpointed
+                sizes = candidate_chunk_sizes(total_tokens, max_chunk_tokens,
+                                              min(planner["min_chunk_tokens"], max_chunk_tokens))
+                for size in [choice["chunk_tokens"]] + sizes:
+                    if checkpoint_store.count(CheckpointStore.make_run_id(
+                            full_text, size, settings["fan_in"], prompt + final_prompt, MODEL_NAME,
+                            transcript_digest=text_digest)):
+                        choice = {**choice, "chunk_tokens": size, "resumed": size != choice["chunk_tokens"]}
+                        break
+            span.update(chunk_tokens=choice["chunk_tokens"], fan_in=choice["fan_in"], candidates=choice["candidates"])
+    chunk_tokens = choice["chunk_tokens"]
+    
+    # Chunks already summarized for another video (or repeated within this one)
+    reuse = reuse and chunk_store.enabled
+    shared = {}
+    shared_summaries = {}
+    
+    def share(index, chunk, match):
+        shared[index] = match
+        shared_summaries[CheckpointStore.node_key("map", chunk)] = match["summary"]
+    
+    def lookup_chunk(index, chunk):
+        match = chunk_store.lookup_chunks([chunk], prompt, MODEL_NAME).get(0)
+        if match:
+            share(index, chunk, match)
+    
+    if reuse:
+        chunk_store.evict()
+    with trace.span("chunk", streamed=streamed) as span:
+        if streamed:
+            # Sizes and time spans only (each chunk is looked up in the chunk store while
+            # its text is at hand); the texts are cut again, one at a time, for the map calls
+            chunk_sizes, chunk_time_spans = text.layout(chunk_tokens, lookup_chunk if reuse else None)
+            chunks = (chunk.text for chunk in text.chunks(chunk_tokens))
+            text_chars = text.chars
+            span["input_bytes"] = text.nbytes
+            span["output_tokens"] = sum(chunk_sizes)
+        else:
+            if isinstance(text, CompactTranscript):
+                chunk_list = chunk_segments(text.segments(), chunk_tokens)
+                text = text.text
+            else:
+                chunk_list = chunk_text(text, chunk_tokens)
+            text_chars = len(text)
+            span["input_bytes"] = len(text.encode("utf-8"))
+            span["output_tokens"] = sum(chunk.tokens for chunk in chunk_list)
+            chunks = [chunk.text for chunk in chunk_list]
+            chunk_time_spans = [[chunk.start, chunk.end] for chunk in chunk_list]
+            chunk_sizes = [chunk.tokens for chunk in chunk_list]
+            del chunk_list
+    num_chunks = len(chunk_sizes)
+    
+    checkpoint_store.purge_expired()
+    reused_chunks = 0
+    incremental_info = None
+    if incremental_key:
+        run_id = CheckpointStore.make_incremental_run_id(incremental_key, chunk_tokens, prompt + final_prompt,
+                                                         MODEL_NAME)
+        resume = True
+        # Leading chunks already summarized by an earlier refresh
+        map_keys = [CheckpointStore.node_key("map", chunk) for chunk in chunks]
+        available = checkpoint_store.existing(run_id, map_keys)
+        reused_chunks = next((i for i, key in enumerate(map_keys) if key not in available), len(map_keys))
+        state = checkpoint_store.get_state(run_id)
+        incremental_info = {
+            "previous_chars": state["transcript_chars"] if state else 0,
+            "appended": bool(state) and CheckpointStore.is_extension(state, text),
+            "reused_chunks": reused_chunks,
+            "new_chunks": len(chunks) - reused_chunks,
+        }
+        if state:
+            change = "grew" if incremental_info["appended"] else "changed"
+            reporter.info(
+                f"📈 Transcript {change} from {state['transcript_chars']:,} to {len(text):,} chars since the last "
+                f"refresh — {reused_chunks} of {len(chunks)} chunks are already summarized"
+            )
+    else:
+        run_id = CheckpointStore.make_run_id(full_text, chunk_tokens, settings["fan_in"], prompt + final_prompt,
+                                             MODEL_NAME, transcript_digest=text_digest)
+    
+    reuse_info = None
+    if reuse:
+        with trace.span("chunk_reuse", chunks=num_chunks - reused_chunks) as span:
+            if not streamed:
+                # Streamed chunks were looked up one by one during the layout pass
+                matches = chunk_store.lookup_chunks(chunks[reused_chunks:], prompt, MODEL_NAME)
+                for index, match in matches.items():
+                    share(reused_chunks + index, chunks[reused_chunks + index], match)
+            exact = sum(1 for match in shared.values() if match["similarity"] == 1.0)
+            span.update({"exact": exact, "near_duplicate": len(shared) - exact})
+        reuse_info = {"exact": exact, "near_duplicate": len(shared) - exact, "reduce": 0,
+                      "min_similarity": min((match["similarity"] for match in shared.values()), default=None)}
+        if shared:
+            reporter.info(
+                f"🧩 {len(shared)} of {num_chunks} chunks were already summarized for other videos "
+                f"({exact} identical, {len(shared) - exact} near-duplicates) — skipping those calls"
+            )
+    
+    # Step 2-3: Plan the whole tree up front and refuse plans over budget
+    plan = plan_summary_tree(
+        chunk_sizes,
+        prompt,
+        final_prompt,
+        fan_in=choice["fan_in"],
+        max_depth=settings["max_depth"],
+        call_budget=settings["call_budget"],
+        token_budget=settings["token_budget"],
+        concurrency=max_concurrent_calls(),
+        requests_per_minute=pool.requests_per_minute("batch"),
+        tokens_per_minute=pool.tokens_per_minute("batch"),
+        tokens_available=pool.available_tokens("batch"),
+        reused_chunks=reused_chunks,
+        shared_chunks=shared,
+        call_seconds=call_seconds,
+    )
+    if not plan["within_budget"]:
+        reporter.error(
+            f"⚠️ Quota Alert: This transcript ({text_chars:,} chars) {plan['reason']}. "
+            "Raise MAX_API_CALLS / MAX_TOKENS_PER_RUN or SUMMARY_TREE_FAN_IN to summarize it."
+        )
+        return None
+    reporter.info(f"🗺️ {describe_plan(plan)} — chunks of up to {chunk_tokens:,} tokens, optimized for {objective}")
+    
+    if resume and not incremental_key:
+        saved_calls = checkpoint_store.count(run_id)
+        if saved_calls:
+            reporter.info(f"♻️ Resuming an earlier attempt — up to {saved_calls} finished calls will be reused")
+    
+    calls_made = [0]
+    calls_reused = [0]
+    calls_shared = [0]
+    calls_lock = threading.Lock()
+    used_nodes = set()
+    
+    def checkpointed(kind, content, call_prompt, call):
+        node_key = CheckpointStore.node_key(kind, content)
+        with calls_lock:
+            used_nodes.add(node_key)
+        if resume:
+            saved = checkpoint_store.get(run_id, node_key)
+            if saved is not None:
+                with calls_lock:
+                    calls_reused[0] += 1
+                return saved
+        summary = None
+        if reuse:
+            summary = shared_summaries.get(node_key) if kind == "map" else \
+                chunk_store.get(kind, content, call_prompt, MODEL_NAME)
+        if summary is not None:
+            with calls_lock:
+                calls_shared[0] += 1
+                if kind == "reduce":
+                    reuse_info["reduce"] += 1
+        else:
+            summary = call()
+            if reuse:
+                chunk_store.put(kind, content, call_prompt, MODEL_NAME, summary)
+        checkpoint_store.put(run_id, node_key, summary)
+        return summary
+    
+    json_repairs = [0]
+    reasks = [0]
+    schema = SUMMARY_SCHEMA if structured_output_enabled() else None
+    
+    def call_gemini(content, call_prompt, is_root):
+        with calls_lock:
+            calls_made[0] += 1
+        response = generate_gemini_content(content, call_prompt, reporter, stream=stream and is_root,
+                                           response_schema=schema, role="final" if is_root else "batch")
+        with trace.span("parse", input_bytes=len(response.encode("utf-8"))) as span:
+            try:
+                return parse_json_response(response, repair=False)
+            except ValueError as e:
+                parse_error = e
+            try:
+                summary = parse_json_response(response)
+            except ValueError:
+                summary = None
+            span["repaired"] = summary is not None
+        if summary is not None:
+            with calls_lock:
+                json_repairs[0] += 1
+            return summary
+        # Error messages (quota, missing key) contain no JSON; re-asking would not help
+        if "{" not in response:
+            raise parse_error
+        
+        # One targeted re-ask: send back only the unusable response, not the transcript
+        with calls_lock:
+            calls_made[0] += 1
+            reasks[0] += 1
+        reason = str(parse_error).splitlines()[0]
+        reporter.warning(f"🔁 Asking Gemini to correct an unparsable response ({reason})")
+        fixed = generate_gemini_content(response, reask_prompt.replace("{error}", reason), reporter,
+                                        response_schema=schema, role="final" if is_root else "batch")
+        with trace.span("parse", input_bytes=len(fixed.encode("utf-8")), reask=True):
+            try:
+                return parse_json_response(fixed)
+            except ValueError:
+                raise parse_error
+    
+    def map_fn(chunk, is_root):
+        def call():
+            with trace.span("map", input_tokens=estimate_tokens(chunk)):
+                return call_gemini(chunk, prompt, is_root)
+        
+        try:
+            return checkpointed("map", chunk, prompt, call)
+        except ValueError as e:
+            raise ValueError(f"Failed to parse chunk summary: {str(e)}")
+    
+    def reduce_fn(summaries, is_root):
+        if is_root:
+            reporter.info(f"🔄 Generating final consolidated summary — API call {plan['total_calls']}/{plan['total_calls']}")
+        content = summaries_to_text(summaries)
+        
+        def call():
+            with trace.span("reduce", input_tokens=estimate_tokens(content), fan_in=len(summaries)):
+                return call_gemini(content, final_prompt, is_root)
+        
+        try:
+            return checkpointed("reduce", content, final_prompt, call)
+        except ValueError as e:
+            raise ValueError(f"Failed to parse {'final' if is_root else 'intermediate'} summary: {str(e)}")
+    
+    def on_progress(level, done, total):
+        if level["kind"] == "map":
+            reporter.info(f"📝 Chunk {done}/{total} summarized — {level['concurrency']} API calls in flight")
+        elif done < total or total > 1:
+            reporter.info(f"🔄 Reduce level {level['level']}: {done}/{total} merged")
+    
+    # Step 4-5: Map, then reduce level by level
+    try:
+        final_json = run_summary_tree(chunks, plan, map_fn, reduce_fn, on_progress)
+    except ValueError as e:
+        saved_calls = checkpoint_store.count(run_id)
+        reporter.error(f"{str(e)} ({saved_calls} finished calls are saved; retrying resumes from there)")
+        return None
+    if incremental_key:
+        # Keep this tree for the next refresh; drop nodes the grown transcript replaced
+        checkpoint_store.retain(run_id, used_nodes)
+        checkpoint_store.put_state(run_id, text, len(chunks))
+    else:
+        # The finished summary is cached by the caller; intermediate results are no longer needed
+        checkpoint_store.discard(run_id)
+    
+    elapsed = time.time() - start_time
+    reused_note = f", reused {calls_reused[0]} from an earlier attempt" if calls_reused[0] else ""
+    if calls_shared[0]:
+        reused_note += f", reused {calls_shared[0]} from other videos"
+    reporter.success(f"✅ Summary complete! Used {calls_made[0]}/{settings['call_budget']} API calls{reused_note}.")
+    stages = trace.summary()
+    models_used = {}
+    tokens_sent = 0
+    for span in trace.snapshot("gemini.attempt"):
+        if "error" not in span:
+            model = span["attributes"]["model"]
+            models_used[model] = models_used.get(model, 0) + 1
+            tokens_sent += span["attributes"]["input_tokens"]
+    
+    # Store metadata for UI display
+    reporter.record_metadata({
+        "transcript_chars": text_chars,
+        "num_chunks": num_chunks,
+        "chunk_token_budget": chunk_tokens,
+        "chunk_time_spans": chunk_time_spans,
+        "num_batches": num_chunks,
+        "streamed": streamed,
+        "tree_depth": plan["depth"],
+        "tree_fan_in": plan["fan_in"],
+        "summary_plan": plan,
+        # The plan's prediction next to what the run actually cost
+        "batch_plan": {
+            "objective": objective,
+            "chunk_tokens": chunk_tokens,
+            "max_chunk_tokens": max_chunk_tokens,
+            "fan_in": plan["fan_in"],
+            "candidates": choice["candidates"],
+            "resumed": choice.get("resumed", False),
+            "predicted": {"calls": plan["total_calls"], "tokens": plan["estimated_tokens"],
+                          "seconds": plan["estimated_seconds"]},
+            "actual": {"calls": calls_made[0], "tokens": tokens_sent, "seconds": round(elapsed, 2)},
+            "latency_model": latency_model,
+        },
+        "api_calls_used": calls_made[0],
+        "api_calls_max": settings["call_budget"],
+        "api_attempts": stages.get("gemini.attempt", {}).get("count", 0),
+        "checkpoint_calls_reused": calls_reused[0],
+        "chunk_reuse": {**reuse_info, "calls_saved": calls_shared[0]} if reuse_info else None,
+        "json_repairs": json_repairs[0],
+        "reasks": reasks[0],
+        "run_id": run_id,
+        "incremental": incremental_info,
+        "retry_wait_seconds": stages.get("gemini.backoff", {}).get("total_seconds", 0.0),
+        "models_used": models_used,
+        "quota_pool": get_quota_pool(MODEL_NAME).stats(),
+        "elapsed_seconds": round(elapsed, 2),
+        "trace_id": trace.trace_id,
+        "stages": stages,
+    })
+    
+    return final_json
+
+
+def _summarize_video(youtube_video_url: str, video_id: str, reporter: PipelineReporter, use_cache: bool,
+                     stream: bool, incremental: bool, objective: str = None, max_tokens: int = 0):
+    # Very long transcripts are streamed from the transcript store instead of being
+    # loaded. Incremental runs and extractive compression need the whole text.
+    compression = None
+    settings = compression_settings_from_env()
+    compress = bool(settings["ratio"] or settings["token_budget"]) and not incremental
+    streaming = streaming_settings_from_env()
+    transcript = None
+    if streaming["enabled"] and not incremental and not compress:
+        transcript = open_transcript_stream(youtube_video_url, reporter.trace, streaming["min_chars"])
+    streamed = transcript is not None
+    if streamed:
+        if not transcript.chars:
+            return None
+        cleanup = transcript.cleanup_stats
+    else:
+        transcript = extract_transcript(youtube_video_url, reporter.trace, refresh=incremental)
+        if not transcript.text:
+            return None
+        cleanup = reporter.trace.last_attributes("transcript.cleanup")
+    if max_tokens:
+        # Checked on the transcript this run loaded, so callers need not fetch it first
+        tokens = transcript.tokens if streamed else estimate_tokens(transcript.text)
+        if tokens > max_tokens:
+            raise TranscriptTooLong(tokens)
+    if cleanup and cleanup["bytes_removed"]:
+        reporter.info(
+            f"🧹 Removed {cleanup['bytes_removed']:,} bytes (~{cleanup['tokens_removed']:,} tokens) of repeated "
+            f"captions and non-speech markers"
+        )
+    if streamed:
+        reporter.info(f"🌊 Streaming a {transcript.chars:,}-char transcript chunk by chunk to bound memory")
+    
+    # Optional local pre-compression. Sentence selection depends on the whole
+    # transcript, so it would defeat the prefix reuse of incremental runs.
+    summarized = transcript
+    if compress:
+        with reporter.trace.span("extractive", input_tokens=estimate_tokens(transcript.text)) as span:
+            summarized, compression = compress_transcript(transcript, **settings)
+            span["output_tokens"] = compression["output_tokens"]
+        if summarized is not transcript:
+            reporter.info(
+                f"✂️ Kept {compression['kept_sentences']:,} of {compression['sentences']:,} sentences locally: "
+                f"{compression['input_tokens']:,} → {compression['output_tokens']:,} tokens"
+            )
+    
+    # The key covers the text actually summarized, so compressed and full runs are cached apart
+    if streamed:
+        # Same digest as the joined text, so streamed and in-memory runs share cache entries
+        cache_key = SummaryCache.make_key(video_id, None, prompt + final_prompt, MODEL_NAME,
+                                          transcript_digest=transcript.digest)
+    else:
+        cache_key = SummaryCache.make_key(video_id, summarized.text, prompt + final_prompt, MODEL_NAME)
+    if use_cache:
+        cached = summary_cache.get(cache_key)
+        if cached:
+            reporter.record_metadata({**cached["metadata"], "cache_hit": True})
+            summary_library.put(video_id, cached["summary"], MODEL_NAME, cached["metadata"])
+            reporter.success("⚡ Loaded summary from cache — no API calls used.")
+            return cached["summary"]
+    
+    summary_result = chunk_and_summarize(summarized, reporter, stream=stream, resume=use_cache,
+                                         incremental_key=video_id if incremental else None, reuse=use_cache,
+                                         objective=objective)
+    if summary_result:
+        # Place each key point on the timeline locally - no second fetch or API call
+        summary_result["key_point_timestamps"] = transcript.locate(summary_result["key_points"])
+    if summary_result and reporter.metadata:
+        metadata = {**reporter.metadata, "caption_cleanup": cleanup, "extractive": compression}
+        if use_cache:
+            summary_cache.put(cache_key, video_id, MODEL_NAME, summary_result, metadata)
+        summary_library.put(video_id, summary_result, MODEL_NAME, metadata)
+        reporter.record_metadata({**metadata, "cache_hit": False})
+    return summary_result
+
+
+def summarize_video(youtube_video_url: str, reporter: PipelineReporter = None, use_cache: bool = True,
+                    stream: bool = False, incremental: bool = False, objective: str = None, max_tokens: int = 0):
+    """
+    Full pipeline for one video: transcript, summary cache lookup, summarization.
+    
+    Identical requests already in flight in this process (or, with
+    SINGLE_FLIGHT_CROSS_PROCESS=1, in another process) are joined instead of
+    started again.
+    
+    Args:
+        youtube_video_url: YouTube URL or bare video id
+        reporter: Receives progress messages and metadata (defaults to logging)
+        use_cache: Serve and store results in the summary cache
+        stream: Report partial summaries while the final call is streamed
+        incremental: Re-fetch the captions and summarize only what was added since
+            the last incremental run (livestreams and growing transcripts)
+        objective: What the batch planner minimizes: "calls", "time" or "tokens"
+            (defaults to PLAN_OBJECTIVE)
+        max_tokens: Refuse transcripts longer than this many tokens (0 = no limit)
+    
+    Returns:
+        dict: Final JSON summary or None if summarization failed
+    
+    Raises:
+        ValueError: If URL is invalid or no transcript available
+        TranscriptTooLong: If the transcript is longer than max_tokens
+        Exception: For transcript API errors
+    """
+    reporter = reporter or PipelineReporter()
+    video_id = extract_video_id(youtube_video_url)
+    key = flight_key(video_id, prompt + final_prompt, MODEL_NAME)
+    if not use_cache:
+        key += "-nocache"
+    if incremental:
+        key += "-incremental"
+    if max_tokens:
+        # Callers without a limit must not be handed this run's TranscriptTooLong
+        key += f"-max{max_tokens}"
+    
+    def run():
+        try:
+            summary = _summarize_video(youtube_video_url, video_id, reporter, use_cache, stream, incremental,
+                                       objective, max_tokens)
+        finally:
+            export_trace(reporter.trace)
+        return summary, reporter.metadata, reporter.last_error
+    
+    (summary_result, metadata, error), shared = in_flight.do(key, run)
+    if shared:
+        # Another session ran the pipeline; surface its outcome here
+        if metadata:
+            reporter.record_metadata({**metadata, "coalesced": True})
+        if summary_result:
+            reporter.success("🔗 Joined a summary of this video that was already in progress.")
+        elif error:
+            reporter.error(error)
+    return summary_result
+
+
+def warm_up(connect: bool = False) -> dict:
+    """
+    Pay the one-off start-up costs of a process before its first request does.
+    
+    Imports the lazily loaded modules (transcript API, NumPy), builds the LLM
+    backend - SDK, client and model - of every quota pool endpoint, and with
+    connect also opens the keep-alive HTTPS connection to YouTube.
+    
+    Args:
+        connect: Also make one request to youtube.com to establish the connection
+    
+    Returns:
+        dict: Seconds spent on each step
+    """
+    timings = {}
+    started = time.perf_counter()
+    preload(youtube_transcript_api, lazy_import("numpy"))
+    session = get_http_session()
+    timings["imports"] = round(time.perf_counter() - started, 3)
+    
+    started = time.perf_counter()
+    for endpoint in get_quota_pool(MODEL_NAME).endpoints:
+        get_backend(endpoint.model_name, api_key=endpoint.api_key).warm_up()
+    timings["backends"] = round(time.perf_counter() - started, 3)
+    
+    if connect:
+        started = time.perf_counter()
+        try:
+            session.head("https://www.youtube.com/", timeout=5)
+        except Exception as e:
+            logger.warning("Warm-up connection to YouTube failed: %s", e)
+        timings["connect"] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def warm_up_settings_from_env() -> dict:
+    """
+    WARMUP          - 1 warms up job workers before they take their first job (default 0)
+    WARMUP_CONNECT  - 1 also opens the connection to YouTube during the warm-up (default 0)
+    """
+    return {
+        "enabled": os.getenv("WARMUP", "0") == "1",
+        "connect": os.getenv("WARMUP_CONNECT", "0") == "1",
+    }
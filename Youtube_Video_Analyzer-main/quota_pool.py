@@ -0,0 +1,216 @@
+"""
+Pool of API keys and models with health-aware routing of Gemini calls.
+
+Each (key, model) pair is an endpoint with its own token-bucket limiter -
+Gemini quotas are per key and per model, so every key added to the pool adds
+its full requests/tokens per minute. A call goes to the endpoint with the most
+headroom that can admit it right now:
+
+- "batch" calls (map and intermediate reduce) prefer the cheaper models and
+  spill over to the better ones when those are out of headroom;
+- "final" calls (the user-visible consolidation) only use the best model.
+
+After a 429 the endpoint cools down (6s, doubling per consecutive 429, up to
+COOLDOWN_MAX_SECONDS) and calls are routed elsewhere instead of waiting.
+
+    GOOGLE_API_KEYS=key1,key2,key3
+    GEMINI_MODELS=gemini-2.5-flash,gemini-2.5-flash-lite   # best first
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, TokenBucketLimiter
+
+
+ROLES = ("batch", "final")
+COOLDOWN_BASE_SECONDS = 6.0
+COOLDOWN_MAX_SECONDS = 120.0
+# Longest single sleep while every candidate endpoint is saturated
+MAX_POLL_SECONDS = 1.0
+USAGE_WINDOW_SECONDS = 60.0
+
+
+class Endpoint:
+    """
+    One API key + model with its limiter, cooldown and rolling usage.
+
+    Args:
+        label: Name shown in stats and logs (never the key itself)
+        api_key: Key used for this endpoint's calls (None for backends without keys)
+        model_name: Gemini model
+        rank: Position in GEMINI_MODELS (0 = best)
+        requests_per_minute / tokens_per_minute: Quota of this key for this model
+    """
+
+    def __init__(self, label: str, api_key: str, model_name: str, rank: int,
+                 requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE):
+        self.label = label
+        self.api_key = api_key
+        self.model_name = model_name
+        self.rank = rank
+        self.limiter = TokenBucketLimiter(requests_per_minute, tokens_per_minute)
+        self.consecutive_rate_limits = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self._usage = deque()
+        self._lock = threading.Lock()
+
+    def record_call(self, tokens: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.calls += 1
+            self._usage.append((now, tokens))
+            while self._usage and self._usage[0][0] < now - USAGE_WINDOW_SECONDS:
+                self._usage.popleft()
+
+    def usage(self) -> tuple:
+        """(requests, tokens) sent in the last minute."""
+        now = time.monotonic()
+        with self._lock:
+            while self._usage and self._usage[0][0] < now - USAGE_WINDOW_SECONDS:
+                self._usage.popleft()
+            return len(self._usage), sum(tokens for _, tokens in self._usage)
+
+
+class QuotaPool:
+    """
+    Routes calls across endpoints. Safe to share between threads.
+
+    Args:
+        endpoints: Endpoints in the pool; models ranked by Endpoint.rank
+    """
+
+    def __init__(self, endpoints: list):
+        if not endpoints:
+            raise ValueError("A quota pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.best_rank = min(endpoint.rank for endpoint in endpoints)
+
+    @classmethod
+    def from_env(cls, default_model: str) -> "QuotaPool":
+        """
+        GOOGLE_API_KEYS  - comma-separated keys (default: GOOGLE_API_KEY alone)
+        GEMINI_MODELS    - comma-separated models, best first (default: default_model)
+        GEMINI_RPM / GEMINI_TPM - quota of each key for each model
+        """
+        keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",") if k.strip()]
+        if not keys:
+            keys = [os.getenv("GOOGLE_API_KEY")]
+        models = [m.strip() for m in os.getenv("GEMINI_MODELS", "").split(",") if m.strip()] or [default_model]
+        rpm = float(os.getenv("GEMINI_RPM", DEFAULT_REQUESTS_PER_MINUTE))
+        tpm = float(os.getenv("GEMINI_TPM", DEFAULT_TOKENS_PER_MINUTE))
+        return cls([
+            Endpoint(f"key{i + 1}/{model}", key, model, rank, rpm, tpm)
+            for rank, model in enumerate(models)
+            for i, key in enumerate(keys)
+        ])
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    @property
+    def has_api_keys(self) -> bool:
+        return any(endpoint.api_key for endpoint in self.endpoints)
+
+    @property
+    def models(self) -> list:
+        return sorted({e.model_name for e in self.endpoints}, key=lambda m: self._rank_of(m))
+
+    def _rank_of(self, model_name: str) -> int:
+        return min(e.rank for e in self.endpoints if e.model_name == model_name)
+
+    def candidates(self, role: str = "batch") -> list:
+        """
+        Endpoints a call of this role may use, most preferred first.
+
+        Raises:
+            ValueError: If role is not one of ROLES
+        """
+        if role not in ROLES:
+            raise ValueError(f"role must be one of {', '.join(ROLES)}")
+        if role == "final":
+            best = [e for e in self.endpoints if e.rank == self.best_rank]
+            return sorted(best, key=lambda e: -e.limiter.headroom())
+        # Cheapest model first; within a model, the key with the most headroom
+        return sorted(self.endpoints, key=lambda e: (-e.rank, -e.limiter.headroom()))
+
+    def requests_per_minute(self, role: str = "batch") -> float:
+        """Combined request quota of the endpoints a role can use (for time estimates)."""
+        return sum(e.limiter.requests_per_minute for e in self.candidates(role))
+
+    def tokens_per_minute(self, role: str = "batch") -> float:
+        """Combined token quota of the endpoints a role can use (for time estimates)."""
+        return sum(e.limiter.tokens_per_minute for e in self.candidates(role))
+
+    def available_tokens(self, role: str = "batch") -> float:
+        """Tokens the endpoints a role can use would admit right now (for time estimates)."""
+        return sum(e.limiter.available_tokens() for e in self.candidates(role))
+
+    def acquire(self, tokens: int, role: str = "batch") -> Endpoint:
+        """
+        Block until some endpoint for the role admits a call of `tokens` input tokens.
+
+        Returns:
+            Endpoint: The endpoint whose quota was taken
+        """
+        while True:
+            shortest = None
+            for endpoint in self.candidates(role):
+                wait = endpoint.limiter.try_acquire(tokens)
+                if not wait:
+                    endpoint.record_call(tokens)
+                    return endpoint
+                shortest = wait if shortest is None else min(shortest, wait)
+            time.sleep(min(shortest, MAX_POLL_SECONDS))
+
+    def report_success(self, endpoint: Endpoint) -> None:
+        endpoint.consecutive_rate_limits = 0
+
+    def report_rate_limited(self, endpoint: Endpoint, retry_after: float = None) -> float:
+        """
+        Put an endpoint into cooldown after a 429.
+
+        Returns:
+            float: Cooldown in seconds
+        """
+        endpoint.rate_limited += 1
+        endpoint.consecutive_rate_limits += 1
+        cooldown = retry_after or min(
+            COOLDOWN_MAX_SECONDS, COOLDOWN_BASE_SECONDS * 2 ** (endpoint.consecutive_rate_limits - 1)
+        )
+        endpoint.limiter.penalize(cooldown)
+        return cooldown
+
+    def stats(self) -> list:
+        """Per-endpoint calls, 429s, cooldown left, headroom and last-minute usage."""
+        rows = []
+        for endpoint in self.endpoints:
+            requests, tokens = endpoint.usage()
+            rows.append({
+                "endpoint": endpoint.label,
+                "model": endpoint.model_name,
+                "calls": endpoint.calls,
+                "rate_limited": endpoint.rate_limited,
+                "cooldown_seconds": round(endpoint.limiter.blocked_for(), 1),
+                "headroom": round(endpoint.limiter.headroom(), 2),
+                "requests_last_minute": requests,
+                "tokens_last_minute": tokens,
+            })
+        return rows
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_quota_pool(default_model: str) -> QuotaPool:
+    """Return the process-wide pool configured from the environment."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = QuotaPool.from_env(default_model)
+    return _pool
@@ -0,0 +1,132 @@
+"""
+Token-bucket rate limiting for Gemini calls.
+
+Every quota pool endpoint (quota_pool) owns one limiter, shared by every thread
+in the process, so concurrent batch calls stay inside the per-minute request and
+token quotas instead of discovering the limit through 429 errors.
+"""
+import os
+import threading
+import time
+
+
+DEFAULT_REQUESTS_PER_MINUTE = 10  # Gemini free tier
+DEFAULT_TOKENS_PER_MINUTE = 250000
+DEFAULT_MAX_CONCURRENT_CALLS = 4
+
+
+# Calibrated characters-per-token ratio for English transcripts; override with
+# CHARS_PER_TOKEN after comparing against model.count_tokens on real captions
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", 4.0))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate for budgeting (len / CHARS_PER_TOKEN, rounded up).
+    """
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+class TokenBucketLimiter:
+    """
+    Dual token bucket limiting both requests/minute and tokens/minute.
+
+    Each bucket refills continuously at capacity/60 per second. `acquire` blocks
+    until both buckets can cover the call.
+    """
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_level = float(requests_per_minute)
+        self._token_level = float(tokens_per_minute)
+        self._blocked_until = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_level = min(
+            self.requests_per_minute, self._request_level + elapsed * self.requests_per_minute / 60.0
+        )
+        self._token_level = min(
+            self.tokens_per_minute, self._token_level + elapsed * self.tokens_per_minute / 60.0
+        )
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Block until one request carrying `tokens` input tokens may be sent.
+
+        Calls larger than the whole token bucket are allowed once the bucket is full.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """
+        Take one request carrying `tokens` input tokens if it may be sent now.
+
+        Returns:
+            float: 0.0 if admitted, else the estimated seconds until it could be (nothing taken)
+        """
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._blocked_until and self._request_level >= 1 and self._token_level >= tokens:
+                self._request_level -= 1
+                self._token_level -= tokens
+                return 0.0
+            return max(
+                self._blocked_until - now,
+                (1 - self._request_level) * 60.0 / self.requests_per_minute,
+                (tokens - self._token_level) * 60.0 / self.tokens_per_minute,
+                0.01,
+            )
+
+    def headroom(self) -> float:
+        """Fraction (0-1) of the tighter of the two buckets currently available; 0 while penalized."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._blocked_until:
+                return 0.0
+            return min(self._request_level / self.requests_per_minute, self._token_level / self.tokens_per_minute)
+
+    def available_tokens(self) -> float:
+        """Tokens that could be sent right now; 0 while penalized."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return 0.0 if now < self._blocked_until else self._token_level
+
+    def blocked_for(self) -> float:
+        """Seconds left of a penalty imposed by penalize()."""
+        with self._lock:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Pause every caller for `seconds` after the server reported a rate limit,
+        and empty the request bucket so traffic resumes gradually.
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._request_level = 0.0
+
+
+def max_concurrent_calls() -> int:
+    """
+    Configured limit on Gemini calls in flight (GEMINI_MAX_CONCURRENT_CALLS).
+    """
+    return max(1, int(os.getenv("GEMINI_MAX_CONCURRENT_CALLS", DEFAULT_MAX_CONCURRENT_CALLS)))
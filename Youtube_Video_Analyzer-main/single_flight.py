@@ -0,0 +1,133 @@
+"""
+Single-flight coalescing of identical summarization requests.
+
+When several sessions ask for the same video/prompt/model at once, only the
+first (the leader) runs the pipeline; the others wait and receive its result.
+Optionally, a file lock extends this across processes: a process that finds
+the lock held waits for it, then runs the pipeline itself - by which time the
+leader has filled the shared transcript and summary caches, so no Gemini calls
+are repeated.
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process coalescing is unavailable
+    fcntl = None
+
+
+def flight_key(video_id: str, prompt_text: str, model_name: str) -> str:
+    """Key identifying one logical request: video + prompt + model."""
+    prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()[:16]
+    return f"{video_id}-{prompt_hash}-{model_name}"
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Process-wide registry of in-flight computations keyed by request.
+
+    Args:
+        lock_dir: Directory for cross-process lock files, or None for in-process only
+        on_count: Optional callback(counter name) for every counted event, e.g. to
+            publish the counters where other processes can read them
+    """
+
+    def __init__(self, lock_dir: str = None, on_count=None):
+        self.lock_dir = lock_dir if fcntl else None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self.on_count = on_count
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"executions": 0, "coalesced": 0, "cross_process_waits": 0}
+
+    @classmethod
+    def from_env(cls, on_count=None) -> "SingleFlight":
+        """
+        SINGLE_FLIGHT_CROSS_PROCESS=1 enables file locks under CACHE_DIR/locks.
+        """
+        if os.getenv("SINGLE_FLIGHT_CROSS_PROCESS", "0") == "1":
+            return cls(os.path.join(os.getenv("CACHE_DIR", "./cache"), "locks"), on_count)
+        return cls(on_count=on_count)
+
+    def _count(self, name: str) -> None:
+        # Called outside self._lock: the callback may do I/O
+        if self.on_count:
+            self.on_count(name)
+
+    @contextmanager
+    def _process_lock(self, key: str):
+        if not self.lock_dir:
+            yield
+            return
+        with open(os.path.join(self.lock_dir, f"{key}.lock"), "w") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is computing this request; wait for it to finish
+                with self._lock:
+                    self._stats["cross_process_waits"] += 1
+                self._count("cross_process_waits")
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def do(self, key: str, fn):
+        """
+        Run fn() once per key among concurrent callers.
+
+        Returns:
+            tuple: (result, shared) - shared is True if this caller joined another's call
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every waiting caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+                leader = True
+        self._count("executions" if leader else "coalesced")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            with self._process_lock(key):
+                call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        """Counters: executions (leaders), coalesced (joined callers), cross_process_waits, in_flight."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
@@ -0,0 +1,220 @@
+"""
+Disk-backed, content-addressed cache for finished video summaries.
+
+Entries live in a SQLite database (WAL mode) so several Streamlit or worker
+processes can share one cache file safely. Eviction is LRU, bounded by entry
+count, total payload size and a time-to-live.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_CACHE_DIR = "./cache"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB of summary JSON
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    LRU cache of validated summary JSON plus its processing metadata.
+
+    Keys are built from video_id + transcript hash + prompt hash + model name,
+    so a changed transcript, prompt or model never serves a stale summary.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS summaries (
+                    cache_key TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    summary_json TEXT NOT NULL,
+                    metadata_json TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_summaries_last_accessed ON summaries(last_accessed)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_stats(name, value) VALUES (?, 0)",
+                [("hits",), ("misses",), ("evictions",)],
+            )
+
+    @classmethod
+    def from_env(cls) -> "SummaryCache":
+        """
+        Build a cache from environment variables.
+
+        CACHE_DIR                  - directory holding summaries.sqlite3 (default ./cache)
+        SUMMARY_CACHE_MAX_ENTRIES  - maximum number of cached summaries
+        SUMMARY_CACHE_MAX_BYTES    - maximum total size of cached JSON
+        SUMMARY_CACHE_TTL_SECONDS  - entries older than this are treated as misses
+        """
+        cache_dir = os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR)
+        return cls(
+            os.path.join(cache_dir, "summaries.sqlite3"),
+            max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            max_bytes=int(os.getenv("SUMMARY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            ttl_seconds=float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the cache safe to share
+        # across threads and processes; busy_timeout handles writer contention.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(video_id: str, transcript_text: str, prompt_text: str, model_name: str,
+                 transcript_digest: str = None) -> str:
+        """
+        Build the content-addressed cache key.
+
+        Args:
+            video_id: YouTube video id
+            transcript_text: Full transcript that will be summarized
+            prompt_text: Every prompt used by the pipeline, concatenated
+            model_name: Gemini model name
+            transcript_digest: SHA-256 hex digest of the transcript, used instead of
+                transcript_text for streamed transcripts
+
+        Returns:
+            str: Hex digest identifying this (video, transcript, prompt, model) combination
+        """
+        parts = [video_id, transcript_digest or _sha256(transcript_text), _sha256(prompt_text), model_name]
+        return _sha256("\x1f".join(parts))
+
+    def get(self, cache_key: str):
+        """
+        Look up a cached summary and refresh its LRU position.
+
+        Returns:
+            dict: {"summary": dict, "metadata": dict} or None on a miss
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary_json, metadata_json, created_at FROM summaries WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                conn.execute("DELETE FROM summaries WHERE cache_key = ?", (cache_key,))
+                row = None
+            if row is None:
+                conn.execute("UPDATE cache_stats SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute(
+                "UPDATE summaries SET last_accessed = ? WHERE cache_key = ?", (now, cache_key)
+            )
+            conn.execute("UPDATE cache_stats SET value = value + 1 WHERE name = 'hits'")
+        return {"summary": json.loads(row[0]), "metadata": json.loads(row[1])}
+
+    def put(self, cache_key: str, video_id: str, model_name: str, summary: dict, metadata: dict) -> None:
+        """
+        Store a validated summary and its processing metadata, then evict if over budget.
+        """
+        summary_json = json.dumps(summary, ensure_ascii=False)
+        metadata_json = json.dumps(metadata, ensure_ascii=False)
+        size_bytes = len(summary_json.encode("utf-8")) + len(metadata_json.encode("utf-8"))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO summaries
+                   (cache_key, video_id, model_name, summary_json, metadata_json,
+                    size_bytes, created_at, last_accessed)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (cache_key, video_id, model_name, summary_json, metadata_json, size_bytes, now, now),
+            )
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least-recently-used ones until both the entry
+        and byte limits are satisfied.
+
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    "DELETE FROM summaries WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+                removed += cursor.rowcount
+                count, total_bytes = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM summaries"
+                ).fetchone()
+                if count > self.max_entries or total_bytes > self.max_bytes:
+                    victims = []
+                    for key, size in conn.execute(
+                        "SELECT cache_key, size_bytes FROM summaries ORDER BY last_accessed ASC"
+                    ):
+                        if count <= self.max_entries and total_bytes <= self.max_bytes:
+                            break
+                        victims.append((key,))
+                        count -= 1
+                        total_bytes -= size
+                    conn.executemany("DELETE FROM summaries WHERE cache_key = ?", victims)
+                    removed += len(victims)
+                if removed:
+                    conn.execute(
+                        "UPDATE cache_stats SET value = value + ? WHERE name = 'evictions'", (removed,)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Report cache hit/miss counters and current size.
+
+        Returns:
+            dict: hits, misses, evictions, hit_rate, entries, size_bytes
+        """
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+            entries, size_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM summaries"
+            ).fetchone()
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(counters.get("hits", 0) / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size_bytes,
+        }
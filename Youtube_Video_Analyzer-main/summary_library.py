@@ -0,0 +1,487 @@
+"""
+Searchable library of every finished summary.
+
+The summary cache answers "has this exact transcript been summarized with
+these prompts?" and forgets entries after a while. The library answers "what
+have we summarized?": one row per video (its latest summary) is kept until
+deleted, with an SQLite FTS5 index over title, overview, key points and
+conclusion. The pipeline adds every summary it produces or serves from the
+cache, so past videos can be found and read again in milliseconds without a
+Gemini call.
+
+Search takes FTS5 query syntax ("rate limit", quota OR budget, title:python,
+learn*); input that is not valid FTS5 syntax is searched as plain words.
+Exports stream rows in batches to JSON Lines or Parquet (pyarrow, optional),
+so memory stays flat for libraries of any size.
+
+Usage:
+    python summary_library.py search "rate limits" --limit 10
+    python summary_library.py export library.parquet --query "machine learning"
+    python summary_library.py stats
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from lazy_imports import lazy_import
+
+# Optional: only needed for Parquet exports
+pa = lazy_import("pyarrow")
+
+
+DEFAULT_CACHE_DIR = "./cache"
+EXPORT_FORMATS = ("jsonl", "parquet")
+# Rows fetched (and written) per step of an export
+EXPORT_BATCH_ROWS = 1000
+# Relative weight of title, overview, key points and conclusion matches in the ranking
+RANK_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+SNIPPET_TOKENS = 16
+_WORD = re.compile(r"\w+")
+
+
+def _as_float(value):
+    """A finite number as a float; None for anything else (bools, text, NaN)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+@contextmanager
+def _output_file(out):
+    """
+    Binary handle for an export. A path is written through a temporary file in
+    the same directory and only replaces the target once the export finishes,
+    so a failed export leaves no partial file behind.
+    """
+    if not isinstance(out, (str, os.PathLike)):
+        yield out
+        return
+    directory = os.path.dirname(os.path.abspath(out))
+    fd, temp_path = tempfile.mkstemp(prefix=".export-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            yield handle
+        os.replace(temp_path, out)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def fts_query(text: str) -> str:
+    """
+    Plain-words form of a search: every word must occur, the last one as a prefix.
+
+    Returns:
+        str: FTS5 query, or "" for text without words
+    """
+    words = _WORD.findall(text)
+    if not words:
+        return ""
+    return " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+
+
+class SummaryLibrary:
+    """
+    Full-text-indexed store of the latest summary of every video.
+
+    Args:
+        path: SQLite database file
+        enabled: When False, put() is a no-op (reads still work)
+    """
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS library (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    overview TEXT NOT NULL,
+                    key_points TEXT NOT NULL,
+                    conclusion TEXT NOT NULL,
+                    summary_json TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    transcript_chars INTEGER,
+                    duration_seconds REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_library_updated_at ON library(updated_at)")
+            # External-content index: the text lives once, in `library`; triggers keep the index in sync
+            conn.execute(
+                """CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5(
+                    title, overview, key_points, conclusion,
+                    content='library', content_rowid='rowid', tokenize='porter unicode61'
+                )"""
+            )
+            conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS library_ai AFTER INSERT ON library BEGIN
+                    INSERT INTO library_fts(rowid, title, overview, key_points, conclusion)
+                    VALUES (new.rowid, new.title, new.overview, new.key_points, new.conclusion);
+                END"""
+            )
+            conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS library_ad AFTER DELETE ON library BEGIN
+                    INSERT INTO library_fts(library_fts, rowid, title, overview, key_points, conclusion)
+                    VALUES ('delete', old.rowid, old.title, old.overview, old.key_points, old.conclusion);
+                END"""
+            )
+            conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS library_au AFTER UPDATE ON library BEGIN
+                    INSERT INTO library_fts(library_fts, rowid, title, overview, key_points, conclusion)
+                    VALUES ('delete', old.rowid, old.title, old.overview, old.key_points, old.conclusion);
+                    INSERT INTO library_fts(rowid, title, overview, key_points, conclusion)
+                    VALUES (new.rowid, new.title, new.overview, new.key_points, new.conclusion);
+                END"""
+            )
+
+    @classmethod
+    def from_env(cls) -> "SummaryLibrary":
+        """
+        Build a library from environment variables.
+
+        CACHE_DIR       - directory holding library.sqlite3 (default ./cache)
+        SUMMARY_LIBRARY - 0 stops the pipeline from adding summaries (default 1)
+        """
+        cache_dir = os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR)
+        return cls(
+            os.path.join(cache_dir, "library.sqlite3"),
+            enabled=os.getenv("SUMMARY_LIBRARY", "1") == "1",
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    def put(self, video_id: str, summary: dict, model_name: str, metadata: dict = None) -> None:
+        """
+        Add or replace the summary of a video. An unchanged summary is left as it is.
+
+        Args:
+            video_id: YouTube video id
+            summary: Validated summary JSON (title, overview, key_points, conclusion)
+            model_name: Gemini model that wrote it
+            metadata: Processing metadata; transcript length and video duration are kept
+        """
+        if not self.enabled:
+            return
+        metadata = metadata or {}
+        spans = metadata.get("chunk_time_spans") or []
+        duration = spans[-1][1] if spans and spans[-1][1] is not None else None
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO library
+                   (video_id, title, overview, key_points, conclusion, summary_json, model_name,
+                    transcript_chars, duration_seconds, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(video_id) DO UPDATE SET
+                    title = excluded.title, overview = excluded.overview, key_points = excluded.key_points,
+                    conclusion = excluded.conclusion, summary_json = excluded.summary_json,
+                    model_name = excluded.model_name, transcript_chars = excluded.transcript_chars,
+                    duration_seconds = excluded.duration_seconds, updated_at = excluded.updated_at
+                   WHERE excluded.summary_json != library.summary_json""",
+                (
+                    video_id,
+                    str(summary.get("title", "")),
+                    str(summary.get("overview", "")),
+                    "\n".join(str(point) for point in summary.get("key_points", [])),
+                    str(summary.get("conclusion", "")),
+                    json.dumps(summary, ensure_ascii=False),
+                    model_name,
+                    metadata.get("transcript_chars"),
+                    duration,
+                    now,
+                    now,
+                ),
+            )
+
+    def get(self, video_id: str) -> dict:
+        """
+        Return the stored summary of a video.
+
+        Returns:
+            dict: video_id, summary, model_name, transcript_chars, duration_seconds,
+                  created_at, updated_at - or None if the video is not in the library
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT video_id, summary_json, model_name, transcript_chars, duration_seconds, created_at,
+                          updated_at FROM library WHERE video_id = ?""",
+                (video_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "video_id": row[0], "summary": json.loads(row[1]), "model_name": row[2], "transcript_chars": row[3],
+            "duration_seconds": row[4], "created_at": row[5], "updated_at": row[6],
+        }
+
+    def delete(self, video_id: str) -> bool:
+        """Remove a video; returns whether it was in the library."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM library WHERE video_id = ?", (video_id,)).rowcount > 0
+
+    def _match(self, conn, query: str, sql: str, params: tuple) -> list:
+        # Analysts can use FTS5 syntax; anything it rejects is searched as plain words
+        try:
+            return conn.execute(sql, (query, *params)).fetchall()
+        except sqlite3.OperationalError:
+            plain = fts_query(query)
+            if not plain:
+                return []
+            return conn.execute(sql, (plain, *params)).fetchall()
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list:
+        """
+        Find summaries matching a full-text query, best matches first.
+
+        Args:
+            query: FTS5 query or plain words
+            limit / offset: Page of results
+
+        Returns:
+            list[dict]: video_id, title, snippet (matches wrapped in **), rank (lower is
+                better), updated_at
+        """
+        if not query.strip():
+            return self.recent(limit, offset)
+        weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+        with self._connect() as conn:
+            # Rank every match first and build snippets for the page only: snippet() costs
+            # far more than bm25() and would otherwise run for each match
+            rows = self._match(
+                conn, query,
+                f"""WITH page AS (
+                        SELECT rowid, bm25(library_fts, {weights}) AS rank FROM library_fts
+                        WHERE library_fts MATCH ?1 ORDER BY rank LIMIT ?2 OFFSET ?3
+                    )
+                    SELECT l.video_id, l.title, snippet(library_fts, -1, '**', '**', ' … ', {SNIPPET_TOKENS}),
+                           page.rank, l.updated_at
+                    FROM page JOIN library_fts ON library_fts.rowid = page.rowid JOIN library l ON l.rowid = page.rowid
+                    WHERE library_fts MATCH ?1 ORDER BY page.rank""",
+                (limit, offset),
+            )
+        return [{"video_id": row[0], "title": row[1], "snippet": row[2], "rank": round(row[3], 6),
+                 "updated_at": row[4]} for row in rows]
+
+    def count(self, query: str = "") -> int:
+        """Number of summaries matching a query (all summaries for an empty query)."""
+        with self._connect() as conn:
+            if not query.strip():
+                return conn.execute("SELECT COUNT(*) FROM library").fetchone()[0]
+            rows = self._match(conn, query, "SELECT COUNT(*) FROM library_fts WHERE library_fts MATCH ?", ())
+        return rows[0][0] if rows else 0
+
+    def recent(self, limit: int = 20, offset: int = 0) -> list:
+        """Most recently added or updated summaries, in the same shape as search()."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT video_id, title, overview, updated_at FROM library ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [{"video_id": row[0], "title": row[1], "snippet": row[2], "rank": None, "updated_at": row[3]}
+                for row in rows]
+
+    def iter_records(self, query: str = "", batch_rows: int = EXPORT_BATCH_ROWS):
+        """
+        Yield lists of up to batch_rows full records (as get() returns them plus the
+        searchable fields), in video id order for the whole library or in rank order
+        for a query.
+        """
+        columns = ("l.video_id, l.title, l.overview, l.key_points, l.conclusion, l.summary_json, l.model_name, "
+                   "l.transcript_chars, l.duration_seconds, l.created_at, l.updated_at")
+        with self._connect() as conn:
+            if query.strip():
+                plain = query if self._valid(conn, query) else fts_query(query)
+                if not plain:
+                    return
+                cursor = conn.execute(
+                    f"""SELECT {columns} FROM library_fts JOIN library l ON l.rowid = library_fts.rowid
+                        WHERE library_fts MATCH ? ORDER BY bm25(library_fts)""",
+                    (plain,),
+                )
+            else:
+                cursor = conn.execute(f"SELECT {columns} FROM library l ORDER BY l.video_id")
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield [{
+                    "video_id": row[0], "title": row[1], "overview": row[2],
+                    "key_points": row[3].split("\n") if row[3] else [], "conclusion": row[4],
+                    "summary": json.loads(row[5]), "model_name": row[6], "transcript_chars": row[7],
+                    "duration_seconds": row[8], "created_at": row[9], "updated_at": row[10],
+                } for row in rows]
+
+    @staticmethod
+    def _valid(conn, query: str) -> bool:
+        try:
+            conn.execute("SELECT 1 FROM library_fts WHERE library_fts MATCH ? LIMIT 0", (query,)).fetchall()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def export(self, out, fmt: str = "jsonl", query: str = "") -> int:
+        """
+        Write the library (or the matches of a query) to a file.
+
+        "jsonl" writes one JSON object per summary (video_id, summary, model and
+        timestamps). "parquet" writes one column per field - key_points as a list
+        column - in row groups of EXPORT_BATCH_ROWS, for pandas, DuckDB or Spark.
+        Values that do not fit a Parquet column (a non-numeric key point
+        timestamp, say) are written as null.
+
+        Args:
+            out: Path or binary file object; a path is only created or replaced
+                once the whole export has been written
+            fmt: "jsonl" or "parquet"
+            query: Only export summaries matching this search
+
+        Returns:
+            int: Number of summaries written
+
+        Raises:
+            ValueError: For an unknown format
+            RuntimeError: For Parquet without pyarrow installed
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        if fmt == "parquet":
+            return self._export_parquet(out, query)
+        keys = ("video_id", "summary", "model_name", "transcript_chars", "duration_seconds", "created_at",
+                "updated_at")
+        written = 0
+        with _output_file(out) as handle:
+            for batch in self.iter_records(query):
+                handle.write("".join(
+                    json.dumps({key: record[key] for key in keys}, ensure_ascii=False) + "\n" for record in batch
+                ).encode("utf-8"))
+                written += len(batch)
+        return written
+
+    def _export_parquet(self, out, query: str) -> int:
+        if pa is None:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("video_id", pa.string()),
+            ("title", pa.string()),
+            ("overview", pa.string()),
+            ("key_points", pa.list_(pa.string())),
+            ("conclusion", pa.string()),
+            ("key_point_timestamps", pa.list_(pa.float64())),
+            ("model_name", pa.string()),
+            ("transcript_chars", pa.int64()),
+            ("duration_seconds", pa.float64()),
+            ("created_at", pa.timestamp("s")),
+            ("updated_at", pa.timestamp("s")),
+        ])
+        written = 0
+        with _output_file(out) as handle, pq.ParquetWriter(handle, schema) as writer:
+            for batch in self.iter_records(query):
+                columns = {name: [] for name in schema.names}
+                for record in batch:
+                    record = {**record, **self._parquet_fields(record)}
+                    for name in schema.names:
+                        columns[name].append(record[name])
+                writer.write_table(pa.table(columns, schema=schema))
+                written += len(batch)
+        return written
+
+    @staticmethod
+    def _parquet_fields(record: dict) -> dict:
+        # Summaries come from a model and rows may predate a column: anything that
+        # does not fit the schema becomes null instead of failing the whole export
+        timestamps = record["summary"].get("key_point_timestamps")
+        created_at, updated_at = _as_float(record["created_at"]), _as_float(record["updated_at"])
+        transcript_chars = _as_float(record["transcript_chars"])
+        return {
+            "key_point_timestamps": [_as_float(t) for t in timestamps] if isinstance(timestamps, list) else [],
+            "transcript_chars": int(transcript_chars) if transcript_chars is not None else None,
+            "duration_seconds": _as_float(record["duration_seconds"]),
+            "created_at": int(created_at) if created_at is not None else None,
+            "updated_at": int(updated_at) if updated_at is not None else None,
+        }
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: entries, oldest and newest update time, size_bytes of the database file
+        """
+        with self._connect() as conn:
+            entries, oldest, newest = conn.execute(
+                "SELECT COUNT(*), MIN(updated_at), MAX(updated_at) FROM library"
+            ).fetchone()
+        return {"entries": entries, "oldest": oldest, "newest": newest,
+                "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Search and export the local summary library.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="Full-text search (FTS5 syntax or plain words)")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--json", action="store_true", help="Print results as JSON")
+    export = commands.add_parser("export", help="Write the library to JSONL or Parquet")
+    export.add_argument("output", help="Output file (.jsonl or .parquet)")
+    export.add_argument("--format", choices=EXPORT_FORMATS, help="Default: from the file extension")
+    export.add_argument("--query", default="", help="Only export summaries matching this search")
+    show = commands.add_parser("show", help="Print one stored summary as JSON")
+    show.add_argument("video_id")
+    commands.add_parser("stats", help="Number of summaries and database size")
+    args = parser.parse_args(argv)
+
+    library = SummaryLibrary.from_env()
+    if args.command == "search":
+        started = time.perf_counter()
+        results = library.search(args.query, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if args.json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            for result in results:
+                print(f"{result['video_id']}  {result['title']}\n    {result['snippet']}")
+            print(f"{len(results)} of {library.count(args.query)} matches in {elapsed_ms:.1f} ms", file=sys.stderr)
+    elif args.command == "export":
+        fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "jsonl")
+        started = time.perf_counter()
+        written = library.export(args.output, fmt, args.query)
+        print(f"Wrote {written} summaries to {args.output} in {time.perf_counter() - started:.2f}s",
+              file=sys.stderr)
+    elif args.command == "show":
+        entry = library.get(args.video_id)
+        if entry is None:
+            print(f"{args.video_id} is not in the library", file=sys.stderr)
+            return 1
+        print(json.dumps(entry, indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(library.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
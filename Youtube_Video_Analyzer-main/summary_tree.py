@@ -0,0 +1,262 @@
+"""
+Multi-level map-reduce summarization with an up-front budget plan.
+
+Level 0 summarizes every transcript chunk (map). Each higher level merges
+groups of up to `fan_in` summaries (reduce) until one summary remains. The
+whole tree is planned before any call is made, so a run that would exceed its
+call or token budget is rejected without spending quota, and the plan
+(calls, estimated tokens, estimated time) can be shown to the user first.
+"""
+import itertools
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, estimate_tokens
+
+
+DEFAULT_FAN_IN = 10
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_MAX_API_CALLS = 8
+# A 250-word JSON summary is roughly 400 tokens
+SUMMARY_TOKENS = 400
+# Rough latency model for one call: fixed overhead + prefill time
+EST_BASE_SECONDS = 3.0
+EST_INPUT_TOKENS_PER_SECOND = 50000.0
+# Calls submitted ahead per worker: enough to keep every worker busy while the
+# next chunks are still being read
+PENDING_PER_WORKER = 2
+
+
+def estimate_call_seconds(input_tokens: int) -> float:
+    """Rough wall time of one Gemini call for a given input size."""
+    return EST_BASE_SECONDS + input_tokens / EST_INPUT_TOKENS_PER_SECOND
+
+
+def tree_settings_from_env() -> dict:
+    """
+    Read tree shape and budget from the environment.
+
+    SUMMARY_TREE_FAN_IN    - summaries merged per reduce call (default 10)
+    SUMMARY_TREE_MAX_DEPTH - maximum number of reduce levels (default 3)
+    MAX_API_CALLS          - Gemini calls allowed per video (default 8)
+    MAX_TOKENS_PER_RUN     - estimated input tokens allowed per video (default unlimited)
+    """
+    max_tokens = os.getenv("MAX_TOKENS_PER_RUN")
+    return {
+        "fan_in": int(os.getenv("SUMMARY_TREE_FAN_IN", DEFAULT_FAN_IN)),
+        "max_depth": int(os.getenv("SUMMARY_TREE_MAX_DEPTH", DEFAULT_MAX_DEPTH)),
+        "call_budget": int(os.getenv("MAX_API_CALLS", DEFAULT_MAX_API_CALLS)),
+        "token_budget": int(max_tokens) if max_tokens else None,
+    }
+
+
+def _level_seconds(calls: int, input_tokens: int, concurrency: int, requests_per_minute: float,
+                   call_seconds=estimate_call_seconds, tokens_per_minute: float = None,
+                   tokens_available: float = None) -> float:
+    if not calls:
+        return 0.0
+    waves = math.ceil(calls / concurrency)
+    latency = call_seconds(input_tokens // calls)
+    # Calls beyond the limiter's initial burst are paced at requests_per_minute (and tokens_per_minute)
+    paced = max(0.0, (calls - requests_per_minute) * 60.0 / requests_per_minute)
+    if tokens_per_minute:
+        burst = tokens_per_minute if tokens_available is None else tokens_available
+        paced = max(paced, (input_tokens - burst) * 60.0 / tokens_per_minute)
+    return max(waves * latency, paced + latency)
+
+
+def plan_summary_tree(chunk_tokens: list, map_prompt: str, reduce_prompt: str,
+                      fan_in: int = DEFAULT_FAN_IN, max_depth: int = DEFAULT_MAX_DEPTH,
+                      call_budget: int = DEFAULT_MAX_API_CALLS, token_budget: int = None,
+                      concurrency: int = 4, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                      reused_chunks: int = 0, shared_chunks=(), call_seconds=None,
+                      tokens_per_minute: float = None, tokens_available: float = None) -> dict:
+    """
+    Plan the map-reduce tree for a list of chunks before running anything.
+
+    Fan-in is raised automatically when the tree would otherwise be deeper than
+    max_depth or need more calls than call_budget.
+    
+    With reused_chunks, the summaries of the first chunks - and of every reduce
+    group built only from them - are already available (an incremental refresh),
+    so only the calls on the path of the new tail are counted.
+    
+    shared_chunks are chunks whose summaries come from the cross-video chunk
+    store: their map calls are skipped, but the reduce groups above them still
+    run (a stored merge is only reused if its inputs match exactly).
+
+    Args:
+        chunk_tokens: Estimated tokens of each chunk (one map call each)
+        map_prompt: Prompt sent with each chunk
+        reduce_prompt: Prompt sent with each group of summaries
+        fan_in: Summaries merged per reduce call
+        max_depth: Maximum reduce levels above the map level
+        call_budget: Maximum Gemini calls for the whole tree
+        token_budget: Maximum estimated input tokens for the whole tree (None = unlimited)
+        concurrency: Calls allowed in flight per level
+        requests_per_minute: Rate limit used for the time estimate
+        reused_chunks: Leading chunks whose summaries are already available
+        shared_chunks: Indexes of other chunks whose summaries are already available
+        call_seconds: Predicted seconds of one call by input tokens (default estimate_call_seconds)
+        tokens_per_minute: Token quota used for the time estimate (None = not paced by tokens)
+        tokens_available: Tokens the limiter would admit right now, when other runs have
+            drained it (default: a full bucket); applied to the map level
+
+    Returns:
+        dict: levels (per-level calls/tokens/concurrency/seconds), total_calls,
+              estimated_tokens, estimated_seconds, fan_in, depth, reused_calls,
+              within_budget, reason
+    """
+    n = len(chunk_tokens)
+    fan_in = max(2, fan_in)
+    if n > 1 and max_depth >= 1:
+        # Smallest fan-in that reaches a single root within max_depth levels
+        fan_in = max(fan_in, math.ceil(n ** (1.0 / max_depth)))
+
+    reused_chunks = max(0, min(reused_chunks, n))
+    shared_chunks = {i for i in shared_chunks if reused_chunks <= i < n}
+    map_calls = n - reused_chunks - len(shared_chunks)
+    map_tokens = sum(tokens for i, tokens in enumerate(chunk_tokens) if i >= reused_chunks and i not in shared_chunks)
+    
+    def build(fan):
+        map_prompt_tokens = estimate_tokens(map_prompt)
+        reduce_prompt_tokens = estimate_tokens(reduce_prompt)
+        levels = [{
+            "level": 0,
+            "kind": "map",
+            "calls": map_calls,
+            "nodes": n,
+            "input_tokens": map_tokens + map_calls * map_prompt_tokens,
+        }]
+        width = n
+        # Index of the first node whose input changed at the current level
+        first_changed = reused_chunks
+        while width > 1:
+            groups = math.ceil(width / fan)
+            first_changed = min(groups, first_changed // fan) if first_changed < width else groups
+            calls = groups - first_changed
+            levels.append({
+                "level": len(levels),
+                "kind": "reduce",
+                "calls": calls,
+                "nodes": groups,
+                "input_tokens": max(0, width - first_changed * fan) * SUMMARY_TOKENS + calls * reduce_prompt_tokens,
+            })
+            width = groups
+        return levels
+
+    levels = build(fan_in)
+    # Fewer reduce calls: widen the fan-in until the call budget is met (map calls are fixed)
+    while n > 1 and sum(level["calls"] for level in levels) > call_budget and fan_in < n and not reused_chunks:
+        fan_in += 1
+        levels = build(fan_in)
+
+    total_calls = sum(level["calls"] for level in levels)
+    total_tokens = sum(level["input_tokens"] for level in levels)
+    reused_calls = sum(level["nodes"] for level in levels) - total_calls
+    call_seconds = call_seconds or estimate_call_seconds
+    for level in levels:
+        level["concurrency"] = max(1, min(concurrency, level["calls"]))
+        level["estimated_seconds"] = round(
+            _level_seconds(level["calls"], level["input_tokens"], level["concurrency"], requests_per_minute,
+                           call_seconds, tokens_per_minute, tokens_available if level["level"] == 0 else None), 1
+        )
+
+    reason = None
+    if total_calls > call_budget:
+        map_calls = levels[0]["calls"]
+        reason = (f"needs {total_calls} API calls ({map_calls} chunks + {total_calls - map_calls} reduce calls), "
+                  f"but the budget is {call_budget}")
+    elif token_budget is not None and total_tokens > token_budget:
+        reason = f"needs ~{total_tokens:,} input tokens, but the budget is {token_budget:,}"
+
+    return {
+        "levels": levels,
+        "total_calls": total_calls,
+        "estimated_tokens": total_tokens,
+        "estimated_seconds": round(sum(level["estimated_seconds"] for level in levels), 1),
+        "fan_in": fan_in,
+        "depth": len(levels) - 1,
+        "reused_calls": reused_calls,
+        "within_budget": reason is None,
+        "reason": reason,
+    }
+
+
+def describe_plan(plan: dict) -> str:
+    """One-line human readable plan summary."""
+    shape = " → ".join(f"{level['calls']} {level['kind']}" for level in plan["levels"])
+    reused = f" ({plan['reused_calls']} reused)" if plan.get("reused_calls") else ""
+    return (f"Plan: {shape} — {plan['total_calls']} API calls{reused}, ~{plan['estimated_tokens']:,} tokens, "
+            f"~{plan['estimated_seconds']}s")
+
+
+def _run_level(jobs, total: int, concurrency: int, on_progress=None, level: dict = None) -> list:
+    """
+    Run (fn, args) jobs with `concurrency` workers, keeping at most
+    PENDING_PER_WORKER jobs per worker submitted at a time.
+
+    Jobs are drawn from the iterable only as calls finish, so a generator of
+    chunk texts is read while earlier calls are still in flight and never held
+    in full.
+    """
+    results = [None] * total
+    window = max(1, concurrency * PENDING_PER_WORKER)
+    jobs = enumerate(jobs)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+        done = 0
+        try:
+            while True:
+                for i, (fn, args) in itertools.islice(jobs, window - len(pending)):
+                    pending[executor.submit(fn, *args)] = i
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results[pending.pop(future)] = future.result()
+                    done += 1
+                    if on_progress:
+                        on_progress(level, done, total)
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+    return results
+
+
+def run_summary_tree(chunks, plan: dict, map_fn, reduce_fn, on_progress=None) -> dict:
+    """
+    Execute a planned tree level by level, in parallel within each level.
+
+    Args:
+        chunks: Chunk texts (level 0 inputs): a list, or an iterator that yields
+            exactly the planned number of chunks and is consumed as calls free up
+        plan: Result of plan_summary_tree
+        map_fn: map_fn(chunk_text, is_root) -> summary dict; raises ValueError on failure
+        reduce_fn: reduce_fn(list[summary dict], is_root) -> summary dict; raises ValueError
+        on_progress: Optional callback(level, done, total) after each finished call
+
+    Returns:
+        dict: Root summary
+
+    Raises:
+        ValueError: If any call fails to produce a valid summary
+    """
+    fan_in = plan["fan_in"]
+    summaries = None
+    for level in plan["levels"]:
+        if level["kind"] == "map":
+            if level["nodes"] == 1:
+                # A single chunk is already the whole video: its summary is the root
+                return map_fn(next(iter(chunks)), True)
+            jobs = ((map_fn, (chunk, False)) for chunk in chunks)
+            total = level["nodes"]
+        else:
+            groups = [summaries[i:i + fan_in] for i in range(0, len(summaries), fan_in)]
+            is_root = len(groups) == 1
+            jobs = [(reduce_fn, (group, is_root)) for group in groups]
+            total = len(jobs)
+        summaries = _run_level(jobs, total, level["concurrency"], on_progress, level)
+    return summaries[0]
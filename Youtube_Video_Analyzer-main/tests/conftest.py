@@ -0,0 +1,24 @@
+"""
+Shared pytest setup.
+
+The pipeline builds its stores from the environment at import time, so every
+test session gets its own CACHE_DIR and the offline fake Gemini backend before
+any app module is imported. Background workers and the metrics endpoint stay off,
+and the quota pool is configured so the fake backend is never rate limited.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="yt-analyzer-tests-")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MEAN", "0")
+os.environ["JOB_WORKERS"] = "0"
+os.environ["METRICS_PORT"] = "0"
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+# The fake backend has no quota: keep the pool's limiters from pacing test calls
+os.environ.setdefault("GEMINI_RPM", "100000")
+os.environ.setdefault("GEMINI_TPM", "100000000")
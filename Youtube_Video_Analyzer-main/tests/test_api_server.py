@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+import api_server
+import pipeline
+from api_server import ApiServer, HTTPError, SummaryService
+from rate_limiter import estimate_tokens
+
+
+def read(raw: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await ApiServer(SummaryService()).read_request(reader)
+    return asyncio.run(run())
+
+
+def test_request_is_parsed_with_query_and_body():
+    request = read(b"POST /v1/summaries?q=rate%20limits&limit=5 HTTP/1.1\r\nHost: x\r\n"
+                   b"Content-Length: 2\r\nConnection: close\r\n\r\n{}")
+    assert request["method"] == "POST"
+    assert request["path"] == "/v1/summaries"
+    assert request["query"] == {"q": ["rate limits"], "limit": ["5"]}
+    assert request["body"] == b"{}"
+    assert request["keep_alive"] is False
+
+
+def test_closed_connection_returns_none():
+    assert read(b"") is None
+
+
+@pytest.mark.parametrize("raw, status", [
+    (b"POST / HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: -5\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (api_server.MAX_BODY_BYTES + 1), 413),
+    (b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2\r\n{}\r\n0\r\n\r\n", 411),
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"GET / HTTP/1.1\r\nHost: x", 400),
+])
+def test_malformed_requests_raise_http_errors(raw, status):
+    with pytest.raises(HTTPError) as error:
+        read(raw)
+    assert error.value.status == status
+
+
+def test_bad_content_length_gets_an_http_response():
+    async def run():
+        server = await ApiServer(SummaryService()).start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /v1/summaries HTTP/1.1\r\nHost: x\r\nContent-Length: abc\r\n\r\n")
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response.decode()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    response = asyncio.run(run())
+    assert response.startswith("HTTP/1.1 400 Bad Request")
+    assert json.loads(response.split("\r\n\r\n", 1)[1]) == {"error": "Invalid Content-Length"}
+
+
+@pytest.fixture
+def stored_video(monkeypatch):
+    video_id = "apiSync0001"
+    snippets = [{"text": f"Sentence number {i} about request limits.", "start": float(i), "duration": 1.0}
+                for i in range(200)]
+    pipeline.transcript_store.save(video_id, "en", False, snippets)
+    loads, calls = [], []
+    fetch, generate = pipeline.fetch_best_transcript, pipeline.generate_gemini_content
+    tokens = estimate_tokens(pipeline.extract_transcript(video_id).text)
+    monkeypatch.setattr(pipeline, "fetch_best_transcript",
+                        lambda *args, **kwargs: loads.append(1) or fetch(*args, **kwargs))
+    monkeypatch.setattr(pipeline, "generate_gemini_content",
+                        lambda *args, **kwargs: calls.append(1) or generate(*args, **kwargs))
+    return video_id, tokens, loads, calls
+
+
+def test_sync_request_loads_the_transcript_once(stored_video):
+    video_id, tokens, loads, calls = stored_video
+    service = SummaryService(sync_max_tokens=tokens)
+    result = service._summarize(video_id, pipeline.PipelineReporter(), use_cache=False, incremental=False, stream=False)
+    assert result["summary"] is not None and calls
+    assert len(loads) == 1
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_long_transcript_is_handed_to_a_job_without_api_calls(stored_video, monkeypatch, streamed):
+    video_id, tokens, loads, calls = stored_video
+    monkeypatch.setenv("STREAMING_MIN_CHARS", "0" if streamed else "1000000000")
+    service = SummaryService(sync_max_tokens=tokens - 1)
+    result = service._summarize(video_id, pipeline.PipelineReporter(), use_cache=True, incremental=False, stream=False)
+    assert result == {"too_long": tokens}
+    assert len(loads) == (0 if streamed else 1) and calls == []
@@ -0,0 +1,94 @@
+import pytest
+
+from batch_planner import (
+    CHUNK_FILL,
+    MIN_SAMPLES,
+    CallStats,
+    candidate_chunk_sizes,
+    choose_plan,
+)
+from summary_tree import EST_BASE_SECONDS, plan_summary_tree
+
+MAP_PROMPT = "Summarize this part of the transcript."
+REDUCE_PROMPT = "Merge these summaries."
+
+
+def test_candidate_sizes_are_largest_first_one_per_chunk_count():
+    sizes = candidate_chunk_sizes(200000, 100000, 2000)
+    assert sizes[0] == 100000
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[-1] >= 2000
+    counts = [-(-200000 // int(size * CHUNK_FILL)) for size in sizes]
+    assert len(set(counts)) == len(counts)
+
+
+def test_short_transcript_has_a_single_candidate():
+    assert candidate_chunk_sizes(1000, 100000, 2000) == [100000]
+
+
+def test_calls_objective_plans_like_the_largest_chunk_split():
+    choice = choose_plan(500000, 100000, MAP_PROMPT, REDUCE_PROMPT, objective="calls", call_budget=20)
+    assert choice["chunk_tokens"] == 100000
+    fixed = plan_summary_tree([500000 // 6 + 1] * 6, MAP_PROMPT, REDUCE_PROMPT, call_budget=20,
+                              requests_per_minute=10)
+    assert choice["predicted"]["calls"] == fixed["total_calls"] == 7
+
+
+def test_time_and_token_objectives_never_lose_on_their_own_measure():
+    kwargs = dict(call_budget=60, concurrency=8, requests_per_minute=1000,
+                  call_seconds=lambda tokens: 0.5 + tokens / 5000)
+    by = {objective: choose_plan(500000, 100000, MAP_PROMPT, REDUCE_PROMPT, objective=objective, **kwargs)
+          for objective in ("calls", "time", "tokens")}
+    assert by["time"]["chunk_tokens"] < by["calls"]["chunk_tokens"]
+    assert by["time"]["predicted"]["seconds"] < by["calls"]["predicted"]["seconds"]
+    assert by["calls"]["predicted"]["calls"] <= by["time"]["predicted"]["calls"]
+    assert by["tokens"]["predicted"]["tokens"] <= min(by[o]["predicted"]["tokens"] for o in by)
+
+
+def test_unknown_objective_falls_back_to_calls():
+    choice = choose_plan(500000, 100000, MAP_PROMPT, REDUCE_PROMPT, objective="fastest", call_budget=20)
+    assert choice["objective"] == "calls"
+
+
+def test_no_plan_within_budget_keeps_the_largest_chunks():
+    choice = choose_plan(5000000, 100000, MAP_PROMPT, REDUCE_PROMPT, call_budget=8)
+    assert choice["predicted"] is None
+    assert choice["chunk_tokens"] == 100000
+    assert choice["candidates"] > 0
+
+
+def test_fan_in_is_limited_by_what_a_reduce_call_can_hold():
+    # 2,000-token calls hold only a few 400-token summaries
+    choice = choose_plan(20000, 2000, MAP_PROMPT, REDUCE_PROMPT, fan_in=10, call_budget=100)
+    assert choice["predicted"] is not None
+    assert choice["fan_in"] <= 5
+
+
+def test_latency_model_uses_the_static_estimate_until_enough_samples():
+    stats = CallStats()
+    for _ in range(MIN_SAMPLES - 1):
+        stats.record(10000, 1.0)
+    assert stats.latency_model()[0] == EST_BASE_SECONDS
+    assert not stats.snapshot()["fitted"]
+
+
+def test_latency_model_fits_measured_calls():
+    stats = CallStats()
+    for i in range(MIN_SAMPLES * 2):
+        tokens = 1000 * (i + 1)
+        stats.record(tokens, 0.5 + tokens / 10000)
+    base, per_token, samples = stats.latency_model()
+    assert samples == MIN_SAMPLES * 2
+    assert base == pytest.approx(0.5)
+    assert per_token == pytest.approx(1 / 10000)
+
+
+def test_rate_limited_attempts_add_expected_retry_time():
+    stats = CallStats()
+    for _ in range(MIN_SAMPLES):
+        stats.record(1000, 1.0)
+    without_429 = stats.call_seconds_fn()(1000)
+    for _ in range(MIN_SAMPLES):
+        stats.record_rate_limited()
+    assert stats.rate_limit_rate() == 0.5
+    assert stats.call_seconds_fn()(1000) > without_429
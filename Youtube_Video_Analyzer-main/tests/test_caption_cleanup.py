@@ -0,0 +1,80 @@
+from caption_cleanup import clean_snippets, overlap_length
+
+
+def lines(*texts, step=2.0, duration=2.0):
+    """Snippets shown one after the other, without overlapping in time."""
+    return [{"text": text, "start": i * step, "duration": duration} for i, text in enumerate(texts)]
+
+
+def texts(snippets):
+    return [snippet["text"] for snippet in snippets]
+
+
+def test_overlap_length_finds_longest_suffix_prefix_match():
+    assert overlap_length(["a", "b", "c"], ["b", "c", "d"]) == 2
+    assert overlap_length(["a", "b"], ["c", "d"]) == 0
+    assert overlap_length([], ["a"]) == 0
+
+
+def test_single_shared_word_between_sequential_lines_is_kept():
+    cleaned, stats = clean_snippets(lines("We should do this.", "This is important"))
+    assert texts(cleaned) == ["We should do this.", "This is important"]
+    assert stats["overlap_words_removed"] == 0
+
+    cleaned, _ = clean_snippets(lines("He said that", "that was wrong"))
+    assert texts(cleaned) == ["He said that", "that was wrong"]
+
+
+def test_single_word_overlap_is_removed_when_lines_overlap_in_time():
+    cleaned, stats = clean_snippets(lines("He said that", "that was wrong", step=1.0))
+    assert texts(cleaned) == ["He said that", "was wrong"]
+    assert stats["overlap_words_removed"] == 1
+
+
+def test_rolling_overlap_of_two_words_is_removed():
+    cleaned, stats = clean_snippets(lines("the quick brown fox", "brown fox jumps over"))
+    assert texts(cleaned) == ["the quick brown fox", "jumps over"]
+    assert stats["overlap_words_removed"] == 2
+
+
+def test_repeated_short_line_is_kept_unless_it_overlaps_in_time():
+    cleaned, stats = clean_snippets(lines("Yes.", "No.", "Yes."))
+    assert texts(cleaned) == ["Yes.", "No.", "Yes."]
+    assert stats["duplicate_lines_removed"] == 0
+
+    echo = [{"text": "Yes.", "start": 0.0, "duration": 2.0}, {"text": "No.", "start": 0.5, "duration": 0.5},
+            {"text": "Yes.", "start": 1.0, "duration": 2.0}]
+    cleaned, stats = clean_snippets(echo)
+    assert texts(cleaned) == ["Yes.", "No."]
+    assert stats["duplicate_lines_removed"] == 1
+
+
+def test_near_duplicate_long_line_is_dropped_and_extends_kept_duration():
+    snippets = lines("this line is repeated by the captions", "intermission words here",
+                     "this line is repeated by the captions")
+    cleaned, stats = clean_snippets(snippets)
+    assert texts(cleaned) == ["this line is repeated by the captions", "intermission words here"]
+    assert stats["duplicate_lines_removed"] == 1
+
+
+def test_markers_are_stripped_and_empty_snippets_merged():
+    snippets = lines("hello there", "[Music]", "♪ ♪", "(applause) general kenobi")
+    cleaned, stats = clean_snippets(snippets)
+    assert texts(cleaned) == ["hello there", "general kenobi"]
+    assert stats["markers_removed"] == 4
+    assert stats["empty_snippets_removed"] == 2
+    # The kept line covers the emptied snippets after it
+    assert cleaned[0]["duration"] == 6.0
+
+
+def test_manual_tracks_are_not_cleaned(monkeypatch):
+    import pipeline
+
+    manual = lines("We should do this.", "This is important", "Yes.", "Yes.")
+    monkeypatch.setattr(pipeline, "fetch_best_transcript", lambda *args, **kwargs: (manual, False))
+    transcript = pipeline.extract_transcript("dQw4w9WgXcQ")
+    assert transcript.text == "We should do this. This is important Yes. Yes."
+
+    rolling = lines("the quick brown fox", "brown fox jumps over")
+    monkeypatch.setattr(pipeline, "fetch_best_transcript", lambda *args, **kwargs: (rolling, True))
+    assert pipeline.extract_transcript("dQw4w9WgXcQ").text == "the quick brown fox jumps over"
@@ -0,0 +1,112 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import checkpoints
+import pipeline
+from checkpoints import CheckpointStore
+from compact_transcript import CompactTranscript
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints.sqlite3"), ttl_seconds=60)
+
+
+def test_run_id_depends_on_transcript_chunking_prompt_and_model():
+    run_id = CheckpointStore.make_run_id("text", 1000, 10, "prompt", "m")
+    assert run_id == CheckpointStore.make_run_id("text", 1000, 10, "prompt", "m")
+    for changed in [("text 2", 1000, 10, "prompt", "m"), ("text", 2000, 10, "prompt", "m"),
+                    ("text", 1000, 5, "prompt", "m"), ("text", 1000, 10, "prompt 2", "m"),
+                    ("text", 1000, 10, "prompt", "m2")]:
+        assert CheckpointStore.make_run_id(*changed) != run_id
+
+
+def test_put_get_existing_count_and_discard(store):
+    keys = [CheckpointStore.node_key("map", f"chunk {i}") for i in range(3)]
+    store.put("run", keys[0], {"title": "zero"})
+    store.put("run", keys[2], {"title": "two"})
+    assert store.get("run", keys[0]) == {"title": "zero"}
+    assert store.get("run", keys[1]) is None
+    assert store.get("other run", keys[0]) is None
+    assert store.existing("run", keys) == {keys[0], keys[2]}
+    assert store.count("run") == 2
+    store.discard("run")
+    assert store.count("run") == 0
+
+
+def test_expired_checkpoints_are_ignored_and_purged(store, monkeypatch):
+    store.put("run", "map:a", {"title": "a"})
+    now = time.time()
+    later = SimpleNamespace(time=lambda: now + 61)
+    monkeypatch.setattr(checkpoints, "time", later)
+    assert store.get("run", "map:a") is None
+    assert store.count("run") == 0
+    assert store.purge_expired() == 1
+
+
+def test_retain_drops_superseded_nodes(store):
+    for key in ("map:a", "map:b", "reduce:ab"):
+        store.put("run", key, {"title": key})
+    assert store.retain("run", {"map:a", "map:b"}) == 1
+    assert store.existing("run", ["map:a", "map:b", "reduce:ab"]) == {"map:a", "map:b"}
+
+
+def test_incremental_state_recognizes_a_grown_transcript(store):
+    store.put_state("run", "first part", 1)
+    state = store.get_state("run")
+    assert state["transcript_chars"] == len("first part") and state["num_chunks"] == 1
+    assert CheckpointStore.is_extension(state, "first part and more")
+    assert not CheckpointStore.is_extension(state, "First part and more")
+    assert not CheckpointStore.is_extension(state, "first")
+
+
+def transcript() -> CompactTranscript:
+    return CompactTranscript.from_snippets(
+        [{"text": f"Section {i // 10} sentence {i} about resumable runs.", "start": float(i), "duration": 1.0}
+         for i in range(120)]
+    )
+
+
+def test_retry_after_a_failed_map_call_only_pays_for_missing_calls(monkeypatch):
+    monkeypatch.setenv("CHUNK_TOKENS", "300")
+    monkeypatch.setenv("MAX_API_CALLS", "50")
+    monkeypatch.setenv("GEMINI_MAX_CONCURRENT_CALLS", "1")
+    generate = pipeline.generate_gemini_content
+    calls = []
+
+    def flaky(content, call_prompt, *args, **kwargs):
+        calls.append(content)
+        if len(calls) == 5 and failing[0]:
+            return "Error: the service is unavailable"
+        return generate(content, call_prompt, *args, **kwargs)
+
+    failing = [True]
+    monkeypatch.setattr(pipeline, "generate_gemini_content", flaky)
+
+    failed = pipeline.PipelineReporter()
+    assert pipeline.chunk_and_summarize(transcript(), failed, reuse=False) is None
+    # Every call before the failed one was checkpointed
+    saved = len(calls) - 1
+    assert saved == 4
+    assert f"{saved} finished calls are saved" in failed.last_error
+
+    failing[0] = False
+    calls.clear()
+    retried = pipeline.PipelineReporter()
+    assert pipeline.chunk_and_summarize(transcript(), retried, reuse=False) is not None
+    metadata = retried.metadata
+    assert metadata["checkpoint_calls_reused"] == saved
+    assert metadata["api_calls_used"] == len(calls) == metadata["summary_plan"]["total_calls"] - saved
+    # A finished run drops its checkpoints
+    assert pipeline.checkpoint_store.count(metadata["run_id"]) == 0
+
+
+def test_retry_without_resume_pays_again(monkeypatch):
+    monkeypatch.setenv("CHUNK_TOKENS", "300")
+    monkeypatch.setenv("MAX_API_CALLS", "50")
+    reporter = pipeline.PipelineReporter()
+    assert pipeline.chunk_and_summarize(transcript(), reporter, resume=False, reuse=False) is not None
+    assert reporter.metadata["checkpoint_calls_reused"] == 0
+    assert reporter.metadata["api_calls_used"] == reporter.metadata["summary_plan"]["total_calls"]
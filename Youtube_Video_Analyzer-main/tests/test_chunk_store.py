@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import chunk_store
+from chunk_store import ChunkSummaryStore, minhash_signature, similarity
+
+PROMPT = "Summarize this chunk."
+MODEL = "gemini-2.5-flash"
+
+
+def chunk_text(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randrange(2000)}" for _ in range(words))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkSummaryStore(str(tmp_path / "chunks.sqlite3"))
+
+
+def test_numpy_and_python_signatures_are_identical(monkeypatch):
+    if chunk_store.np is None:
+        pytest.skip("numpy is not installed")
+    # More shingles than one numpy block, so the blocked minimum is covered too
+    text = chunk_text(1, words=chunk_store.MINHASH_BLOCK + 500)
+    with_numpy = minhash_signature(text)
+    monkeypatch.setattr(chunk_store, "np", None)
+    assert minhash_signature(text) == with_numpy
+    assert len(with_numpy) == chunk_store.NUM_PERMUTATIONS
+
+
+def test_signature_of_text_without_words_is_none():
+    assert minhash_signature("  ... !! ") is None
+
+
+def test_similarity_tracks_shared_shingles():
+    text = chunk_text(2)
+    words = text.split()
+    near = " ".join(words[10:] + ["closing", "remarks", "here"])
+    assert similarity(minhash_signature(text), minhash_signature(text)) == 1.0
+    assert similarity(minhash_signature(text), minhash_signature(near)) > 0.8
+    assert similarity(minhash_signature(text), minhash_signature(chunk_text(3))) < 0.1
+
+
+def test_exact_put_and_get(store):
+    summary = {"summary": "A chunk about word42."}
+    store.put("map", "chunk one", PROMPT, MODEL, summary)
+    assert store.get("map", "chunk one", PROMPT, MODEL) == summary
+    assert store.get("map", "chunk one", "Another prompt.", MODEL) is None
+    assert store.get("reduce", "chunk one", PROMPT, MODEL) is None
+
+
+def test_lookup_matches_identical_and_near_duplicate_chunks(store):
+    original = chunk_text(4)
+    store.put("map", original, PROMPT, MODEL, {"summary": "original"})
+    shifted = " ".join(original.split()[8:])
+    unrelated = chunk_text(5)
+
+    matches = store.lookup_chunks([original, shifted, unrelated], PROMPT, MODEL)
+
+    assert matches[0] == {"summary": {"summary": "original"}, "similarity": 1.0}
+    assert matches[1]["summary"] == {"summary": "original"}
+    assert store.similarity_threshold <= matches[1]["similarity"] < 1.0
+    assert 2 not in matches
+
+
+def test_exact_only_threshold_skips_near_duplicates(tmp_path):
+    store = ChunkSummaryStore(str(tmp_path / "chunks.sqlite3"), similarity_threshold=1.0)
+    original = chunk_text(6)
+    store.put("map", original, PROMPT, MODEL, {"summary": "original"})
+    assert store.lookup_chunks([" ".join(original.split()[8:])], PROMPT, MODEL) == {}
+
+
+def test_disabled_store_never_hits(tmp_path):
+    store = ChunkSummaryStore(str(tmp_path / "chunks.sqlite3"), enabled=False)
+    store.put("map", "chunk", PROMPT, MODEL, {"summary": "x"})
+    assert store.get("map", "chunk", PROMPT, MODEL) is None
+    assert store.lookup_chunks(["chunk"], PROMPT, MODEL) == {}
@@ -0,0 +1,97 @@
+import pytest
+
+import chunking
+from chunking import Segment, _hard_split, chunk_segments, chunk_text, chunk_token_budget, iter_chunks
+from rate_limiter import estimate_tokens
+
+
+def words(n: int, prefix: str = "word") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def ten_tokens(sentence_end: bool = False) -> str:
+    return "a" * 35 + ("." if sentence_end else "a")
+
+
+def test_budget_is_context_minus_prompt_and_reserve(monkeypatch):
+    monkeypatch.delenv("CHUNK_TOKENS", raising=False)
+    prompt = "p" * 400
+    budget = chunk_token_budget("gemini-2.5-flash", prompt, tokens_per_minute=10**9)
+    assert budget == chunking.MODEL_CONTEXT_TOKENS["gemini-2.5-flash"] - estimate_tokens(prompt) \
+        - chunking.OUTPUT_RESERVE_TOKENS
+
+
+def test_budget_is_capped_by_quota_and_chunk_tokens(monkeypatch):
+    monkeypatch.delenv("CHUNK_TOKENS", raising=False)
+    prompt = "p" * 400
+    assert chunk_token_budget("gemini-2.5-flash", prompt, tokens_per_minute=50000) == 50000 - estimate_tokens(prompt)
+    monkeypatch.setenv("CHUNK_TOKENS", "3000")
+    assert chunk_token_budget("gemini-2.5-flash", prompt, tokens_per_minute=50000) == 3000
+    # A prompt larger than the whole quota still leaves a budget of one token
+    assert chunk_token_budget("gemini-2.5-flash", "p" * 8000, tokens_per_minute=100) == 1
+
+
+@pytest.mark.parametrize("text", [words(500), "x" * 2000])
+def test_hard_split_pieces_fit_and_keep_the_text(text):
+    pieces = _hard_split(text, 50)
+    assert len(pieces) > 1
+    assert all(piece and estimate_tokens(piece) <= 50 for piece in pieces)
+    assert "".join(pieces).replace(" ", "") == text.replace(" ", "")
+    if " " in text:
+        # Split at whitespace, never inside a word
+        assert " ".join(pieces) == text
+
+
+def test_chunks_fit_the_budget_and_keep_every_segment_in_order():
+    # The 90-word segments are larger than the budget and get hard-split
+    sizes = [3, 40, 7, 90, 1, 25] * 5
+    segments = [Segment(words(n, f"s{i}_") + ".", float(i) * 10, 5.0) for i, n in enumerate(sizes)]
+    chunks = chunk_segments(segments, 60)
+    assert all(chunk.tokens <= 60 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks) == " ".join(segment.text for segment in segments)
+    starts = [chunk.start for chunk in chunks]
+    assert starts == sorted(starts)
+    assert chunks[0].start == 0.0 and chunks[-1].end == segments[-1].start + 5.0
+
+
+def test_cut_prefers_the_last_sentence_end_when_half_full():
+    # The sentence ends after the fourth segment; the budget is 50
+    segments = [Segment(ten_tokens(i == 3)) for i in range(8)]
+    chunks = chunk_segments(segments, 50)
+    assert [chunk.tokens for chunk in chunks] == [40, 40]
+    assert chunks[0].text.endswith(".")
+
+
+def test_sentence_end_too_early_is_ignored():
+    # Cutting after the first segment would leave the chunk less than half full
+    segments = [Segment(ten_tokens(i == 0)) for i in range(8)]
+    assert [chunk.tokens for chunk in chunk_segments(segments, 50)] == [50, 30]
+
+
+def test_pause_between_snippets_is_a_break():
+    segments = [Segment(ten_tokens(), start=float(i) + (10.0 if i >= 3 else 0.0), duration=1.0) for i in range(8)]
+    chunks = chunk_segments(segments, 50)
+    assert [chunk.tokens for chunk in chunks] == [30, 50]
+    assert (chunks[0].start, chunks[0].end) == (0.0, 3.0)
+    assert chunks[1].start == 13.0
+
+
+def test_iter_chunks_reads_segments_lazily():
+    consumed = []
+
+    def segments():
+        for i in range(100):
+            consumed.append(i)
+            yield Segment(ten_tokens(True))
+
+    first = next(iter_chunks(segments(), 50))
+    assert first.tokens <= 50
+    assert len(consumed) < 10
+
+
+def test_empty_segments_and_text_without_timestamps():
+    assert chunk_segments([Segment("  "), Segment("")], 10) == []
+    chunks = chunk_text("One sentence here. Another one there! A third?", 1000)
+    assert len(chunks) == 1
+    assert chunks[0].text == "One sentence here. Another one there! A third?"
+    assert (chunks[0].start, chunks[0].end) == (None, None)
@@ -0,0 +1,37 @@
+import pytest
+
+import extractive
+from compact_transcript import CompactTranscript
+from rate_limiter import estimate_tokens
+
+
+def transcript():
+    sentences = [f"Topic {i % 5} sentence number {i} about subject {i % 3}." for i in range(60)]
+    return CompactTranscript.from_snippets(
+        [{"text": text, "start": float(i), "duration": 1.0} for i, text in enumerate(sentences)]
+    )
+
+
+@pytest.mark.parametrize("method", extractive.METHODS)
+def test_numpy_and_python_scoring_keep_the_same_sentences(method, monkeypatch):
+    if extractive.np is None:
+        pytest.skip("numpy is not installed")
+    with_numpy, _ = extractive.compress_transcript(transcript(), ratio=0.4, method=method)
+    monkeypatch.setattr(extractive, "np", None)
+    without_numpy, report = extractive.compress_transcript(transcript(), ratio=0.4, method=method)
+    assert report["backend"] == "python"
+    assert with_numpy.text == without_numpy.text
+
+
+def test_compression_keeps_order_and_respects_the_budget():
+    original = transcript()
+    compressed, report = extractive.compress_transcript(original, token_budget=200)
+    assert estimate_tokens(compressed.text) <= 200
+    assert report["kept_sentences"] < report["sentences"]
+    positions = [original.text.index(sentence) for sentence in compressed.text.split(". ") if sentence]
+    assert positions == sorted(positions)
+
+
+def test_compression_needs_a_target():
+    with pytest.raises(ValueError):
+        extractive.compress_transcript(transcript())
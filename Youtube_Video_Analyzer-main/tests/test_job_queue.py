@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobStore, run_job
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(os.path.join(tmp_path, "jobs.sqlite3"), stale_seconds=0.4)
+
+
+def test_stale_running_job_is_requeued_to_another_worker(store):
+    job_id = store.submit("https://www.youtube.com/watch?v=aaaaaaaaaaa")
+    assert store.claim_next("worker-a")["job_id"] == job_id
+    assert store.claim_next("worker-b") is None
+    time.sleep(0.5)
+    claimed = store.claim_next("worker-b")
+    assert claimed["job_id"] == job_id
+    assert claimed["worker"] == "worker-b"
+    assert store.heartbeat(job_id, "worker-a") == "lost"
+    assert store.heartbeat(job_id, "worker-b") == "running"
+
+
+def test_silent_job_keeps_its_heartbeat(store, monkeypatch):
+    def slow_summary(url, reporter, **kwargs):
+        # One long call with no progress events, longer than the stale timeout
+        time.sleep(1.2)
+        return {"title": "t", "overview": "o", "key_points": [], "conclusion": "c"}
+
+    monkeypatch.setattr(job_queue, "summarize_video", slow_summary)
+    job_id = store.submit("https://www.youtube.com/watch?v=bbbbbbbbbbb")
+    job = store.claim_next("worker-a")
+    runner = threading.Thread(target=run_job, args=(store, job))
+    runner.start()
+    stolen = []
+    while runner.is_alive():
+        stolen.append(store.claim_next("worker-b"))
+        time.sleep(0.1)
+    runner.join()
+    assert stolen and not any(stolen)
+    assert store.get(job_id)["status"] == "done"
+
+
+def test_cancellation_is_seen_without_progress_events(store, monkeypatch):
+    def streaming_summary(url, reporter, **kwargs):
+        for _ in range(100):
+            reporter.partial_summary({"title": "partial"})
+            time.sleep(0.05)
+        return {"title": "t", "overview": "o", "key_points": [], "conclusion": "c"}
+
+    monkeypatch.setattr(job_queue, "summarize_video", streaming_summary)
+    job_id = store.submit("https://www.youtube.com/watch?v=ccccccccccc")
+    job = store.claim_next("worker-a")
+    runner = threading.Thread(target=run_job, args=(store, job))
+    runner.start()
+    time.sleep(0.2)
+    store.cancel(job_id)
+    runner.join(timeout=3)
+    assert not runner.is_alive()
+    assert store.get(job_id)["status"] == "cancelled"
+
+
+def test_requeued_job_result_is_not_overwritten_by_the_old_worker(store, monkeypatch):
+    def slow_summary(url, reporter, **kwargs):
+        time.sleep(0.5)
+        return {"title": "old worker", "overview": "o", "key_points": [], "conclusion": "c"}
+
+    monkeypatch.setattr(job_queue, "summarize_video", slow_summary)
+    job_id = store.submit("https://www.youtube.com/watch?v=ddddddddddd")
+    job = store.claim_next("worker-a")
+    # The job was handed to another worker (as if worker-a had stopped responding)
+    store.update(job_id, worker="worker-b")
+    run_job(store, job)
+    current = store.get(job_id)
+    assert current["status"] == "running"
+    assert current["worker"] == "worker-b"
+    assert current["result"] is None
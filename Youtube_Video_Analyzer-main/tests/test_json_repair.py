@@ -0,0 +1,101 @@
+import json
+import threading
+
+import pytest
+
+from json_repair import coerce_summary, extract_json_object, loads_lenient, repair_json
+from pipeline import parse_json_response
+
+VALID = {"title": "T", "overview": "O", "key_points": ["A", "B"], "conclusion": "C"}
+
+
+def test_object_is_extracted_from_fences_and_prose():
+    text = "Here is the summary:\n```json\n" + json.dumps(VALID) + "\n```\nLet me know!"
+    assert json.loads(extract_json_object(text)) == VALID
+    assert json.loads(extract_json_object("Sure! " + json.dumps(VALID) + " Done.")) == VALID
+
+
+def test_braces_inside_strings_do_not_end_the_object():
+    text = '{"title": "Sets like {1, 2}", "overview": "a \\"quoted\\" }"} trailing'
+    assert json.loads(extract_json_object(text)) == {"title": "Sets like {1, 2}", "overview": 'a "quoted" }'}
+
+
+@pytest.mark.parametrize("broken, expected", [
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+    ('{"a": "line one\nline two\tend"}', {"a": "line one\nline two\tend"}),
+    # Literals and commas inside strings are text, not syntax
+    ('{"a": "True, None,]"}', {"a": "True, None,]"}),
+])
+def test_repair_json_fixes_syntax_slips(broken, expected):
+    assert json.loads(repair_json(broken)) == expected
+
+
+def test_coerce_summary_normalizes_key_points_and_text_fields():
+    data = coerce_summary({"title": ["Part", "one"], "overview": None, "conclusion": 3,
+                           "key_points": "- First\n2) Second\n\n• Third"})
+    assert data == {"title": "Part one", "overview": "", "conclusion": "3",
+                    "key_points": ["First", "Second", "Third"]}
+    points = coerce_summary({"key_points": [{"point": "Quota", "detail": "per minute"}, "", None, "Plain"]})
+    assert points["key_points"] == ["Quota — per minute", "Plain"]
+    assert coerce_summary({"key_points": {"1": "One", "2": "Two"}})["key_points"] == ["One", "Two"]
+
+
+def test_truncated_output_keeps_only_completed_fields():
+    data = loads_lenient('{"title": "Complete", "overview": "Also complete", "key_points": ["One", "Tw')
+    assert data["title"] == "Complete"
+    assert data["overview"] == "Also complete"
+    assert "conclusion" not in data
+
+
+@pytest.mark.parametrize("text", ["no json here", "[1, 2, 3]"])
+def test_unrecoverable_input_raises_value_error(text):
+    with pytest.raises(ValueError):
+        loads_lenient(text)
+
+
+def test_parse_json_response_repairs_by_default():
+    response = 'Summary:\n{"title": "T", "overview": "O", "key_points": "- A\n- B", "conclusion": "C",}'
+    assert parse_json_response(response) == VALID
+
+
+def test_parse_json_response_without_repair_is_strict():
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        parse_json_response('{"title": "T",}', repair=False)
+    assert parse_json_response("```json\n" + json.dumps(VALID) + "\n```", repair=False) == VALID
+
+
+def test_parse_json_response_still_requires_every_field():
+    with pytest.raises(ValueError, match="Missing required JSON fields: conclusion"):
+        parse_json_response('{"title": "T", "overview": "O", "key_points": []}')
+
+
+def parse_with_timeout(text: str, seconds: float = 5.0):
+    # A hang here would hold a pipeline thread, a job worker and an API slot forever
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(parse_json_response(text))
+        except ValueError as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), f"parse_json_response did not return for {text!r}"
+    return outcome[0]
+
+
+def test_array_closed_by_a_brace_keeps_its_completed_points():
+    summary = parse_with_timeout('{"title":"x","overview":"o","conclusion":"c","key_points":["a", 1}')
+    assert summary == {"title": "x", "overview": "o", "conclusion": "c", "key_points": ["a"]}
+
+
+@pytest.mark.parametrize("text", [
+    '{"title": "x", "key_points": ["a" }',
+    '{"title": "x", "overview": ], "key_points": [}',
+    '{"key_points": "a", "key_points": ["b"}',
+])
+def test_malformed_responses_fail_instead_of_hanging(text):
+    assert isinstance(parse_with_timeout(text), ValueError)
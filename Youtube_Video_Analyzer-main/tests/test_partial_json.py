@@ -0,0 +1,57 @@
+import json
+import threading
+
+import pytest
+
+from partial_json import StreamingSummaryParser, parse_partial_summary
+
+FULL = json.dumps({"title": "A \"quoted\" title", "overview": "Overview.", "key_points": ["One", "Two"],
+                   "score": {"nested": [1, 2]}, "conclusion": "Done."})
+
+
+def test_every_prefix_reports_only_completed_values():
+    final = json.loads(FULL)
+    for end in range(len(FULL) + 1):
+        partial = parse_partial_summary(FULL[:end])
+        for key, value in partial.items():
+            if isinstance(value, list):
+                assert value == final[key][:len(value)]
+            else:
+                assert value == final[key]
+    assert parse_partial_summary(FULL) == {key: value for key, value in final.items() if key != "score"}
+
+
+def test_fence_and_preamble_are_skipped():
+    assert parse_partial_summary('Sure:\n```json\n{"title": "T", "overview": "cut of') == {"title": "T"}
+    assert parse_partial_summary("no object yet") == {}
+
+
+def test_streaming_parser_reports_only_changes():
+    parser = StreamingSummaryParser()
+    updates = [parser.feed(piece) for piece in ['{"title": "T', 'itle", ', '"overview": "O', '"}']]
+    assert updates == [None, {"title": "Title"}, None, {"title": "Title", "overview": "O"}]
+    assert parser.text == '{"title": "Title", "overview": "O"}'
+
+
+def parse_with_timeout(text: str, seconds: float = 5.0) -> dict:
+    # A parser bug must fail the test, not hang the suite
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(parse_partial_summary(text)), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), f"parse_partial_summary did not return for {text!r}"
+    return result
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"title": "x", "key_points": ["a" }', {"title": "x", "key_points": ["a"]}),
+    ('{"title": "x", "key_points": [1}', {"title": "x", "key_points": []}),
+    ('{"title": "x", "overview": ]', {"title": "x"}),
+    ('{"title": "x", "overview": }, "conclusion": "c"}', {"title": "x"}),
+])
+def test_mismatched_closers_stop_the_parse(text, expected):
+    assert parse_with_timeout(text) == expected
+
+
+def test_repeated_key_replaces_the_earlier_value():
+    assert parse_with_timeout('{"key_points": "text", "key_points": ["a", "b"]}') == {"key_points": ["a", "b"]}
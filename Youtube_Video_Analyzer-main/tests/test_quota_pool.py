@@ -0,0 +1,108 @@
+import pytest
+
+import pipeline
+from llm_backends import RateLimitError
+from quota_pool import COOLDOWN_BASE_SECONDS, COOLDOWN_MAX_SECONDS, Endpoint, QuotaPool
+
+BEST, CHEAP = "gemini-2.5-flash", "gemini-2.5-flash-lite"
+
+
+def endpoint(label: str, model: str = BEST, rank: int = 0, rpm: float = 1000) -> Endpoint:
+    return Endpoint(label, f"secret-{label}", model, rank, requests_per_minute=rpm, tokens_per_minute=10**7)
+
+
+def test_from_env_builds_one_endpoint_per_key_and_model(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEYS", "k1, k2")
+    monkeypatch.setenv("GEMINI_MODELS", f"{BEST},{CHEAP}")
+    pool = QuotaPool.from_env(BEST)
+    assert [(e.label, e.api_key, e.rank) for e in pool.endpoints] == [
+        (f"key1/{BEST}", "k1", 0), (f"key2/{BEST}", "k2", 0), (f"key1/{CHEAP}", "k1", 1), (f"key2/{CHEAP}", "k2", 1),
+    ]
+    assert pool.models == [BEST, CHEAP]
+    assert all("k1" not in row["endpoint"] for row in pool.stats() if row["endpoint"].startswith("key2"))
+
+
+def test_from_env_falls_back_to_the_single_key_and_default_model(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEYS", raising=False)
+    monkeypatch.delenv("GEMINI_MODELS", raising=False)
+    monkeypatch.setenv("GOOGLE_API_KEY", "only-key")
+    pool = QuotaPool.from_env(BEST)
+    assert [(e.api_key, e.model_name) for e in pool.endpoints] == [("only-key", BEST)]
+
+
+def test_batch_prefers_cheap_models_and_final_uses_only_the_best():
+    pool = QuotaPool([endpoint("best"), endpoint("cheap", CHEAP, 1)])
+    assert [e.label for e in pool.candidates("batch")] == ["cheap", "best"]
+    assert [e.label for e in pool.candidates("final")] == ["best"]
+    with pytest.raises(ValueError):
+        pool.candidates("other")
+
+
+def test_batch_spills_over_to_the_best_model_when_the_cheap_one_is_out_of_quota():
+    pool = QuotaPool([endpoint("best"), endpoint("cheap", CHEAP, 1, rpm=1)])
+    assert pool.acquire(100, "batch").label == "cheap"
+    assert pool.acquire(100, "batch").label == "best"
+    assert {row["endpoint"]: row["calls"] for row in pool.stats()} == {"best": 1, "cheap": 1}
+
+
+def test_cooldown_doubles_per_consecutive_429_and_resets_on_success():
+    pool = QuotaPool([endpoint("a")])
+    a = pool.endpoints[0]
+    cooldowns = [pool.report_rate_limited(a) for _ in range(7)]
+    assert cooldowns[:3] == [COOLDOWN_BASE_SECONDS, COOLDOWN_BASE_SECONDS * 2, COOLDOWN_BASE_SECONDS * 4]
+    assert cooldowns[-1] == COOLDOWN_MAX_SECONDS
+    assert a.rate_limited == 7 and a.limiter.blocked_for() > 0
+    pool.report_success(a)
+    assert pool.report_rate_limited(a) == COOLDOWN_BASE_SECONDS
+    assert pool.report_rate_limited(a, retry_after=2.5) == 2.5
+
+
+def test_cooling_endpoint_is_skipped():
+    pool = QuotaPool([endpoint("a"), endpoint("b")])
+    first = pool.acquire(100, "final")
+    pool.report_rate_limited(first)
+    assert pool.acquire(100, "final") is not first
+    assert next(row for row in pool.stats() if row["endpoint"] == first.label)["cooldown_seconds"] > 0
+
+
+class ScriptedBackend:
+    requires_api_key = True
+
+    def __init__(self, api_key: str, rate_limited: bool, calls: list):
+        self.api_key, self.rate_limited, self.calls = api_key, rate_limited, calls
+
+    def generate(self, prompt_text, stream=False, on_chunk=None, response_schema=None):
+        self.calls.append(self.api_key)
+        if self.rate_limited:
+            raise RateLimitError("429 quota exceeded", retry_after=0.01)
+        return '{"title": "ok"}'
+
+
+def use_pool(monkeypatch, pool: QuotaPool, limited_keys: set) -> list:
+    calls = []
+    backends = {e.api_key: ScriptedBackend(e.api_key, e.api_key in limited_keys, calls) for e in pool.endpoints}
+    monkeypatch.setattr(pipeline, "get_quota_pool", lambda model_name: pool)
+    monkeypatch.setattr(pipeline, "get_backend",
+                        lambda model_name, api_key=None: backends.get(api_key, ScriptedBackend(None, False, calls)))
+    return calls
+
+
+def test_429_is_retried_on_another_key(monkeypatch):
+    pool = QuotaPool([endpoint("a"), endpoint("b")])
+    # Whichever key is tried first answers 429
+    first = pool.candidates("final")[0]
+    calls = use_pool(monkeypatch, pool, {first.api_key})
+    assert pipeline.generate_gemini_content("transcript", "prompt", role="final") == '{"title": "ok"}'
+    assert calls[0] == first.api_key and calls[1] != first.api_key
+    stats = {row["endpoint"]: row for row in pool.stats()}
+    assert stats[first.label]["rate_limited"] == 1
+
+
+def test_every_key_rate_limited_returns_a_quota_message(monkeypatch):
+    pool = QuotaPool([endpoint("a"), endpoint("b")])
+    calls = use_pool(monkeypatch, pool, {"secret-a", "secret-b"})
+    response = pipeline.generate_gemini_content("transcript", "prompt", role="final")
+    assert response.startswith("⚠️ Quota exceeded after 4 retries")
+    assert len(calls) == 4
+    with pytest.raises(ValueError):
+        pipeline.parse_json_response(response)
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight, fcntl, flight_key
+
+
+def test_flight_key_separates_prompts_and_models():
+    key = flight_key("vid", "prompt", "gemini-2.5-flash")
+    assert key == flight_key("vid", "prompt", "gemini-2.5-flash")
+    assert key != flight_key("vid", "other prompt", "gemini-2.5-flash")
+    assert key != flight_key("vid", "prompt", "gemini-2.5-flash-lite")
+
+
+def wait_for_waiters(flight: SingleFlight, count: int) -> None:
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    gate, release = threading.Event(), threading.Event()
+    executions, results = [], []
+
+    def fn():
+        executions.append(1)
+        gate.set()
+        release.wait(5)
+        return "summary"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", fn)))
+    leader.start()
+    gate.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    wait_for_waiters(flight, 4)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert executions == [1]
+    assert sorted(results, key=lambda r: r[1]) == [("summary", False)] + [("summary", True)] * 4
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "cross_process_waits": 0, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_the_key_is_freed():
+    flight = SingleFlight()
+    gate, release = threading.Event(), threading.Event()
+    errors = []
+
+    def fn():
+        gate.set()
+        release.wait(5)
+        raise ValueError("quota exhausted")
+
+    def call():
+        try:
+            flight.do("key", fn)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    gate.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    wait_for_waiters(flight, 1)
+    release.set()
+    for thread in (leader, follower):
+        thread.join(5)
+
+    assert len(errors) == 2
+    assert flight.do("key", lambda: "retried") == ("retried", False)
+
+
+def test_counted_events_reach_the_callback():
+    events = []
+    flight = SingleFlight(on_count=events.append)
+    gate, release = threading.Event(), threading.Event()
+
+    def fn():
+        gate.set()
+        release.wait(5)
+        return "summary"
+
+    leader = threading.Thread(target=flight.do, args=("key", fn))
+    leader.start()
+    gate.wait(5)
+    follower = threading.Thread(target=flight.do, args=("key", fn))
+    follower.start()
+    wait_for_waiters(flight, 1)
+    release.set()
+    for thread in (leader, follower):
+        thread.join(5)
+    assert sorted(events) == ["coalesced", "executions"]
+
+
+def test_pipeline_publishes_single_flight_counters():
+    import pipeline
+    import tracing
+
+    before = tracing.metrics_store.counters().get("single_flight_executions", 0)
+    pipeline.in_flight.do("test-key", lambda: None)
+    assert tracing.metrics_store.counters()["single_flight_executions"] == before + 1
+
+
+@pytest.mark.skipif(fcntl is None, reason="file locks need fcntl")
+def test_cross_process_lock_files(tmp_path):
+    flight = SingleFlight(str(tmp_path / "locks"))
+    assert flight.do("key", lambda: 42) == (42, False)
+    assert (tmp_path / "locks" / "key.lock").exists()
@@ -0,0 +1,119 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+import pipeline
+import summary_cache
+from summary_cache import SummaryCache
+
+SUMMARY = {"title": "T", "overview": "O", "key_points": ["A"], "conclusion": "C"}
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(summary_cache, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def make_cache(tmp_path, **kwargs) -> SummaryCache:
+    return SummaryCache(str(tmp_path / "summaries.sqlite3"), **kwargs)
+
+
+def test_key_changes_with_transcript_prompt_and_model():
+    key = SummaryCache.make_key("vid", "transcript", "prompt", "gemini-2.5-flash")
+    assert key == SummaryCache.make_key("vid", "transcript", "prompt", "gemini-2.5-flash")
+    assert key != SummaryCache.make_key("vid2", "transcript", "prompt", "gemini-2.5-flash")
+    assert key != SummaryCache.make_key("vid", "transcript, edited", "prompt", "gemini-2.5-flash")
+    assert key != SummaryCache.make_key("vid", "transcript", "new prompt", "gemini-2.5-flash")
+    assert key != SummaryCache.make_key("vid", "transcript", "prompt", "gemini-2.5-flash-lite")
+
+
+def test_streamed_digest_gives_the_same_key_as_the_text():
+    digest = hashlib.sha256("transcript".encode("utf-8")).hexdigest()
+    assert SummaryCache.make_key("vid", None, "prompt", "m", transcript_digest=digest) == \
+        SummaryCache.make_key("vid", "transcript", "prompt", "m")
+
+
+def test_put_get_and_hit_counters(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    assert cache.get("missing") is None
+    cache.put("key", "vid", "gemini-2.5-flash", SUMMARY, {"num_chunks": 3})
+    assert cache.get("key") == {"summary": SUMMARY, "metadata": {"num_chunks": 3}}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_expired_entry_is_a_miss_and_is_removed(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.put("key", "vid", "m", SUMMARY, {})
+    clock.now += 59
+    assert cache.get("key") is not None
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("a", "vid-a", "m", SUMMARY, {})
+    clock.now += 1
+    cache.put("b", "vid-b", "m", SUMMARY, {})
+    clock.now += 1
+    cache.get("a")  # "b" is now the least recently used
+    clock.now += 1
+    cache.put("c", "vid-c", "m", SUMMARY, {})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_until_the_cache_fits(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=1000)
+    for i in range(5):
+        cache.put(f"k{i}", "vid", "m", {**SUMMARY, "overview": "x" * 300}, {})
+        clock.now += 1
+    stats = cache.stats()
+    assert stats["size_bytes"] <= 1000
+    assert stats["entries"] == 2
+    assert cache.get("k4") is not None and cache.get("k0") is None
+
+
+def test_cache_is_shared_between_instances(tmp_path, clock):
+    make_cache(tmp_path).put("key", "vid", "m", SUMMARY, {})
+    assert make_cache(tmp_path).get("key")["summary"] == SUMMARY
+
+
+def test_pipeline_serves_a_repeated_video_from_the_cache(monkeypatch):
+    video_id = "cacheTest01"
+    snippets = [{"text": f"Sentence number {i} about caching summaries.", "start": float(i), "duration": 1.0}
+                for i in range(200)]
+    pipeline.transcript_store.save(video_id, "en", False, snippets)
+    calls = []
+    generate = pipeline.generate_gemini_content
+    monkeypatch.setattr(pipeline, "generate_gemini_content",
+                        lambda *args, **kwargs: calls.append(1) or generate(*args, **kwargs))
+
+    first = pipeline.PipelineReporter()
+    summary = pipeline.summarize_video(video_id, first)
+    assert summary is not None and calls
+    assert first.metadata["cache_hit"] is False
+
+    calls.clear()
+    second = pipeline.PipelineReporter()
+    assert pipeline.summarize_video(video_id, second) == summary
+    assert calls == []
+    assert second.metadata["cache_hit"] is True
+
+    # Bypassing the cache runs the pipeline again
+    assert pipeline.summarize_video(video_id, pipeline.PipelineReporter(), use_cache=False) is not None
+    assert calls
@@ -0,0 +1,117 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+import summary_library
+from summary_library import SummaryLibrary, fts_query
+
+
+def summary(title: str, overview: str = "An overview.", timestamps=None) -> dict:
+    return {"title": title, "overview": overview, "key_points": ["First point.", "Second point."],
+            "conclusion": "The end.", "key_point_timestamps": timestamps if timestamps is not None else [1.5, 30.0]}
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = SummaryLibrary(str(tmp_path / "library.sqlite3"))
+    library.put("vid1", summary("Rate limits explained", "How quota and rate limits work."), "gemini-2.5-flash",
+                {"transcript_chars": 12000, "chunk_time_spans": [[0.0, 600.0]]})
+    library.put("vid2", summary("Baking sourdough", "Starter, flour and water."), "gemini-2.5-flash")
+    library.put("vid3", summary("Python generators", "Lazy iteration in Python."), "gemini-2.5-flash")
+    return library
+
+
+def test_put_and_get(library):
+    entry = library.get("vid1")
+    assert entry["summary"]["title"] == "Rate limits explained"
+    assert entry["transcript_chars"] == 12000
+    assert entry["duration_seconds"] == 600.0
+    assert library.get("missing") is None
+
+
+def test_search_ranks_title_matches_and_highlights(library):
+    results = library.search("limits")
+    assert [r["video_id"] for r in results] == ["vid1"]
+    assert "**" in results[0]["snippet"]
+    assert [r["video_id"] for r in library.search("title:python")] == ["vid3"]
+    assert {r["video_id"] for r in library.search("sourdough OR generators")} == {"vid2", "vid3"}
+
+
+def test_invalid_fts_syntax_is_searched_as_plain_words(library):
+    assert [r["video_id"] for r in library.search('rate "limit')] == ["vid1"]
+    assert library.count('rate "limit') == 1
+    assert library.search("((") == []
+
+
+def test_fts_query_quotes_words_and_prefixes_the_last():
+    assert fts_query('rate "limit') == '"rate" "limit"*'
+    assert fts_query("!!") == ""
+
+
+def test_count_recent_and_delete(library):
+    assert library.count() == 3
+    assert len(library.recent()) == 3
+    assert library.delete("vid2")
+    assert not library.delete("vid2")
+    assert library.count() == 2
+    assert library.search("sourdough") == []
+
+
+def test_jsonl_export(library, tmp_path):
+    path = tmp_path / "library.jsonl"
+    assert library.export(str(path), "jsonl") == 3
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [row["video_id"] for row in rows] == ["vid1", "vid2", "vid3"]
+    assert rows[0]["summary"]["title"] == "Rate limits explained"
+
+    buffer = io.BytesIO()
+    assert library.export(buffer, "jsonl", query="python") == 1
+
+
+def test_unknown_format_is_rejected(library):
+    with pytest.raises(ValueError):
+        library.export(io.BytesIO(), "csv")
+
+
+def test_parquet_export_nulls_values_that_do_not_fit(library, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    library.put("vid4", summary("Odd timestamps", timestamps=["1:23", None, True, 42, float("nan")]),
+                "gemini-2.5-flash")
+    library.put("vid5", summary("No timestamp list", timestamps="soon"), "gemini-2.5-flash")
+    with sqlite3.connect(library.path) as conn:
+        conn.execute("UPDATE library SET created_at = 1700000000.75, updated_at = 'yesterday' WHERE video_id = 'vid5'")
+
+    path = tmp_path / "library.parquet"
+    assert library.export(str(path), "parquet") == 5
+    rows = {row["video_id"]: row for row in pq.read_table(str(path)).to_pylist()}
+    assert rows["vid1"]["key_point_timestamps"] == [1.5, 30.0]
+    assert rows["vid1"]["key_points"] == ["First point.", "Second point."]
+    assert rows["vid4"]["key_point_timestamps"] == [None, None, None, 42.0, None]
+    assert rows["vid5"]["key_point_timestamps"] == []
+    assert rows["vid5"]["created_at"].timestamp() == 1700000000
+    assert rows["vid5"]["updated_at"] is None
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "parquet"])
+def test_failed_export_leaves_no_file(library, tmp_path, monkeypatch, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+
+    def failing_records(query="", batch_rows=summary_library.EXPORT_BATCH_ROWS):
+        yield next(SummaryLibrary.iter_records(library, query, batch_rows))
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(library, "iter_records", failing_records)
+    path = tmp_path / f"library.{fmt}"
+    with pytest.raises(sqlite3.OperationalError):
+        library.export(str(path), fmt)
+    assert not path.exists()
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".export-")]
+
+    # An existing export is left as it was
+    path.write_bytes(b"previous export")
+    with pytest.raises(sqlite3.OperationalError):
+        library.export(str(path), fmt)
+    assert path.read_bytes() == b"previous export"
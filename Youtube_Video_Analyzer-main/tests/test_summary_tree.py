@@ -0,0 +1,100 @@
+import pytest
+
+from rate_limiter import estimate_tokens
+from summary_tree import SUMMARY_TOKENS, describe_plan, plan_summary_tree, run_summary_tree
+
+MAP_PROMPT = "Summarize this part of the transcript."
+REDUCE_PROMPT = "Merge these summaries."
+
+
+def calls(plan: dict) -> list:
+    return [level["calls"] for level in plan["levels"]]
+
+
+def test_single_chunk_is_one_call():
+    plan = plan_summary_tree([5000], MAP_PROMPT, REDUCE_PROMPT)
+    assert calls(plan) == [1]
+    assert plan["depth"] == 0 and plan["within_budget"]
+
+
+def test_tree_fits_the_call_budget():
+    plan = plan_summary_tree([1000] * 6, MAP_PROMPT, REDUCE_PROMPT, call_budget=8)
+    assert calls(plan) == [6, 1]
+    assert plan["total_calls"] == 7 and plan["within_budget"] and plan["reason"] is None
+
+
+def test_fan_in_is_widened_until_the_budget_is_met():
+    plan = plan_summary_tree([1000] * 6, MAP_PROMPT, REDUCE_PROMPT, fan_in=2, call_budget=8)
+    # Fan-in 2 would need 6 + 3 + 2 + 1 calls
+    assert plan["fan_in"] == 6
+    assert calls(plan) == [6, 1]
+
+
+def test_fan_in_is_raised_to_respect_max_depth():
+    plan = plan_summary_tree([1000] * 100, MAP_PROMPT, REDUCE_PROMPT, fan_in=2, max_depth=2, call_budget=1000)
+    assert plan["fan_in"] == 10
+    assert plan["depth"] == 2
+    assert calls(plan) == [100, 10, 1]
+
+
+def test_over_call_budget_is_rejected_with_a_reason():
+    plan = plan_summary_tree([1000] * 30, MAP_PROMPT, REDUCE_PROMPT, call_budget=8)
+    assert not plan["within_budget"]
+    assert plan["total_calls"] == 31
+    assert plan["reason"] == "needs 31 API calls (30 chunks + 1 reduce calls), but the budget is 8"
+
+
+def test_token_estimate_and_token_budget():
+    chunk_tokens = [1000, 2000, 3000]
+    plan = plan_summary_tree(chunk_tokens, MAP_PROMPT, REDUCE_PROMPT, call_budget=8)
+    expected = sum(chunk_tokens) + 3 * estimate_tokens(MAP_PROMPT) + 3 * SUMMARY_TOKENS + estimate_tokens(REDUCE_PROMPT)
+    assert plan["estimated_tokens"] == expected
+
+    limited = plan_summary_tree(chunk_tokens, MAP_PROMPT, REDUCE_PROMPT, call_budget=8, token_budget=expected - 1)
+    assert not limited["within_budget"]
+    assert limited["reason"] == f"needs ~{expected:,} input tokens, but the budget is {expected - 1:,}"
+
+
+def test_reused_chunks_only_count_the_path_of_the_new_tail():
+    plan = plan_summary_tree([1000] * 30, MAP_PROMPT, REDUCE_PROMPT, fan_in=10, call_budget=100, reused_chunks=29)
+    assert calls(plan) == [1, 1, 1]
+    assert plan["reused_calls"] == 31
+
+
+def test_shared_chunks_skip_map_calls_but_not_reduce_calls():
+    plan = plan_summary_tree([1000] * 20, MAP_PROMPT, REDUCE_PROMPT, fan_in=10, call_budget=100,
+                             shared_chunks=range(5))
+    assert calls(plan) == [15, 2, 1]
+    assert plan["levels"][0]["input_tokens"] == 15 * (1000 + estimate_tokens(MAP_PROMPT))
+
+
+def test_describe_plan():
+    plan = plan_summary_tree([1000] * 6, MAP_PROMPT, REDUCE_PROMPT, call_budget=8)
+    text = describe_plan(plan)
+    assert text.startswith("Plan: 6 map → 1 reduce — 7 API calls, ~")
+    assert f"~{plan['estimated_seconds']}s" in text
+
+
+def test_run_follows_the_planned_groups():
+    plan = plan_summary_tree([10] * 12, MAP_PROMPT, REDUCE_PROMPT, fan_in=4, max_depth=3, call_budget=100)
+    reduce_sizes = []
+
+    def reduce_fn(group, is_root):
+        reduce_sizes.append(len(group))
+        return {"parts": sum(summary["parts"] for summary in group), "root": is_root}
+
+    root = run_summary_tree([f"chunk {i}" for i in range(12)], plan, lambda chunk, is_root: {"parts": 1}, reduce_fn)
+    assert root == {"parts": 12, "root": True}
+    assert sorted(reduce_sizes) == [3, 4, 4, 4]
+
+
+def test_failed_call_fails_the_run():
+    plan = plan_summary_tree([10] * 3, MAP_PROMPT, REDUCE_PROMPT)
+
+    def map_fn(chunk, is_root):
+        if chunk == "bad":
+            raise ValueError("invalid summary")
+        return {}
+
+    with pytest.raises(ValueError):
+        run_summary_tree(["good", "bad", "good"], plan, map_fn, lambda group, is_root: {})
@@ -0,0 +1,77 @@
+import socket
+import threading
+
+import pytest
+
+import tracing
+from tracing import Trace
+
+
+def test_snapshot_filters_by_name_and_is_a_copy():
+    trace = Trace()
+    with trace.span("map", input_tokens=10):
+        pass
+    with trace.span("reduce", input_tokens=3):
+        pass
+    with trace.span("map", input_tokens=5) as attributes:
+        attributes["output_tokens"] = 2
+    spans = trace.snapshot("map")
+    assert [span["attributes"]["input_tokens"] for span in spans] == [10, 5]
+    spans.clear()
+    assert len(trace.snapshot()) == 3
+    assert trace.last_attributes("map") == {"input_tokens": 5, "output_tokens": 2}
+    assert trace.last_attributes("missing") is None
+
+
+def test_failed_span_is_recorded_with_its_error():
+    trace = Trace()
+    with pytest.raises(ValueError):
+        with trace.span("parse"):
+            raise ValueError("bad")
+    assert trace.snapshot()[0]["error"] == "ValueError"
+    assert trace.summary()["parse"]["errors"] == 1
+
+
+def test_snapshot_while_spans_are_added_from_threads():
+    trace = Trace()
+
+    def work():
+        for _ in range(200):
+            with trace.span("gemini.attempt", model="m", input_tokens=1):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        trace.snapshot("gemini.attempt")
+    for thread in threads:
+        thread.join()
+    assert trace.summary()["gemini.attempt"]["count"] == 800
+
+
+def test_metrics_server_binds_localhost_by_default(monkeypatch):
+    monkeypatch.delenv("METRICS_HOST", raising=False)
+    monkeypatch.setattr(tracing, "_server", None)
+    monkeypatch.setattr(tracing, "_server_started", False)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = tracing.start_metrics_server(port)
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_counters_are_shared_through_the_store_and_rendered(tmp_path):
+    path = str(tmp_path / "metrics.sqlite3")
+    tracing.MetricsStore(path).increment("single_flight_executions")
+    other_process = tracing.MetricsStore(path)
+    other_process.increment("single_flight_executions", 2)
+    other_process.increment("single_flight_coalesced")
+    assert tracing.MetricsStore(path).counters() == {"single_flight_coalesced": 1, "single_flight_executions": 3}
+    text = other_process.render_prometheus()
+    assert "# TYPE yt_summarizer_single_flight_executions_total counter" in text
+    assert "yt_summarizer_single_flight_executions_total 3" in text
@@ -0,0 +1,89 @@
+import hashlib
+import io
+import json
+import random
+
+import pytest
+
+import pipeline
+from chunking import chunk_segments
+from rate_limiter import estimate_tokens
+from transcript_store import iter_json_array
+
+VIDEO_ID = "streamTst01"
+# Topics that occur once each, far into the video
+MARKERS = {2500: "photosynthesis needs chlorophyll", 4800: "volcanic magma chambers erupt"}
+VOCABULARY = ("the model trains on café data while the 日本 team reviews gradient noise "
+              "budget latency cache quota [Music] um so basically").split()
+
+
+def long_track(count: int = 6000, seed: int = 7) -> list:
+    """Auto-caption style snippets: rolling repeats, sentence ends, pauses and non-ASCII text."""
+    rng = random.Random(seed)
+    snippets, start, previous = [], 0.0, []
+    for i in range(count):
+        words = previous[-rng.randint(0, 3):] if previous and rng.random() < 0.3 else []
+        words += rng.choices(VOCABULARY, k=rng.randint(3, 12))
+        text = " ".join(words) + ("." if rng.random() < 0.2 else "")
+        if i in MARKERS:
+            text = f"{text} {MARKERS[i]}"
+        duration = round(rng.uniform(0.5, 4.0), 3)
+        snippets.append({"text": text, "start": round(start, 3), "duration": duration})
+        previous = words
+        # Occasional long pauses give the chunker natural break points
+        start += duration + (rng.uniform(2.0, 5.0) if rng.random() < 0.05 else 0.0)
+    return snippets
+
+
+@pytest.fixture(params=[True, False], ids=["auto_generated", "manual"])
+def both_paths(request):
+    pipeline.transcript_store.save(VIDEO_ID, "en", request.param, long_track())
+    compact = pipeline.extract_transcript(VIDEO_ID)
+    streamed = pipeline.open_transcript_stream(VIDEO_ID)
+    yield compact, streamed
+    streamed.close()
+
+
+def test_iter_json_array_matches_json_loads_at_any_block_size():
+    data = json.dumps(long_track(500), ensure_ascii=False).encode("utf-8")
+    # Small odd block sizes split objects and multi-byte characters across reads
+    for block_size in (1, 7, 64, 4096, len(data) + 1):
+        assert list(iter_json_array(io.BytesIO(data).read, block_size)) == json.loads(data)
+
+
+def test_streamed_measure_matches_the_in_memory_text(both_paths):
+    compact, streamed = both_paths
+    assert streamed.digest == hashlib.sha256(compact.text.encode("utf-8")).hexdigest()
+    assert streamed.chars == len(compact.text)
+    assert streamed.nbytes == len(compact.text.encode("utf-8"))
+    assert streamed.tokens == estimate_tokens(compact.text)
+    assert streamed.snippets == len(compact)
+
+
+@pytest.mark.parametrize("chunk_tokens", [300, 2000])
+def test_streamed_chunks_match_the_in_memory_chunks(both_paths, chunk_tokens):
+    compact, streamed = both_paths
+    expected = chunk_segments(compact.segments(), chunk_tokens)
+    assert len(expected) > 3
+    assert list(streamed.chunks(chunk_tokens)) == expected
+    sizes, spans = streamed.layout(chunk_tokens)
+    assert sizes == [chunk.tokens for chunk in expected]
+    assert spans == [[chunk.start, chunk.end] for chunk in expected]
+
+
+def test_streamed_locate_matches_the_in_memory_timestamps(both_paths):
+    compact, streamed = both_paths
+    phrases = ["How photosynthesis uses chlorophyll", "Magma chambers and volcanic eruptions",
+               "gradient noise in the café data", "unrelated words"]
+    located = compact.locate(phrases)
+    for phrase_start, marker in zip(located, ("photosynthesis", "volcanic")):
+        marker_start = compact.time_at_char(compact.text.index(marker))
+        assert phrase_start <= marker_start < phrase_start + 30
+    assert located[3] is None
+    assert streamed.locate(phrases) == located
+    assert streamed.locate(phrases, window_seconds=120) == compact.locate(phrases, window_seconds=120)
+
+
+def test_short_tracks_are_not_streamed():
+    pipeline.transcript_store.save(VIDEO_ID, "en", False, long_track(10))
+    assert pipeline.open_transcript_stream(VIDEO_ID, min_chars=10**6) is None
@@ -0,0 +1,361 @@
+"""
+Per-stage tracing of pipeline runs and a Prometheus-style metrics endpoint.
+
+Every run carries a Trace (on its PipelineReporter). Stages record spans with
+their duration plus token and byte counts; at the end of a run the spans are
+
+- summarized per stage (count, total time, p50/p95/p99) into processing_metadata,
+- added to a histogram store shared by every process using the same CACHE_DIR
+  (which also keeps event counters such as single-flight outcomes),
+- optionally appended to a JSONL trace file (TRACE_FILE).
+
+The histogram store is served as Prometheus text format on METRICS_PORT, or
+standalone with:
+
+    python tracing.py --port 9464
+
+The endpoint listens on 127.0.0.1 only; set METRICS_HOST=0.0.0.0 (or --host)
+to let other machines scrape it.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "./cache"
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_METRICS_HOST = "127.0.0.1"
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float("inf"))
+COUNTED_ATTRIBUTES = ("input_tokens", "output_tokens", "input_bytes", "output_bytes")
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Trace:
+    """
+    Spans recorded during one pipeline run. Safe to use from worker threads.
+    """
+
+    def __init__(self, trace_id: str = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time a block of work.
+
+        Yields the span's attribute dict, so counts known only at the end
+        (output tokens, bytes) can be added inside the block.
+        """
+        record = {"trace_id": self.trace_id, "name": name, "start": time.time(), "attributes": attributes}
+        started = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - started
+            with self._lock:
+                self.spans.append(record)
+
+    def snapshot(self, name: str = None) -> list:
+        """
+        Spans recorded so far, in order, safe to read while other threads add more.
+
+        Args:
+            name: Only return spans with this name
+
+        Returns:
+            list[dict]: Finished span records (trace_id, name, start, seconds, attributes, error)
+        """
+        with self._lock:
+            return [span for span in self.spans if name is None or span["name"] == name]
+
+    def last_attributes(self, name: str):
+        """Attributes of the most recent span with this name, or None."""
+        spans = self.snapshot(name)
+        return dict(spans[-1]["attributes"]) if spans else None
+
+    def summary(self) -> dict:
+        """
+        Per-stage aggregates of the spans recorded so far.
+
+        Returns:
+            dict: stage -> {count, errors, total_seconds, p50, p95, p99, input_tokens, ...}
+        """
+        spans = self.snapshot()
+        by_stage = {}
+        for span in spans:
+            by_stage.setdefault(span["name"], []).append(span)
+        stages = {}
+        for name, group in by_stage.items():
+            durations = [span["seconds"] for span in group]
+            stage = {
+                "count": len(group),
+                "errors": sum(1 for span in group if "error" in span),
+                "total_seconds": round(sum(durations), 3),
+                "p50": round(percentile(durations, 50), 3),
+                "p95": round(percentile(durations, 95), 3),
+                "p99": round(percentile(durations, 99), 3),
+            }
+            for attribute in COUNTED_ATTRIBUTES:
+                stage[attribute] = sum(span["attributes"].get(attribute, 0) for span in group)
+            stages[name] = stage
+        return stages
+
+
+class MetricsStore:
+    """
+    Span histograms and counters in SQLite, so every worker process feeds one
+    metrics endpoint.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS span_buckets (
+                    stage TEXT NOT NULL,
+                    le REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (stage, le)
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS span_totals (
+                    stage TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    errors INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    input_tokens INTEGER NOT NULL,
+                    output_tokens INTEGER NOT NULL,
+                    input_bytes INTEGER NOT NULL,
+                    output_bytes INTEGER NOT NULL
+                )"""
+            )
+
+    @classmethod
+    def from_env(cls) -> "MetricsStore":
+        """CACHE_DIR - directory holding metrics.sqlite3 (default ./cache)"""
+        return cls(os.path.join(os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR), "metrics.sqlite3"))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    def record(self, spans: list) -> None:
+        """Add finished spans to the histograms in one transaction."""
+        if not spans:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for span in spans:
+                    le = next(bound for bound in BUCKETS if span["seconds"] <= bound)
+                    # SQLite has no infinity literal; the last bucket is stored as -1
+                    conn.execute(
+                        "INSERT INTO span_buckets (stage, le, count) VALUES (?, ?, 1) "
+                        "ON CONFLICT(stage, le) DO UPDATE SET count = count + 1",
+                        (span["name"], le if le != float("inf") else -1),
+                    )
+                    attributes = span["attributes"]
+                    conn.execute(
+                        """INSERT INTO span_totals VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+                           ON CONFLICT(stage) DO UPDATE SET
+                               count = count + 1, errors = errors + excluded.errors,
+                               seconds = seconds + excluded.seconds,
+                               input_tokens = input_tokens + excluded.input_tokens,
+                               output_tokens = output_tokens + excluded.output_tokens,
+                               input_bytes = input_bytes + excluded.input_bytes,
+                               output_bytes = output_bytes + excluded.output_bytes""",
+                        (span["name"], int("error" in span), span["seconds"],
+                         *(int(attributes.get(name, 0)) for name in COUNTED_ATTRIBUTES)),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add to a named event counter (served as yt_summarizer_<name>_total)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount),
+            )
+
+    def counters(self) -> dict:
+        """Current value of every event counter."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT name, value FROM counters ORDER BY name").fetchall())
+
+    def render_prometheus(self) -> str:
+        """All metrics in Prometheus text exposition format."""
+        with self._connect() as conn:
+            buckets = conn.execute("SELECT stage, le, count FROM span_buckets").fetchall()
+            totals = conn.execute("SELECT * FROM span_totals ORDER BY stage").fetchall()
+            events = conn.execute("SELECT name, value FROM counters ORDER BY name").fetchall()
+
+        per_stage = {}
+        for stage, le, count in buckets:
+            per_stage.setdefault(stage, {})[float("inf") if le == -1 else le] = count
+
+        lines = [
+            "# HELP yt_summarizer_span_seconds Duration of pipeline stages.",
+            "# TYPE yt_summarizer_span_seconds histogram",
+        ]
+        for stage, count, _, seconds, *_ in totals:
+            cumulative = 0
+            for bound in BUCKETS:
+                cumulative += per_stage.get(stage, {}).get(bound, 0)
+                label = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'yt_summarizer_span_seconds_bucket{{stage="{stage}",le="{label}"}} {cumulative}')
+            lines.append(f'yt_summarizer_span_seconds_sum{{stage="{stage}"}} {seconds:.6f}')
+            lines.append(f'yt_summarizer_span_seconds_count{{stage="{stage}"}} {count}')
+
+        counters = [("errors", 2, "Spans that ended with an exception.")]
+        counters += [(name, 4 + i, f"Sum of span {name.replace('_', ' ')}.")
+                     for i, name in enumerate(COUNTED_ATTRIBUTES)]
+        for name, column, help_text in counters:
+            metric = f"yt_summarizer_span_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for row in totals:
+                lines.append(f'{metric}{{stage="{row[0]}"}} {row[column]}')
+        for name, value in events:
+            metric = f"yt_summarizer_{name}_total"
+            lines.append(f"# HELP {metric} Count of {name.replace('_', ' ')} events.")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_store = MetricsStore.from_env()
+
+
+def export_trace(trace: Trace) -> None:
+    """
+    Publish a finished run: histogram store, plus TRACE_FILE (JSONL) when set.
+    """
+    spans = trace.snapshot()
+    try:
+        metrics_store.record(spans)
+    except sqlite3.Error as e:
+        logger.warning("Could not record metrics: %s", e)
+    trace_file = os.getenv("TRACE_FILE")
+    if trace_file and spans:
+        with open(trace_file, "a", encoding="utf-8") as handle:
+            for span in spans:
+                handle.write(json.dumps(span, ensure_ascii=False) + "\n")
+
+
+def count_event(name: str, amount: int = 1) -> None:
+    """Add to a counter in the histogram store; a store error is logged, not raised."""
+    try:
+        metrics_store.increment(name, amount)
+    except sqlite3.Error as e:
+        logger.warning("Could not record metrics: %s", e)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_store.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None, host: str = None):
+    """
+    Serve /metrics on METRICS_HOST:METRICS_PORT in a background thread, once per process.
+
+    Args:
+        port: Port to listen on (defaults to METRICS_PORT, 9464; 0 disables the endpoint)
+        host: Address to bind (defaults to METRICS_HOST, 127.0.0.1 - local scrapers only)
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if disabled (METRICS_PORT=0) or the port is taken
+    """
+    global _server, _server_started
+    port = int(os.getenv("METRICS_PORT", DEFAULT_METRICS_PORT)) if port is None else port
+    host = host or os.getenv("METRICS_HOST", DEFAULT_METRICS_HOST)
+    with _server_lock:
+        if port and not _server_started:
+            _server_started = True
+            try:
+                _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                # Another app process already serves the shared metrics
+                logger.info("Metrics endpoint not started on port %s: %s", port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-server").start()
+    return _server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve pipeline metrics in Prometheus text format.")
+    parser.add_argument("--port", type=int, default=DEFAULT_METRICS_PORT)
+    parser.add_argument("--host", default=os.getenv("METRICS_HOST", DEFAULT_METRICS_HOST),
+                        help="Address to bind; 0.0.0.0 exposes the endpoint to other machines")
+    args = parser.parse_args()
+    server = start_metrics_server(args.port, args.host)
+    if server is None:
+        raise SystemExit(f"Could not listen on {args.host}:{args.port}")
+    print(f"Serving metrics on http://{args.host}:{args.port}/metrics")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
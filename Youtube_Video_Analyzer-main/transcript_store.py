@@ -0,0 +1,224 @@
+"""
+Transcript fetch cache and the shared HTTP session used for YouTube requests.
+
+Raw caption snippets ({"text", "start", "duration"}) are stored in SQLite keyed
+by (video_id, language_code, is_generated) with a time-to-live, so repeated
+requests for the same video never hit YouTube again while the entry is fresh.
+A track can also be read back one snippet at a time (iter_snippets), so very
+long transcripts never have to be parsed into one list.
+"""
+import codecs
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_CACHE_DIR = "./cache"
+DEFAULT_TTL_SECONDS = 24 * 3600  # auto-captions can still change during the first day
+HTTP_POOL_SIZE = 16
+# Bytes of a stored track read per step when it is streamed
+STREAM_BLOCK_BYTES = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Return the process-wide keep-alive HTTP session for YouTube requests.
+
+    The session is created once per process (not per Streamlit rerun) with a
+    connection pool large enough for concurrent fetches. requests is imported
+    here, on first use, rather than when the module loads.
+
+    Returns:
+        requests.Session: The shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def iter_json_array(read, block_size: int = STREAM_BLOCK_BYTES):
+    """
+    Yield the objects of a JSON array of objects read in blocks of UTF-8 bytes.
+
+    Only the current block and the object being decoded are held, however long
+    the array is.
+
+    Args:
+        read: read(size) -> bytes, b"" at the end (a file or SQLite blob)
+        block_size: Bytes read per step
+
+    Raises:
+        json.JSONDecodeError: If the data is not a well-formed array of objects
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, at_end = "", 0, False
+    while True:
+        # Skip the opening bracket, separators and whitespace between objects
+        while pos < len(buffer) and buffer[pos] in "[, \t\r\n":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # An object cut off at the end of the block: read on (objects end with "}",
+            # so a truncated one never decodes)
+            if at_end:
+                raise
+            block = read(block_size)
+            at_end = not block
+            buffer = buffer[pos:] + utf8.decode(block, final=at_end)
+            pos = 0
+            continue
+        yield item
+
+
+class TranscriptStore:
+    """
+    TTL cache of raw transcript snippets keyed by (video_id, language, manual/generated).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS transcripts (
+                    video_id TEXT NOT NULL,
+                    language_code TEXT NOT NULL,
+                    is_generated INTEGER NOT NULL,
+                    snippets_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (video_id, language_code, is_generated)
+                )"""
+            )
+
+    @classmethod
+    def from_env(cls) -> "TranscriptStore":
+        """
+        Build a store from environment variables.
+
+        CACHE_DIR                    - directory holding transcripts.sqlite3 (default ./cache)
+        TRANSCRIPT_CACHE_TTL_SECONDS - how long fetched captions are reused
+        """
+        cache_dir = os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR)
+        return cls(
+            os.path.join(cache_dir, "transcripts.sqlite3"),
+            ttl_seconds=float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, video_id: str) -> dict:
+        """
+        Return every fresh cached track for a video.
+
+        Returns:
+            dict: {(language_code, is_generated): list[dict]} - empty if nothing is cached
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT language_code, is_generated, snippets_json FROM transcripts
+                   WHERE video_id = ? AND fetched_at >= ?""",
+                (video_id, cutoff),
+            ).fetchall()
+        return {(lang, bool(generated)): json.loads(data) for lang, generated, data in rows}
+
+    def tracks(self, video_id: str) -> dict:
+        """
+        Describe every fresh cached track of a video without parsing any of them.
+
+        Returns:
+            dict: {(language_code, is_generated): {"chars": stored JSON length, "fetched_at": float}}
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT language_code, is_generated, length(snippets_json), fetched_at FROM transcripts
+                   WHERE video_id = ? AND fetched_at >= ?""",
+                (video_id, cutoff),
+            ).fetchall()
+        return {(lang, bool(generated)): {"chars": chars, "fetched_at": fetched_at}
+                for lang, generated, chars, fetched_at in rows}
+
+    def load(self, video_id: str, language_code: str, is_generated: bool) -> list:
+        """
+        Return the snippet list of one cached track, or None if it is not cached.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT snippets_json FROM transcripts
+                   WHERE video_id = ? AND language_code = ? AND is_generated = ?""",
+                (video_id, language_code, int(is_generated)),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_snippets(self, video_id: str, language_code: str, is_generated: bool, fetched_at: float = None):
+        """
+        Yield the snippets of one cached track, decoding the stored JSON a block at a time.
+
+        The track is read through SQLite incremental blob I/O inside one read
+        transaction, so it stays consistent even if the track is saved again meanwhile.
+
+        Args:
+            video_id / language_code / is_generated: The track
+            fetched_at: Only read the track if it is still this version (from tracks())
+
+        Yields:
+            dict: {"text", "start", "duration"} snippets in order
+
+        Raises:
+            ValueError: If the track is no longer cached (or was fetched again since fetched_at)
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            row = conn.execute(
+                """SELECT rowid, fetched_at FROM transcripts
+                   WHERE video_id = ? AND language_code = ? AND is_generated = ?""",
+                (video_id, language_code, int(is_generated)),
+            ).fetchone()
+            if row is None or (fetched_at is not None and row[1] != fetched_at):
+                raise ValueError(f"The cached transcript of video {video_id} changed or expired while it was read")
+            with conn.blobopen("transcripts", "snippets_json", row[0], readonly=True) as blob:
+                yield from iter_json_array(blob.read)
+            conn.execute("COMMIT")
+
+    def save(self, video_id: str, language_code: str, is_generated: bool, snippets: list) -> None:
+        """
+        Store the raw snippet list for one transcript track.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO transcripts
+                   (video_id, language_code, is_generated, snippets_json, fetched_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (video_id, language_code, int(is_generated), json.dumps(snippets, ensure_ascii=False), time.time()),
+            )
+            conn.execute("DELETE FROM transcripts WHERE fetched_at < ?", (time.time() - self.ttl_seconds,))
@@ -0,0 +1,173 @@
+"""
+Bounded-memory transcript for very long videos.
+
+A CompactTranscript holds the whole joined text, which is fine for ordinary
+videos but not for 10+ hour streams in workers packed many to a container.
+A StreamedTranscript never holds the transcript at all: the stored caption
+track is read a block at a time (TranscriptStore.iter_snippets) and cleaned
+snippet by snippet, and chunks are packed on the fly. Memory is bounded by
+the chunks being built or waiting for a map call, not by the length of the
+video.
+
+The pipeline makes a few cheap local passes:
+
+1. measure: cleans the snippets once, spools them to a temporary file (one
+   JSON line each) and computes characters, tokens and the SHA-256 of the
+   joined text - the same digest the text of a CompactTranscript of the track
+   would have, so run ids and summary cache keys are shared with in-memory runs
+2. layout: token size and time span of every chunk, for the budget check
+3. chunks: the chunk texts, drawn one at a time as map calls free up
+4. locate: key point timestamps, scored one time window at a time
+
+Passes 2-4 read the spool back line by line rather than parsing and cleaning
+the stored track again.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import weakref
+from typing import Iterator
+
+from caption_cleanup import iter_clean_snippets
+from chunking import Chunk, Segment, iter_chunks
+from compact_transcript import locate_phrases
+from rate_limiter import CHARS_PER_TOKEN
+
+
+# Stored caption JSON (characters) from which a transcript is streamed: ~5 hours of captions
+DEFAULT_MIN_CHARS = 500000
+
+
+def streaming_settings_from_env() -> dict:
+    """
+    Read streaming settings from the environment.
+
+    STREAMING_PIPELINE  - 0 always loads transcripts into memory (default 1)
+    STREAMING_MIN_CHARS - stored caption size (JSON characters) from which a transcript
+                          is streamed instead (default 500000, about five hours; 0 streams all)
+    """
+    return {
+        "enabled": os.getenv("STREAMING_PIPELINE", "1") == "1",
+        "min_chars": int(os.getenv("STREAMING_MIN_CHARS", DEFAULT_MIN_CHARS)),
+    }
+
+
+class StreamedTranscript:
+    """
+    Re-iterable transcript that is read, cleaned and chunked one snippet at a time.
+
+    Args:
+        open_snippets: open_snippets() -> fresh iterator of raw {"text", "start", "duration"} dicts
+        cleanup: iter_clean_snippets settings, or None to use the snippets as they are
+    """
+
+    def __init__(self, open_snippets, cleanup: dict = None):
+        self._open_snippets = open_snippets
+        self.cleanup = cleanup
+        self._spool_path = None
+        self._remove_spool = None
+        # Filled by measure()
+        self.chars = None
+        self.nbytes = None
+        self.tokens = None
+        self.snippets = None
+        self.digest = None
+        self.cleanup_stats = None
+
+    def _read_source(self, cleanup_stats: dict = None) -> Iterator[Segment]:
+        snippets = self._open_snippets()
+        if self.cleanup is not None:
+            snippets = iter_clean_snippets(snippets, cleanup_stats, **self.cleanup)
+        for snippet in snippets:
+            yield Segment(snippet["text"], float(snippet.get("start") or 0.0),
+                          float(snippet.get("duration") or 0.0))
+
+    def segments(self) -> Iterator[Segment]:
+        """Yield the cleaned snippets as chunking.Segment tuples (from the spool once measured)."""
+        if self._spool_path is None:
+            yield from self._read_source()
+            return
+        with open(self._spool_path, encoding="utf-8") as spool:
+            for line in spool:
+                yield Segment(*json.loads(line))
+
+    def measure(self) -> "StreamedTranscript":
+        """
+        One pass cleaning and spooling the snippets and computing the size, token
+        estimate and digest of the joined text.
+
+        Returns:
+            StreamedTranscript: self, with chars, nbytes, tokens, snippets, digest and
+                cleanup_stats set
+        """
+        self.close()
+        fd, path = tempfile.mkstemp(prefix="transcript-", suffix=".jsonl")
+        # The spool is removed with this object (or by close())
+        self._remove_spool = weakref.finalize(self, _remove, path)
+        digest = hashlib.sha256()
+        stats = {} if self.cleanup is not None else None
+        chars = nbytes = count = 0
+        with open(fd, "w", encoding="utf-8") as spool:
+            for segment in self._read_source(stats):
+                spool.write(json.dumps(segment, ensure_ascii=False))
+                spool.write("\n")
+                data = segment.text.encode("utf-8")
+                # Snippets are joined with single spaces, as in CompactTranscript.text
+                if count:
+                    digest.update(b" ")
+                digest.update(data)
+                chars += len(segment.text)
+                nbytes += len(data)
+                count += 1
+        self._spool_path = path
+        separators = max(0, count - 1)
+        self.chars = chars + separators
+        self.nbytes = nbytes + separators
+        # estimate_tokens of the joined text
+        self.tokens = int(self.chars / CHARS_PER_TOKEN) + 1
+        self.snippets = count
+        self.digest = digest.hexdigest()
+        self.cleanup_stats = stats
+        return self
+
+    def close(self) -> None:
+        """Remove the spool file; later passes read the source again."""
+        if self._remove_spool is not None:
+            self._remove_spool()
+        self._spool_path = None
+        self._remove_spool = None
+
+    def chunks(self, chunk_tokens: int) -> Iterator[Chunk]:
+        """Yield the transcript's chunks as they are cut (see chunking.iter_chunks)."""
+        return iter_chunks(self.segments(), chunk_tokens)
+
+    def layout(self, chunk_tokens: int, on_chunk=None) -> tuple:
+        """
+        One pass collecting the token size and time span of every chunk.
+
+        Args:
+            chunk_tokens: Token budget per chunk
+            on_chunk: Optional on_chunk(index, chunk_text) while the text is at hand
+
+        Returns:
+            tuple: (list of chunk token counts, list of [start, end] time spans)
+        """
+        sizes, spans = [], []
+        for index, chunk in enumerate(self.chunks(chunk_tokens)):
+            sizes.append(chunk.tokens)
+            spans.append([chunk.start, chunk.end])
+            if on_chunk:
+                on_chunk(index, chunk.text)
+        return sizes, spans
+
+    def locate(self, phrases: list, window_seconds: float = 30.0) -> list:
+        """Key point timestamps, as CompactTranscript.locate (see locate_phrases)."""
+        return locate_phrases(self.segments(), phrases, window_seconds)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass